@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+#
+#  benchmark.py
+"""
+Benchmarks for the throughput of flake8-encodings' visitors and plugin.
+
+Synthetic modules are generated with a configurable number of files and density of checked calls,
+and each visitor is run over every file.
+The results (files per second, time per ``jedi`` inference call and peak memory use)
+are printed and optionally written to a JSON file, so they can be compared between releases.
+
+Run with ``tox -e bench``, or directly::
+
+	python3 benchmarks/benchmark.py --files 200 --output benchmark.json
+"""
+
+# stdlib
+import argparse
+import ast
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+# this package
+import flake8_encodings
+from flake8_encodings import ClassVisitor, Plugin, TypeTrackingVisitor, Visitor
+
+try:
+	# 3rd party
+	import jedi  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover
+	jedi = None
+
+HEADER = """\
+import configparser
+import io
+import logging
+import pathlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+"""
+
+# Statements which can be reported, with and without an encoding.
+CANDIDATE_STATEMENTS = [
+		"data = open({name!r}).read()",
+		"data = open({name!r}, encoding='UTF-8').read()",
+		"data = open({name!r}, 'rb').read()",
+		"data = io.open({name!r}, mode=mode)",
+		"data = pathlib.Path({name!r}).read_text()",
+		"Path({name!r}).write_text(data, encoding='UTF-8')",
+		"path = Path({name!r})\n\twith path.open() as fp:\n\t\tdata = fp.read()",
+		"cfg = configparser.ConfigParser()\n\tcfg.read({name!r})",
+		]
+
+# Statements which contain calls that are never reported.
+OTHER_STATEMENTS = [
+		"logger.info('Processing %s', {name!r})",
+		"values = dict(a=1, b=2)\n\tvalues.get('a')",
+		"result = ', '.join(sorted(str(x) for x in range(10)))",
+		"parts = {name!r}.split('.')",
+		"is_text = isinstance(mode, str) and mode.startswith('r')",
+		"items = [x * 2 for x in range(5)]\n\titems.append(len(items))",
+		]
+
+
+def generate_module(rng: random.Random, functions: int, candidate_density: float) -> str:
+	"""
+	Generate the source code of a synthetic module.
+
+	:param rng:
+	:param functions: The number of functions in the module.
+	:param candidate_density: The proportion of statements which contain a checked call.
+	"""
+
+	chunks = [HEADER]
+
+	for function_idx in range(functions):
+		statements = []
+
+		for statement_idx in range(rng.randint(3, 12)):
+			if rng.random() < candidate_density:
+				template = rng.choice(CANDIDATE_STATEMENTS)
+			else:
+				template = rng.choice(OTHER_STATEMENTS)
+
+			statements.append(template.format(name=f"file_{function_idx}_{statement_idx}.txt"))
+
+		body = "\n\t".join(statements)
+		chunks.append(f"\ndef function_{function_idx}(mode='r'):\n\t{body}\n\treturn locals()\n")
+
+	return ''.join(chunks)
+
+
+def generate_corpus(
+		directory: PathPlus,
+		files: int,
+		functions: int,
+		candidate_density: float,
+		seed: int,
+		) -> List[PathPlus]:
+	"""
+	Write a corpus of synthetic modules to ``directory``.
+
+	:param directory:
+	:param files: The number of modules to generate.
+	:param functions: The number of functions in each module.
+	:param candidate_density: The proportion of statements which contain a checked call.
+	:param seed: Seed for the random number generator, so corpora are reproducible.
+	"""
+
+	rng = random.Random(seed)
+	directory.maybe_make(parents=True)
+	paths = []
+
+	for idx in range(files):
+		path = directory / f"module_{idx}.py"
+		path.write_text(generate_module(rng, functions, candidate_density))
+		paths.append(path)
+
+	return paths
+
+
+def _run_visitor(visitor_class: Callable[[], Visitor]) -> Callable[[PathPlus, str, ast.Module], int]:
+
+	def run(path: PathPlus, source: str, tree: ast.Module) -> int:
+		visitor = visitor_class()
+		visitor.visit(tree)
+		return len(visitor.errors)
+
+	return run
+
+
+def _run_class_visitor(path: PathPlus, source: str, tree: ast.Module) -> int:
+	visitor = ClassVisitor()
+	visitor.first_visit(tree, path, source.splitlines(keepends=True))
+	return len(visitor.errors)
+
+
+def _run_plugin(engine: str) -> Callable[[PathPlus, str, ast.Module], int]:
+
+	def run(path: PathPlus, source: str, tree: ast.Module) -> int:
+		Plugin.engine = engine
+		plugin = Plugin(tree, path, source.splitlines(keepends=True))
+		return len(list(plugin.run()))
+
+	return run
+
+
+class _InferenceTimer:
+	# Records the number and duration of calls to jedi.Script.infer
+
+	def __init__(self):
+		self.calls = 0
+		self.seconds = 0.0
+		self._original: Optional[Callable] = None
+
+	def __enter__(self) -> "_InferenceTimer":
+		if jedi is not None:
+			self._original = original = jedi.Script.infer
+
+			def infer(*args, **kwargs) -> Any:  # noqa: MAN002
+				start = time.perf_counter()
+				try:
+					return original(*args, **kwargs)
+				finally:
+					self.seconds += time.perf_counter() - start
+					self.calls += 1
+
+			jedi.Script.infer = infer
+
+		return self
+
+	def __exit__(self, *args) -> None:
+		if self._original is not None:
+			jedi.Script.infer = self._original
+
+
+def benchmark(
+		name: str,
+		function: Callable[[PathPlus, str, ast.Module], int],
+		paths: Sequence[PathPlus],
+		repeat: int,
+		) -> Dict[str, Any]:
+	"""
+	Benchmark the given function over each of the files in ``paths``.
+
+	:param name:
+	:param function: Function taking the path to, source of and AST of a file,
+		and returning the number of errors found. Files are parsed before timing starts.
+	:param paths:
+	:param repeat: The number of times to repeat the timing. The fastest repetition is reported.
+	"""
+
+	sources = []
+	for path in paths:
+		source = path.read_text()
+		sources.append((path, source, ast.parse(source)))
+
+	# Warm up, so one-off costs such as imports are not counted.
+	function(*sources[0])
+
+	timings = []
+	errors = 0
+
+	with _InferenceTimer() as inference:
+		for _ in range(repeat):
+			start = time.perf_counter()
+			errors = sum(function(*file) for file in sources)
+			timings.append(time.perf_counter() - start)
+
+	tracemalloc.start()
+	try:
+		for file in sources:
+			function(*file)
+		_, peak_memory = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+
+	best = min(timings)
+
+	return {
+			"name": name,
+			"files": len(sources),
+			"errors": errors,
+			"seconds": best,
+			"files_per_second": len(sources) / best if best else None,
+			"inference_calls": inference.calls // repeat,
+			"mean_inference_ms": inference.seconds / inference.calls * 1000 if inference.calls else None,
+			"peak_memory_bytes": peak_memory,
+			}
+
+
+def get_targets(include_jedi: bool) -> Iterator[Tuple[str, Callable[[PathPlus, str, ast.Module], int]]]:
+	"""
+	Returns the names of and functions to benchmark.
+
+	:param include_jedi: Whether to include the targets which require ``jedi``.
+	"""
+
+	yield "Visitor", _run_visitor(Visitor)
+	yield "TypeTrackingVisitor", _run_visitor(TypeTrackingVisitor)
+	yield "Plugin.run[ast]", _run_plugin("ast")
+
+	if include_jedi:
+		yield "ClassVisitor", _run_class_visitor
+		yield "Plugin.run[jedi]", _run_plugin("jedi")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+	"""
+	Run the benchmarks.
+
+	:param argv: Command line arguments.
+	"""
+
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--files", type=int, default=50, help="Number of files in each corpus. (Default: %(default)s)")
+	parser.add_argument(
+			"--functions",
+			type=int,
+			default=20,
+			help="Number of functions in each file. (Default: %(default)s)",
+			)
+	parser.add_argument(
+			"--density",
+			type=float,
+			default=0.15,
+			help="Proportion of statements containing a checked call. (Default: %(default)s)",
+			)
+	parser.add_argument("--repeat", type=int, default=3, help="Number of timed repetitions. (Default: %(default)s)")
+	parser.add_argument("--seed", type=int, default=1234, help="Random seed. (Default: %(default)s)")
+	parser.add_argument("--no-jedi", action="store_true", help="Skip the benchmarks which require jedi.")
+	parser.add_argument("-o", "--output", help="Write the results to this JSON file.")
+	args = parser.parse_args(argv)
+
+	include_jedi = jedi is not None and not args.no_jedi
+	results: Dict[str, Any] = {
+			"flake8_encodings": flake8_encodings.__version__,
+			"python": sys.version,
+			"implementation": platform.python_implementation(),
+			"jedi": jedi.__version__ if include_jedi else None,
+			"parameters": vars(args),
+			"corpora": {},
+			}
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		Plugin.cache_dir = str(PathPlus(tmpdir) / "cache")
+
+		corpora = {
+				"realistic": args.density,
+				"no_candidates": 0.0,
+				}
+
+		for corpus_name, density in corpora.items():
+			paths = generate_corpus(
+					PathPlus(tmpdir) / corpus_name,
+					files=args.files,
+					functions=args.functions,
+					candidate_density=density,
+					seed=args.seed,
+					)
+
+			corpus_results = results["corpora"][corpus_name] = []
+
+			for name, function in get_targets(include_jedi):
+				result = benchmark(name, function, paths, args.repeat)
+				corpus_results.append(result)
+
+				mean_inference = result["mean_inference_ms"]
+				print(
+						f"{corpus_name:<14} {name:<20} {result['files_per_second']:>10.1f} files/s",
+						f"{result['peak_memory_bytes'] / 1024:>10.0f} KiB peak",
+						f"{result['inference_calls']:>6} infer calls",
+						f"({mean_inference:.2f} ms each)" if mean_inference is not None else '',
+						)
+
+	if args.output:
+		PathPlus(args.output).dump_json(results, indent=2)
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -5,12 +5,6 @@
 A Flake8 plugin to identify incorrect use of encodings.
 
 .. seealso:: :pep:`597` -- Add optional EncodingWarning
-
-.. TODO::
-
-	Add support for checking e.g. logging.basicConfig(filename="log.txt").
-	It has no encoding parameter before 3.9.
-	Instead an open stream must be used, with the encoding set there.
 """
 #
 #  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
@@ -36,30 +30,75 @@ A Flake8 plugin to identify incorrect use of encodings.
 
 # stdlib
 import ast
-import configparser
-import pathlib
+import contextlib
+import functools
+import importlib.util
+import inspect
+import itertools
+import os
+import re
 import sys
-import tempfile
-from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple, Type
+import time
+from bisect import bisect_left, bisect_right
+from typing import (
+		TYPE_CHECKING,
+		Any,
+		Callable,
+		Collection,
+		ContextManager,
+		Dict,
+		FrozenSet,
+		Generator,
+		Iterable,
+		Iterator,
+		List,
+		NamedTuple,
+		Optional,
+		Sequence,
+		Set,
+		Tuple,
+		Type,
+		TypeVar,
+		Union
+		)
 
 # 3rd party
 import flake8_helper
-from astatine import get_attribute_name, kwargs_from_node
 from domdf_python_tools.paths import PathPlus
 from domdf_python_tools.typing import PathLike
 
 if TYPE_CHECKING:
+	# stdlib
+	from argparse import Namespace
+
 	# 3rd party
-	from jedi import Script  # type: ignore[import-untyped]
+	from flake8.options.manager import OptionManager  # type: ignore[import-untyped]
+	from jedi import Project, Script  # type: ignore[import-untyped]
 	from jedi.api.classes import Name  # type: ignore[import-untyped]
 
+	# this package
+	from flake8_encodings.cache import ResultCache
+	from flake8_encodings.diff import ChangedLines
+	from flake8_encodings.index import TypeIndex
+	from flake8_encodings.noqa import SuppressedLines
+	from flake8_encodings.records import ErrorRecords
+	from flake8_encodings.stats import Stats
+
 __author__: str = "Dominic Davis-Foster"
 __copyright__: str = "2020-2021 Dominic Davis-Foster"
 __license__: str = "MIT License"
 __version__: str = "0.5.1"
 __email__: str = "dominic@davis-foster.co.uk"
 
-__all__ = ["Visitor", "ClassVisitor", "Plugin"]
+__all__ = ["Visitor", "ClassVisitor", "TypeTrackingVisitor", "Plugin"]
+
+# The cache, noqa, records and stdlib_types submodules are imported where they are used,
+# so that importing the plugin stays cheap.
+# These are re-exported by flake8_encodings.cache, and are needed for the defaults of the plugin's options.
+_CACHE_DIR_ENV_VAR = "FLAKE8_ENCODINGS_CACHE_DIR"
+_DEFAULT_CACHE_SIZE = 256
+
+_T = TypeVar("_T")
 
 ENC001 = "ENC001 no encoding specified for 'open'."
 ENC002 = "ENC002 'encoding=None' used for 'open'."
@@ -76,10 +115,147 @@ ENC024 = "ENC024 'encoding=None' used for 'pathlib.Path.read_text'."
 ENC025 = "ENC025 no encoding specified for 'pathlib.Path.write_text'."
 ENC026 = "ENC026 'encoding=None' used for 'pathlib.Path.write_text'."
 
-_configparser_read = configparser.ConfigParser().read
-_pathlib_open = pathlib.Path().open
-_pathlib_read_text = pathlib.Path().read_text
-_pathlib_write_text = pathlib.Path().write_text
+ENC031 = "ENC031 no encoding specified for 'tempfile.TemporaryFile'."
+ENC032 = "ENC032 'encoding=None' used for 'tempfile.TemporaryFile'."
+ENC033 = "ENC033 no encoding specified for 'tempfile.NamedTemporaryFile'."
+ENC034 = "ENC034 'encoding=None' used for 'tempfile.NamedTemporaryFile'."
+ENC035 = "ENC035 no encoding specified for 'tempfile.SpooledTemporaryFile'."
+ENC036 = "ENC036 'encoding=None' used for 'tempfile.SpooledTemporaryFile'."
+
+ENC041 = "ENC041 no encoding specified for 'subprocess.run'."
+ENC042 = "ENC042 'encoding=None' used for 'subprocess.run'."
+ENC043 = "ENC043 no encoding specified for 'subprocess.Popen'."
+ENC044 = "ENC044 'encoding=None' used for 'subprocess.Popen'."
+ENC045 = "ENC045 no encoding specified for 'subprocess.check_output'."
+ENC046 = "ENC046 'encoding=None' used for 'subprocess.check_output'."
+
+ENC051 = "ENC051 no encoding specified for 'logging.FileHandler'."
+ENC052 = "ENC052 'encoding=None' used for 'logging.FileHandler'."
+ENC053 = "ENC053 no encoding specified for 'logging.basicConfig'."
+ENC054 = "ENC054 'encoding=None' used for 'logging.basicConfig'."
+
+ENC061 = "ENC061 no encoding specified for 'io.TextIOWrapper'."
+ENC062 = "ENC062 'encoding=None' used for 'io.TextIOWrapper'."
+
+ENC071 = "ENC071 no encoding specified for 'codecs.open'."
+ENC072 = "ENC072 'encoding=None' used for 'codecs.open'."
+
+ENC081 = "ENC081 no encoding specified for 'fileinput.input'."
+ENC082 = "ENC082 'encoding=None' used for 'fileinput.input'."
+ENC083 = "ENC083 no encoding specified for 'fileinput.FileInput'."
+ENC084 = "ENC084 'encoding=None' used for 'fileinput.FileInput'."
+
+_configparser_classes = frozenset({"configparser.ConfigParser", "configparser.RawConfigParser"})
+_configparser_methods = frozenset({"read"})
+_pathlib_classes = frozenset({"pathlib.Path", "pathlib.WindowsPath", "pathlib.PosixPath"})
+_pathlib_methods = frozenset({"open", "read_text", "write_text"})
+
+#: The engines which can be selected with the ``--encodings-engine`` option.
+ENGINES = ("auto", "jedi", "ast")
+
+
+def get_positional_parameters(function: Callable, method: bool = False) -> Tuple[str, ...]:
+	"""
+	Returns the names of the parameters of ``function`` which can be given positionally, in order.
+
+	.. versionadded:: 0.6.0
+
+	:param function:
+	:param method: Whether ``function`` is an unbound method, in which case the ``self`` parameter is omitted.
+	"""
+
+	positional_kinds = {inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD}
+	parameters = inspect.signature(function).parameters.values()
+	names = tuple(parameter.name for parameter in parameters if parameter.kind in positional_kinds)
+
+	return names[1:] if method else names
+
+
+# The positional parameters of each of the checked functions,
+# as would be returned by get_positional_parameters() for the newest supported version of Python.
+# These are literals as computing signatures of builtins with inspect is slow enough to affect startup time.
+_open_parameters = ("file", "mode", "buffering", "encoding", "errors", "newline", "closefd", "opener")
+_configparser_read_parameters = ("filenames", "encoding")
+_pathlib_open_parameters = ("mode", "buffering", "encoding", "errors", "newline")
+_pathlib_read_text_parameters = ("encoding", "errors", "newline")
+_pathlib_write_text_parameters = ("data", "encoding", "errors", "newline")
+_tempfile_parameters = ("mode", "buffering", "encoding", "newline", "suffix", "prefix", "dir")
+_named_tempfile_parameters = (*_tempfile_parameters, "delete")
+_spooled_tempfile_parameters = ("max_size", *_tempfile_parameters)
+_popen_parameters = (
+		"args",
+		"bufsize",
+		"executable",
+		"stdin",
+		"stdout",
+		"stderr",
+		"preexec_fn",
+		"close_fds",
+		"shell",
+		"cwd",
+		"env",
+		"universal_newlines",
+		"startupinfo",
+		"creationflags",
+		"restore_signals",
+		"start_new_session",
+		"pass_fds",
+		)
+_file_handler_parameters = ("filename", "mode", "encoding", "delay", "errors")
+_text_io_wrapper_parameters = ("buffer", "encoding", "errors", "newline", "line_buffering", "write_through")
+_codecs_open_parameters = ("filename", "mode", "encoding", "errors", "buffering")
+_fileinput_parameters = ("files", "inplace", "backup")
+
+# The keyword-only parameters which affect the checks.
+_tempfile_keyword_parameters = ("errors", )
+_popen_keyword_parameters = ("encoding", "errors", "text")
+_basic_config_keyword_parameters = ("filename", "encoding", "errors")
+_fileinput_keyword_parameters = ("mode", "openhook", "encoding", "errors")
+
+
+def bind_arguments(
+		node: ast.Call,
+		parameters: Sequence[str],
+		keyword_parameters: Sequence[str] = (),
+		) -> Dict[str, ast.AST]:
+	"""
+	Returns a mapping of parameter names to the AST nodes representing their values, for the given function call.
+
+	As the values passed with ``*args`` and ``**kwargs`` cannot be determined statically,
+	parameters which may be given by them are mapped to the :class:`ast.Starred` node or the ``**`` value respectively.
+
+	.. versionadded:: 0.6.0
+
+	:param node:
+	:param parameters: The names of the function's parameters which can be given positionally,
+		as returned by :func:`~.get_positional_parameters`.
+	:param keyword_parameters: The names of the function's keyword-only parameters,
+		which may also be given by ``**kwargs``.
+	"""
+
+	kwargs: Dict[str, ast.AST] = {}
+	double_star: Optional[ast.AST] = None
+
+	for keyword in node.keywords:
+		if keyword.arg is None:
+			double_star = keyword.value
+		else:
+			kwargs[keyword.arg] = keyword.value
+
+	for idx, value in enumerate(node.args[:len(parameters)]):
+		if isinstance(value, ast.Starred):
+			# Any of the remaining positional parameters might be given.
+			for name in parameters[idx:]:
+				kwargs.setdefault(name, value)
+			break
+
+		kwargs.setdefault(parameters[idx], value)
+
+	if double_star is not None:
+		for name in (*parameters, *keyword_parameters):
+			kwargs.setdefault(name, double_star)
+
+	return kwargs
 
 
 def mode_is_binary(mode: ast.AST) -> Optional[bool]:
@@ -109,349 +285,2566 @@ else:  # pragma: no cover (<py312)
 	_skip_312_deprecations = True
 
 
-class Visitor(flake8_helper.Visitor):
-	"""
-	AST visitor to identify incorrect use of encodings.
+def _open_text_mode(kwargs: Dict[str, ast.AST]) -> Optional[bool]:
+	# Files are opened in text mode unless the mode contains "b".
 
-	.. versionchanged:: 0.4.0
+	if "mode" not in kwargs:
+		return True
 
-		The functionality for checking classes has moved to the :class:`~.ClassVisitor` subclass.
+	is_binary = mode_is_binary(kwargs["mode"])
+	return None if is_binary is None else not is_binary
+
+
+def _always_text(kwargs: Dict[str, ast.AST]) -> Optional[bool]:
+	return True
+
+
+def _binary_default_mode(kwargs: Dict[str, ast.AST]) -> Optional[bool]:
+	# Temporary files are opened in binary mode ("w+b") unless another mode is given.
+
+	if "mode" not in kwargs:
+		return False
+
+	return _open_text_mode(kwargs)
+
+
+def _subprocess_text_mode(kwargs: Dict[str, ast.AST]) -> Optional[bool]:
+	# The output is decoded if "text" or "universal_newlines" is true, or if "errors" is given.
+
+	if "errors" in kwargs:
+		return True
+
+	text_mode: Optional[bool] = False
+
+	for name in ("text", "universal_newlines"):
+		if name not in kwargs:
+			continue
+
+		value = kwargs[name]
+		if not isinstance(value, _constant_nameconstant):
+			text_mode = None
+		elif value.value:
+			return True
+
+	return text_mode
+
+
+def _basic_config_text_mode(kwargs: Dict[str, ast.AST]) -> Optional[bool]:
+	# Only a FileHandler created from "filename" uses an encoding; the "stream" and "handlers" arguments don't.
+	return "filename" in kwargs
+
+
+def _fileinput_text_mode(kwargs: Dict[str, ast.AST]) -> Optional[bool]:
+	# "encoding" cannot be given together with "openhook", which is responsible for opening the files itself.
+
+	if "openhook" in kwargs:
+		return False
+
+	return _open_text_mode(kwargs)
+
+
+class CheckedCallable(NamedTuple):
 	"""
+	A function or method whose use of encodings is checked.
 
-	def check_open_encoding(self, node: ast.Call) -> None:
-		"""
-		Check the call represented by the given AST node is using encodings correctly.
+	.. versionadded:: 0.6.0
+	"""
 
-		This function checks :func:`open`, :func:`builtins.open <open>` and :func:`io.open`.
+	#: The fully qualified names of the callable, e.g. ``('io.open', )``.
+	#: Builtins (e.g. ``'builtins.open'``) are also matched when called by their bare name.
+	names: Tuple[str, ...]
 
-		.. versionchanged:: 0.2.0  Renamed from ``check_encoding``
+	#: The names of the parameters which can be given positionally, in order.
+	parameters: Tuple[str, ...]
 
-		:param node:
+	#: The error reported when no encoding is given.
+	no_encoding: str
+
+	#: The error reported when ``encoding=None`` is given.
+	encoding_none: str
+
+	#: Function which takes the arguments the callable is called with, and returns whether the file is opened
+	#: in text mode (:py:obj:`True`), binary mode (:py:obj:`False`), or :py:obj:`None` if that cannot be determined.
+	text_mode: Callable[[Dict[str, ast.AST]], Optional[bool]] = _always_text
+
+	#: The error reported when no encoding is given and the mode cannot be determined.
+	#: If :py:obj:`None` such calls are not reported.
+	unknown_mode_no_encoding: Optional[str] = None
+
+	#: The error reported when ``encoding=None`` is given and the mode cannot be determined.
+	#: If :py:obj:`None` such calls are not reported.
+	unknown_mode_encoding_none: Optional[str] = None
+
+	#: Whether :attr:`~.CheckedCallable.names` are methods of classes, in which case the type of
+	#: the object whose method is called must be determined before the call can be checked.
+	method: bool = False
+
+	#: The names of the keyword-only parameters which affect the check, e.g. ``encoding`` for :func:`subprocess.run`.
+	#: These may be given by ``**kwargs``, as the positional parameters may be.
+	keyword_parameters: Tuple[str, ...] = ()
+
+	@property
+	def codes(self) -> Tuple[str, ...]:
+		"""
+		The codes of the errors which can be reported for the callable, e.g. ``('ENC011', 'ENC012')``.
 		"""
 
-		kwargs = kwargs_from_node(node, open)
+		errors = (self.no_encoding, self.encoding_none, self.unknown_mode_no_encoding, self.unknown_mode_encoding_none)
+		return tuple(error.split(' ', 1)[0] for error in errors if error is not None)
+
+
+#: The functions and methods whose use of encodings is checked.
+#:
+#: .. versionadded:: 0.6.0
+CHECKED_CALLABLES: List[CheckedCallable] = [
+		CheckedCallable(
+				("builtins.open", "io.open"),
+				_open_parameters,
+				ENC001,
+				ENC002,
+				_open_text_mode,
+				ENC003,
+				ENC004,
+				),
+		CheckedCallable(
+				tuple(f"{class_name}.read" for class_name in sorted(_configparser_classes)),
+				_configparser_read_parameters,
+				ENC011,
+				ENC012,
+				method=True,
+				),
+		CheckedCallable(
+				tuple(f"{class_name}.open" for class_name in sorted(_pathlib_classes)),
+				_pathlib_open_parameters,
+				ENC021,
+				ENC022,
+				_open_text_mode,
+				method=True,
+				),
+		CheckedCallable(
+				tuple(f"{class_name}.read_text" for class_name in sorted(_pathlib_classes)),
+				_pathlib_read_text_parameters,
+				ENC023,
+				ENC024,
+				method=True,
+				),
+		CheckedCallable(
+				tuple(f"{class_name}.write_text" for class_name in sorted(_pathlib_classes)),
+				_pathlib_write_text_parameters,
+				ENC025,
+				ENC026,
+				method=True,
+				),
+		CheckedCallable(
+				("tempfile.TemporaryFile", ),
+				_tempfile_parameters,
+				ENC031,
+				ENC032,
+				_binary_default_mode,
+				keyword_parameters=_tempfile_keyword_parameters,
+				),
+		CheckedCallable(
+				("tempfile.NamedTemporaryFile", ),
+				_named_tempfile_parameters,
+				ENC033,
+				ENC034,
+				_binary_default_mode,
+				keyword_parameters=_tempfile_keyword_parameters,
+				),
+		CheckedCallable(
+				("tempfile.SpooledTemporaryFile", ),
+				_spooled_tempfile_parameters,
+				ENC035,
+				ENC036,
+				_binary_default_mode,
+				keyword_parameters=_tempfile_keyword_parameters,
+				),
+		# run() and check_output() pass their positional arguments on to Popen().
+		CheckedCallable(
+				("subprocess.run", ),
+				_popen_parameters,
+				ENC041,
+				ENC042,
+				_subprocess_text_mode,
+				keyword_parameters=_popen_keyword_parameters,
+				),
+		CheckedCallable(
+				("subprocess.Popen", ),
+				_popen_parameters,
+				ENC043,
+				ENC044,
+				_subprocess_text_mode,
+				keyword_parameters=_popen_keyword_parameters,
+				),
+		CheckedCallable(
+				("subprocess.check_output", ),
+				_popen_parameters,
+				ENC045,
+				ENC046,
+				_subprocess_text_mode,
+				keyword_parameters=_popen_keyword_parameters,
+				),
+		CheckedCallable(("logging.FileHandler", ), _file_handler_parameters, ENC051, ENC052),
+		CheckedCallable(
+				("logging.basicConfig", ),
+				(),
+				ENC053,
+				ENC054,
+				_basic_config_text_mode,
+				keyword_parameters=_basic_config_keyword_parameters,
+				),
+		CheckedCallable(("io.TextIOWrapper", ), _text_io_wrapper_parameters, ENC061, ENC062),
+		CheckedCallable(("codecs.open", ), _codecs_open_parameters, ENC071, ENC072, _open_text_mode),
+		]
+
+if sys.version_info >= (3, 10):  # pragma: no cover (<py310)
+	# The encoding argument was added in Python 3.10.
+	CHECKED_CALLABLES.extend([
+			CheckedCallable(
+					("fileinput.input", ),
+					_fileinput_parameters,
+					ENC081,
+					ENC082,
+					_fileinput_text_mode,
+					keyword_parameters=_fileinput_keyword_parameters,
+					),
+			CheckedCallable(
+					("fileinput.FileInput", ),
+					_fileinput_parameters,
+					ENC083,
+					ENC084,
+					_fileinput_text_mode,
+					keyword_parameters=_fileinput_keyword_parameters,
+					),
+			])
+
+# Dispatch tables compiled from CHECKED_CALLABLES, so finding the check for a call is a single dictionary lookup.
+# Functions are keyed by bare name (for builtins), by (module, function) and by their fully qualified name.
+# Methods are keyed by (class, method).
+_functions_by_name: Dict[str, CheckedCallable] = {}
+_functions_by_attribute: Dict[Tuple[str, str], CheckedCallable] = {}
+_functions_by_qualname: Dict[str, CheckedCallable] = {}
+_methods: Dict[Tuple[str, str], CheckedCallable] = {}
+
+for _checked in CHECKED_CALLABLES:
+	for _qualname in _checked.names:
+		_owner, _attr = _qualname.rsplit('.', 1)
+
+		if _checked.method:
+			_methods[(_owner, _attr)] = _checked
+			continue
+
+		_functions_by_qualname[_qualname] = _checked
+		_functions_by_attribute[(_owner, _attr)] = _checked
+
+		if _owner == "builtins":
+			_functions_by_name[_attr] = _checked
+
+del _checked, _qualname, _owner, _attr
+
+# Only calls to methods with these names can be reported by the ClassVisitor,
+# so type inference is skipped for every other method call.
+_inferred_methods = frozenset(method_name for _, method_name in _methods)
+_checked_classes = frozenset(class_name for class_name, _ in _methods)
+_checked_modules = frozenset(module for module, _ in _functions_by_attribute)
+
+# The codes of every error which can be reported.
+_codes = frozenset(code for checked in CHECKED_CALLABLES for code in checked.codes)
+
+# The codes which could be reported for calls to methods with each name, whatever the class.
+# Calls on lines where "# noqa" suppresses all of these are not inferred.
+_inferred_method_codes: Dict[str, FrozenSet[str]] = {}
+
+for (_, _attr), _checked in _methods.items():
+	_inferred_method_codes[_attr] = _inferred_method_codes.get(_attr, frozenset()).union(_checked.codes)
+
+del _attr, _checked
+
+# A checked call can only be made on a line containing the name of a checked function or method,
+# or a name one of them has been bound to. Lines containing ":=" may rebind names the visitors track.
+_candidate_names = frozenset({*_functions_by_name, *(attr for _, attr in _functions_by_attribute), *_inferred_methods})
+_alias_re = re.compile(r"\s+as\s+(\w+)")
+_name_assignment_re = re.compile(r"\s*(\w+)\s*(?::[^=]+)?=\s*(?:\w+\s*\.\s*)*\w+\s*(?:#.*)?$")
+
+
+def get_checked_function(node: ast.Call) -> Optional[CheckedCallable]:
+	"""
+	Returns the :class:`~.CheckedCallable` for the function called by the given AST node, if it is checked.
 
-		# print(node.lineno, node.col_offset)
-		# print(node.args, node.keywords)
-		# print(kwargs_from_node(node))
+	This is determined from the syntax alone, e.g. ``open(...)``, ``io.open(...)`` and ``subprocess.run(...)``,
+	but not for functions imported under another name.
 
-		unknown_mode = False
+	.. versionadded:: 0.6.0
 
-		if "mode" in kwargs:
-			is_binary = mode_is_binary(kwargs["mode"])
+	:param node:
+	"""
 
-			if is_binary:
-				return
-			elif is_binary is None:
-				unknown_mode = True
+	func = node.func
 
-		if "encoding" not in kwargs:
-			self.report_error(node, ENC003 if unknown_mode else ENC001)
+	if isinstance(func, ast.Name):
+		return _functions_by_name.get(func.id)
 
-		elif isinstance(kwargs["encoding"], _constant_nameconstant):
-			if kwargs["encoding"].value is None:
-				self.report_error(node, ENC004 if unknown_mode else ENC002)
+	elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+		return _functions_by_attribute.get((func.value.id, func.attr))
 
-	check_encoding = check_open_encoding  # deprecated
+	return None
 
-	def visit_Call(self, node: ast.Call) -> None:  # noqa: D102
 
-		if isinstance(node.func, ast.Name):
+def get_checked_method(class_name: str, method_name: str) -> Optional[CheckedCallable]:
+	"""
+	Returns the :class:`~.CheckedCallable` for the given method, if it is checked.
 
-			if node.func.id == "open":
-				# print(node.func.id)
-				self.check_encoding(node)
-				return
+	.. versionadded:: 0.6.0
 
-		elif isinstance(node.func, ast.Attribute):
-			if isinstance(node.func.value, ast.Name):
+	:param class_name: The fully qualified name of the class the method belongs to.
+	:param method_name:
+	"""
 
-				if node.func.value.id in {"builtins", "io"} and node.func.attr == "open":
-					self.check_open_encoding(node)
-					return
+	return _methods.get((class_name, method_name))
 
-			if not _skip_312_deprecations:  # pragma: no cover (py312+)
-				if isinstance(node.func.value, ast.Str):  # pragma: no cover
-					# Attribute on a string
-					return self.generic_visit(node)
 
-			if isinstance(node.func.value, ast.BinOp):  # pragma: no cover
-				# TODO
-				# Expressions such as (tmp_pathplus / "code.py").write_text(example_source)
-				return self.generic_visit(node)
+class _TrackedType(NamedTuple):
+	# The type of a variable, as tracked by the TypeTrackingVisitor.
 
-			elif isinstance(node.func.value, ast.Subscript):  # pragma: no cover
-				# TODO
-				# Expressions such as my_list[0].run()
-				return self.generic_visit(node)
+	#: The fully qualified name of the module or class, e.g. ``'pathlib.Path'``.
+	name: str
 
-		self.generic_visit(node)
+	#: Whether this is an instance of the class, rather than the class or module itself.
+	instance: bool
 
 
-class ClassVisitor(Visitor):  # pragma: no cover (py313+)
+class _ClassScope(dict):
+	# The names defined in the body of a class, which (unlike those of functions) are not visible in nested scopes.
+	pass
+
+
+class _ComprehensionScope(dict):
+	# The names bound by the "for" clauses of a comprehension, which are not visible outside it.
+	pass
+
+
+class Visitor(flake8_helper.Visitor):
 	"""
-	AST visitor to identify incorrect use of encodings,
-	with support for :class:`pathlib.Path` and :class:`configparser.ConfigParser`.
+	AST visitor to identify incorrect use of encodings.
 
-	.. versionadded:: 0.4.0
-	"""  # noqa: D400
+	.. versionchanged:: 0.4.0
+
+		The functionality for checking classes has moved to the :class:`~.ClassVisitor` subclass.
+	"""
+
+	#: If not :py:obj:`None`, where to record timings and counters for :option:`--encodings-stats`.
+	#:
+	#: .. versionadded:: 0.6.0
+	stats: Optional["Stats"] = None
+
+	#: If not :py:obj:`None`, only calls which span at least one of these line numbers are checked.
+	#:
+	#: .. versionadded:: 0.6.0
+	changed_lines: Optional[Collection[int]] = None
+
+	#: If not :py:obj:`None`, the sorted numbers of the only lines on which errors can be reported,
+	#: as returned by :func:`~.find_candidate_lines`. Expressions, functions and classes which
+	#: do not span any of these lines are not visited.
+	#:
+	#: .. versionadded:: 0.6.0
+	candidate_lines: Optional[Sequence[int]] = None
+
+	#: If not :py:obj:`None`, the codes suppressed by ``# noqa`` comments on each line,
+	#: as returned by :func:`~.find_suppressed_lines`.
+	#: Types are not inferred for method calls whose errors would all be suppressed.
+	#:
+	#: .. versionadded:: 0.6.0
+	suppressed_lines: Optional["SuppressedLines"] = None
+
+	# The nodes which are not visited if they do not span any of the candidate lines.
+	# Names being assigned to are always visited, as the visitors track them.
+	_prunable_nodes: Tuple[Type[ast.AST], ...] = (ast.expr, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
 
 	def __init__(self):
-		try:
-			# 3rd party
-			import jedi
-		except ImportError as e:
-			exc = e.__class__("This class requires 'jedi' to be installed but it could not be imported.")
-			exc.__traceback__ = e.__traceback__
-			raise exc from None
+		# this package
+		from flake8_encodings.records import ErrorRecords
 
 		super().__init__()
-		self.filename = PathPlus("<unknown>")
-		self.jedi_script = jedi.Script('')
 
-	def first_visit(self, node: ast.AST, filename: PathPlus) -> None:
+		#: The errors identified by the visitor.
+		#:
+		#: .. versionchanged:: 0.6.0  Changed from a list of tuples to :class:`~.ErrorRecords`.
+		self.errors: "ErrorRecords" = ErrorRecords()  # type: ignore[assignment]
+
+		# Checked functions and their modules imported under other names, e.g. "from subprocess import run".
+		# Maps the name they are bound to to their fully qualified names.
+		self._imported_names: Dict[str, str] = {}
+
+	def _bind_arguments(self, node: ast.Call, checked: CheckedCallable) -> Dict[str, ast.AST]:
+		if self.stats is None:
+			return bind_arguments(node, checked.parameters, checked.keyword_parameters)
+
+		with self.stats.timer("bind_arguments"):
+			return bind_arguments(node, checked.parameters, checked.keyword_parameters)
+
+	def iter_errors(self, node: ast.AST) -> Iterator[Tuple[int, int, str]]:
 		"""
-		Like :meth:`ast.NodeVisitor.visit`, but configures type inference.
+		Visit the given AST node, yielding errors as they are found.
 
-		.. versionadded:: 0.2.0
+		A module is visited one top-level statement at a time, and the errors found in each are yielded
+		(and removed from :attr:`~.Visitor.errors`) before the next statement is visited.
+		If the caller stops iterating, the remainder of the module is not visited.
+
+		.. versionadded:: 0.6.0
 
 		:param node:
-		:param filename: The path to Python source file the AST node was generated from.
 		"""
 
-		# 3rd party
-		import jedi  # nodep
+		statements: List[ast.AST] = list(node.body) if isinstance(node, ast.Module) else [node]
 
-		self.filename = PathPlus(filename)
-		self.jedi_script = jedi.Script(self.filename.read_text(), path=self.filename)
-		self.visit(node)
+		for statement in statements:
+			self.visit(statement)
 
-	def check_configparser_encoding(self, node: ast.Call) -> None:
+			if self.errors:
+				yield from self.errors
+				self.errors.clear()
+
+	def report_error(self, node: ast.AST, error: str) -> None:  # noqa: D102
+		# Not every AST node has a position, but only expressions and statements are reported.
+		self.errors.add(getattr(node, "lineno"), getattr(node, "col_offset"), error)
+
+	def visit(self, node: ast.AST) -> Any:  # noqa: D102
+		if (
+				self.candidate_lines is not None and isinstance(node, self._prunable_nodes)
+				and not isinstance(getattr(node, "ctx", None), (ast.Store, ast.Del))
+				and not self.may_report(node)
+				):
+			# Nothing within this node can be reported.
+			return None
+
+		return super().visit(node)
+
+	def may_report(self, node: ast.AST) -> bool:
 		"""
-		Check the call represented by the given AST node is using encodings correctly.
+		Returns whether errors could be reported for the given AST node or any of its children.
 
-		This function checks :meth:`configparser.ConfigParser.read`.
+		This is determined from :attr:`~.Visitor.candidate_lines`. If that is not set,
+		or the node doesn't record where it ends (on Python 3.7), this always returns :py:obj:`True`.
 
-		.. versionadded:: 0.2.0
+		.. versionadded:: 0.6.0
 
 		:param node:
 		"""
 
-		kwargs = kwargs_from_node(node, _configparser_read)
+		end = getattr(node, "end_lineno", None)
 
-		if "encoding" not in kwargs:
-			self.report_error(node, ENC011)
+		if self.candidate_lines is None or end is None:
+			return True
 
-		elif isinstance(kwargs["encoding"], _constant_nameconstant):
-			if kwargs["encoding"].value is None:
-				self.report_error(node, ENC012)
+		start = node.lineno  # type: ignore[attr-defined]
+		for decorator in getattr(node, "decorator_list", ()):
+			start = min(start, decorator.lineno)
 
-	def check_pathlib_encoding(self, node: ast.Call, method_name: str) -> None:
+		index = bisect_left(self.candidate_lines, start)
+		return index < len(self.candidate_lines) and self.candidate_lines[index] <= end
+
+	def is_suppressed(self, node: ast.AST, codes: Collection[str]) -> bool:
 		"""
-		Check the call represented by the given AST node is using encodings correctly.
+		Returns whether errors with every one of the given codes would be suppressed by a ``# noqa`` comment
+		if reported for the given AST node.
 
-		This function checks :meth:`pathlib.Path.open`, :meth:`pathlib.Path.read_text`,
-		and :meth:`pathlib.Path.write_text`.
+		.. versionadded:: 0.6.0
 
-		.. versionadded:: 0.3.0
+		:param node:
+		:param codes: e.g. ``['ENC021', 'ENC022']``.
+		"""
+
+		if self.suppressed_lines is None:
+			return False
+
+		# this package
+		from flake8_encodings.noqa import is_suppressed
+
+		return is_suppressed(self.suppressed_lines, node.lineno, codes)  # type: ignore[attr-defined]
+
+	def is_changed(self, node: ast.AST) -> bool:
+		"""
+		Returns whether the given AST node spans any of the :attr:`~.Visitor.changed_lines`.
+
+		.. versionadded:: 0.6.0
 
 		:param node:
-		:param method_name:
 		"""
 
-		function: Callable
-
-		if method_name == "open":
-			no_encoding = ENC021
-			encoding_none = ENC022
-			function = _pathlib_open
-		elif method_name == "read_text":
-			no_encoding = ENC023
-			encoding_none = ENC024
-			function = _pathlib_read_text
-		elif method_name == "write_text":
-			no_encoding = ENC025
-			encoding_none = ENC026
-			function = _pathlib_write_text
-		else:  # pragma: no cover
-			# Not a method we understand
+		return self.changed_lines is None or spans_lines(node, self.changed_lines)
+
+	def check_call(self, node: ast.Call, checked: CheckedCallable) -> None:
+		"""
+		Check the call represented by the given AST node is using encodings correctly.
+
+		.. versionadded:: 0.6.0
+
+		:param node:
+		:param checked: The function or method being called.
+		"""
+
+		if not self.is_changed(node):
 			return
 
-		kwargs = kwargs_from_node(node, function)
+		kwargs = self._bind_arguments(node, checked)
 
-		unknown_mode = False
+		text_mode = checked.text_mode(kwargs)
 
-		if "mode" in kwargs:
-			is_binary = mode_is_binary(kwargs["mode"])
+		no_encoding: Optional[str]
+		encoding_none: Optional[str]
 
-			if is_binary:
-				return
-			elif is_binary is None:  # pragma: no cover
-				# TODO: unknown mode
-				unknown_mode = True
-				return
+		if text_mode:
+			no_encoding, encoding_none = checked.no_encoding, checked.encoding_none
+		elif text_mode is None:
+			no_encoding, encoding_none = checked.unknown_mode_no_encoding, checked.unknown_mode_encoding_none
+		else:
+			# Binary mode
+			return
+
+		if no_encoding is None:
+			# An unknown mode, which isn't reported for this callable
+			return
 
 		if "encoding" not in kwargs:
 			self.report_error(node, no_encoding)
 
 		elif isinstance(kwargs["encoding"], _constant_nameconstant):
-			if kwargs["encoding"].value is None:
+			if kwargs["encoding"].value is None and encoding_none is not None:
 				self.report_error(node, encoding_none)
 
-	def visit_Call(self, node: ast.Call) -> None:  # noqa: D102
+	def check_open_encoding(self, node: ast.Call) -> None:
+		"""
+		Check the call represented by the given AST node is using encodings correctly.
 
-		if isinstance(node.func, ast.Name):
+		This function checks :func:`open`, :func:`builtins.open <open>` and :func:`io.open`.
 
-			if node.func.id == "open":
-				# print(node.func.id)
-				self.check_encoding(node)
-				return
+		.. versionchanged:: 0.2.0  Renamed from ``check_encoding``
 
-		elif isinstance(node.func, ast.Attribute):
-			if isinstance(node.func.value, ast.Name):
+		:param node:
+		"""
 
-				if node.func.value.id in {"builtins", "io"} and node.func.attr == "open":
-					self.check_open_encoding(node)
-					return
+		self.check_call(node, _functions_by_name["open"])
 
-			if not _skip_312_deprecations:  # pragma: no cover (py312+)
-				if isinstance(node.func.value, ast.Str):  # pragma: no cover
-					# Attribute on a string
-					return self.generic_visit(node)
+	check_encoding = check_open_encoding  # deprecated
 
-			if isinstance(node.func.value, ast.BinOp):  # pragma: no cover
-				# TODO
-				# Expressions such as (tmp_pathplus / "code.py").write_text(example_source)
-				return self.generic_visit(node)
+	def check_configparser_encoding(self, node: ast.Call) -> None:
+		"""
+		Check the call represented by the given AST node is using encodings correctly.
 
-			elif isinstance(node.func.value, ast.Subscript):  # pragma: no cover
-				# TODO
-				# Expressions such as my_list[0].run()
-				return self.generic_visit(node)
+		This function checks :meth:`configparser.ConfigParser.read`.
 
-			elif self.filename.as_posix() == "<unknown>":
-				# no jedi source (run with .visit() or from memory)
-				return self.generic_visit(node)
+		.. versionadded:: 0.2.0
+		.. versionchanged:: 0.6.0  Moved from :class:`~.ClassVisitor`.
 
-			else:
+		:param node:
+		"""
 
-				try:
-					inferred_types = get_inferred_types(self.jedi_script, node)
-					method_name = tuple(get_attribute_name(node.func))[-1]
-				except NotImplementedError:  # pragma: no cover
-					return self.generic_visit(node)
+		self.check_call(node, _methods[("configparser.ConfigParser", "read")])
 
-				for class_name in inferred_types:
-					if is_configparser_read(class_name, method_name):
-						self.check_configparser_encoding(node)
+	def check_pathlib_encoding(self, node: ast.Call, method_name: str) -> None:
+		"""
+		Check the call represented by the given AST node is using encodings correctly.
 
-					elif is_pathlib_method(class_name, method_name):
-						self.check_pathlib_encoding(node, method_name)
+		This function checks :meth:`pathlib.Path.open`, :meth:`pathlib.Path.read_text`,
+		and :meth:`pathlib.Path.write_text`.
 
-		self.generic_visit(node)
+		.. versionadded:: 0.3.0
+		.. versionchanged:: 0.6.0  Moved from :class:`~.ClassVisitor`.
 
+		:param node:
+		:param method_name:
+		"""
 
-class Plugin(flake8_helper.Plugin[Visitor]):
-	"""
-	A Flake8 plugin to identify incorrect use of encodings.
+		checked = get_checked_method("pathlib.Path", method_name)
 
-	:param tree: The abstract syntax tree (AST) to check.
-	:param filename:
-	"""
+		if checked is not None:
+			self.check_call(node, checked)
 
-	name: str = __name__
-	version: str = __version__  #: The plugin version
-	visitor_class = Visitor
+	def check_method_encoding(self, node: ast.Call, class_name: str) -> None:
+		"""
+		Check the method call represented by the given AST node is using encodings correctly.
 
-	def __init__(self, tree: ast.AST, filename: PathLike):
-		super().__init__(tree)
-		self.filename = PathPlus(filename)
+		The check applied depends on the class the method belongs to.
+		Calls to methods which are not checked are ignored.
 
-	def run(self) -> Iterator[Tuple[int, int, str, Type["Plugin"]]]:  # noqa: D102
+		.. versionadded:: 0.6.0
 
-		try:  # pragma: no cover (py313+)
-			# 3rd party
-			import jedi
+		:param node:
+		:param class_name: The name of the class the method belongs to, e.g. ``'pathlib.Path'``.
+		"""
 
-			# jedi.settings.fast_parser = False
+		checked = get_checked_method(class_name, node.func.attr)  # type: ignore[attr-defined]
 
-			original_cache_dir = jedi.settings.cache_directory
+		if checked is not None:
+			self.check_call(node, checked)
 
-			with tempfile.TemporaryDirectory() as cache_directory:
-				jedi.settings.cache_directory = cache_directory
+	def get_checked_function(self, node: ast.Call) -> Optional[CheckedCallable]:
+		"""
+		Returns the :class:`~.CheckedCallable` for the function called by the given AST node, if it is checked.
 
-				class_visitor = ClassVisitor()
-				class_visitor.first_visit(self._tree, self.filename)
+		Unlike the module-level :func:`~.get_checked_function` this also identifies functions
+		imported under another name earlier in the module, e.g. ``from subprocess import run``.
 
-				for line, col, msg in class_visitor.errors:
-					yield line, col, msg, type(self)
+		.. versionadded:: 0.6.0
 
-			jedi.settings.cache_directory = original_cache_dir
+		:param node:
+		"""
 
-		except ImportError:
-			visitor = Visitor()
-			visitor.visit(self._tree)
+		checked = get_checked_function(node)
 
-			for line, col, msg in visitor.errors:
-				yield line, col, msg, type(self)
+		if checked is None and self._imported_names:
+			func = node.func
 
+			if isinstance(func, ast.Name) and func.id in self._imported_names:
+				checked = _functions_by_qualname.get(self._imported_names[func.id])
 
-def is_configparser_read(class_name: str, method_name: str) -> bool:  # pragma: no cover (py313+)
-	"""
-	Returns :py:obj:`True` if method is :meth:`configparser.ConfigParser.read` or
-	:meth:`configparser.RawConfigParser.read`.
+			elif (
+					isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+					and func.value.id in self._imported_names
+					):
+				checked = _functions_by_qualname.get(f"{self._imported_names[func.value.id]}.{func.attr}")
 
-	.. versionadded:: 0.3.0
+		return checked
 
-	:param class_name: The inferred name of the class the method belongs to.
-	:param method_name: The name of the record.
-	"""  # noqa: D400
+	def visit_Import(self, node: ast.Import) -> None:  # noqa: D102
+		for alias in node.names:
+			if alias.asname and alias.name in _checked_modules:
+				self._imported_names[alias.asname] = alias.name
+			else:
+				self._imported_names.pop(alias.asname or alias.name.split('.', 1)[0], None)
 
-	if class_name not in {"configparser.ConfigParser", "configparser.RawConfigParser"}:
-		return False
+	def visit_ImportFrom(self, node: ast.ImportFrom) -> None:  # noqa: D102
+		for alias in node.names:
+			qualname = f"{node.module}.{alias.name}"
 
-	if method_name != "read":
-		return False
+			if node.module and not node.level and qualname in _functions_by_qualname:
+				self._imported_names[alias.asname or alias.name] = qualname
+			else:
+				self._imported_names.pop(alias.asname or alias.name, None)
 
-	return True
+	def visit_Name(self, node: ast.Name) -> None:  # noqa: D102
+		if not isinstance(node.ctx, ast.Load):
+			# e.g. "run = ...", which replaces "from subprocess import run"
+			self._imported_names.pop(node.id, None)
 
+	def visit_ClassDef(self, node: ast.ClassDef) -> None:  # noqa: D102
+		# e.g. "class run: ...", which replaces "from subprocess import run"
+		self._imported_names.pop(node.name, None)
+		self.generic_visit(node)
 
-def is_pathlib_method(class_name: str, method_name: str) -> bool:  # pragma: no cover (py313+)
-	"""
-	Returns :py:obj:`True` if method is :meth:`pathlib.Path.open`,
-	:meth:`read_text() <pathlib.Path.read_text>` or :meth:`write_text() <pathlib.Path.write_text>`.
+	def _visit_function(self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda]) -> None:
+		if not isinstance(node, ast.Lambda):
+			# e.g. "def run(): ...", which replaces "from subprocess import run"
+			self._imported_names.pop(node.name, None)
 
-	.. versionadded:: 0.3.0
+		if not self._imported_names:
+			self.generic_visit(node)
+			return
 
-	:param class_name: The inferred name of the class the method belongs to.
-	:param method_name: The name of the record.
-	"""  # noqa: D400
+		# Local variables of a function hide imports with the same name within it,
+		# and anything imported within it is forgotten when it ends.
+		imported_names = self._imported_names
+		bound_names = get_bound_names(node)
+		self._imported_names = {name: qualname for name, qualname in imported_names.items() if name not in bound_names}
 
-	if class_name not in {"pathlib.Path", "pathlib.WindowsPath", "pathlib.PosixPath"}:
-		return False
+		try:
+			self.generic_visit(node)
+		finally:
+			self._imported_names = imported_names
 
-	if method_name not in {"open", "read_text", "write_text"}:
-		return False
+	visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _visit_function
 
-	return True
+	def visit_Call(self, node: ast.Call) -> None:  # noqa: D102
 
+		checked = self.get_checked_function(node)
 
-def get_inferred_types(jedi_script: "Script", node: ast.Call) -> List[str]:  # pragma: no cover (py313+)
+		if checked is not None:
+			self.check_call(node, checked)
+
+		# The arguments may contain further calls to check, e.g. subprocess.run(cmd, input=open(...).read())
+		self.generic_visit(node)
+
+
+class ClassVisitor(Visitor):  # pragma: no cover (py313+)
+	"""
+	AST visitor to identify incorrect use of encodings,
+	with support for :class:`pathlib.Path` and :class:`configparser.ConfigParser`.
+
+	.. versionadded:: 0.4.0
+	.. versionchanged:: 0.6.0  Added the ``project`` and ``index`` arguments.
+
+	:param project: The ``jedi`` project to infer types within.
+		If not given, ``jedi`` determines the project for each file from its location.
+		Reusing the same project for many files avoids repeating that discovery.
+	:param index: The types of functions, attributes and globals defined in the project,
+		which are used in preference to ``jedi``'s type inference where possible.
+	"""  # noqa: D400
+
+	#: The names of the methods whose receivers' types are inferred.
+	#: Calls to methods which can only be reported with codes Flake8 has been configured to ignore need not be inferred.
+	#:
+	#: .. versionadded:: 0.6.0
+	inferred_methods: Collection[str] = _inferred_methods
+
+	#: The maximum time, in seconds, to spend inferring types in each file, or ``0`` for no limit.
+	#: Once it has been exceeded no further types are inferred in the file,
+	#: but the calls which do not need type inference are still checked.
+	#:
+	#: .. versionadded:: 0.6.0
+	time_budget: float = 0
+
+	#: The maximum time, in seconds, a single type inference may take, or ``0`` for no limit.
+	#: A call whose inference takes longer is still checked, but no further types are inferred in the file.
+	#:
+	#: .. versionadded:: 0.6.0
+	call_budget: float = 0
+
+	def __init__(self, project: Optional["Project"] = None, index: Optional["TypeIndex"] = None):
+		try:
+			# 3rd party
+			import jedi  # noqa: F401
+		except ImportError as e:
+			exc = e.__class__("This class requires 'jedi' to be installed but it could not be imported.")
+			exc.__traceback__ = e.__traceback__
+			raise exc from None
+
+		super().__init__()
+		self.filename = PathPlus("<unknown>")
+		self.project = project
+		self.index = index
+		self.jedi_script = _get_empty_script()
+
+		# The module being visited, and the fully qualified names of the names it imports, for the index.
+		self._module_name = ''
+		self._module_imports: Dict[str, str] = {}
+
+		# The function, class or module currently being visited.
+		self._scopes: List[ast.AST] = []
+
+		# Inferred classes, keyed by source position and by (scope, receiver name).
+		# jedi may infer several classes (e.g. for a variable assigned in both branches of an if statement),
+		# so every checked class is kept.
+		self._position_cache: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+		self._name_cache: Dict[Tuple[int, str], Tuple[str, ...]] = {}
+
+		# The keys added to the name cache in each branch of the control flow (e.g. the body of an if statement)
+		# currently being visited. These are removed when the branch has been visited,
+		# as a variable assigned in one branch may have a different type in the next.
+		self._branch_keys: List[Set[Tuple[int, str]]] = []
+
+		# The names bound in each function or class, keyed by the id of its node.
+		self._bound_names: Dict[int, FrozenSet[str]] = {}
+
+		#: Whether :attr:`~.ClassVisitor.time_budget` or :attr:`~.ClassVisitor.call_budget`
+		#: was exceeded in the file being visited.
+		#:
+		#: .. versionadded:: 0.6.0
+		self.over_budget = False
+
+		# The time spent inferring types in the file being visited.
+		self._inference_time = 0.0
+
+	def first_visit(self, node: ast.AST, filename: PathPlus, lines: Optional[Sequence[str]] = None) -> None:
+		"""
+		Like :meth:`ast.NodeVisitor.visit`, but configures type inference.
+
+		.. versionadded:: 0.2.0
+		.. versionchanged:: 0.6.0  Added the ``lines`` argument.
+
+		:param node:
+		:param filename: The path to Python source file the AST node was generated from.
+		:param lines: The lines of source code the AST node was generated from.
+			If not given the source is read from ``filename``.
+			This allows files which only exist in memory (e.g. from standard input) to be checked.
+		"""
+
+		self.prepare(node, filename, lines)
+		self.visit(node)
+
+	def prepare(
+			self,
+			node: ast.AST,
+			filename: PathPlus,
+			lines: Optional[Sequence[str]] = None,
+			inferable: Optional[bool] = None,
+			) -> None:
+		"""
+		Configure type inference for the given AST node, without visiting it.
+
+		This allows the errors to be obtained with :meth:`~.Visitor.iter_errors` rather than :meth:`~.visit`.
+
+		.. versionadded:: 0.6.0
+
+		:param node:
+		:param filename: The path to Python source file the AST node was generated from.
+		:param lines: The lines of source code the AST node was generated from.
+			If not given the source is read from ``filename``.
+		:param inferable: Whether the AST node contains any calls whose receivers need inferring,
+			as returned by :func:`~.has_inferable_calls`. Found from the node if not given.
+		"""
+
+		self.filename = PathPlus(filename)
+
+		if self.index is not None:
+			# this package
+			from flake8_encodings.index import get_module_name
+
+			self._module_name = get_module_name(self.filename)
+
+		if inferable is None:
+			inferable = has_inferable_calls(node, self.changed_lines, self.inferred_methods)
+
+		if inferable:
+			# 3rd party
+			import jedi  # nodep
+
+			if lines is None:
+				source = self.filename.read_text()
+			else:
+				source = ''.join(lines)
+
+			if self.stats is None:
+				self.jedi_script = jedi.Script(source, path=self.filename, project=self.project)
+			else:
+				with self.stats.timer("jedi_script"):
+					self.jedi_script = jedi.Script(source, path=self.filename, project=self.project)
+
+		self._position_cache.clear()
+		self._name_cache.clear()
+		self._branch_keys.clear()
+		self._module_imports.clear()
+		self._bound_names.clear()
+		self.over_budget = False
+		self._inference_time = 0.0
+
+	def release(self) -> None:
+		"""
+		Release the ``jedi`` script and the inferred types once the file has been visited.
+
+		.. versionadded:: 0.6.0
+		"""
+
+		self.jedi_script = _get_empty_script()
+		self._position_cache.clear()
+		self._name_cache.clear()
+
+	def visit_Call(self, node: ast.Call) -> None:  # noqa: D102
+
+		checked = self.get_checked_function(node)
+
+		if checked is not None:
+			self.check_call(node, checked)
+			return self.generic_visit(node)
+
+		if isinstance(node.func, ast.Attribute):
+			if not _skip_312_deprecations:  # pragma: no cover (py312+)
+				if isinstance(node.func.value, ast.Str):  # pragma: no cover
+					# Attribute on a string
+					return self.generic_visit(node)
+
+			if isinstance(node.func.value, ast.BinOp) and not isinstance(node.func.value.op, ast.Div):
+				# Of the binary operators only "/" can give a path, e.g. (tmp_pathplus / "code.py").write_text(...)
+				return self.generic_visit(node)
+
+			elif node.func.attr not in self.inferred_methods:
+				# Not a method which could be reported, so there is no need to infer the type.
+				return self.generic_visit(node)
+
+			elif self.jedi_script is _get_empty_script():
+				# no jedi source (run with .visit())
+				return self.generic_visit(node)
+
+			elif not self.is_changed(node):
+				# Outside the lines being checked, so there is no need to infer the type.
+				return self.generic_visit(node)
+
+			elif self.is_suppressed(node, _inferred_method_codes[node.func.attr]):
+				# Any error would be suppressed by a noqa comment, so there is no need to infer the type.
+				if self.stats is not None:
+					self.stats.count("noqa_skipped")
+				return self.generic_visit(node)
+
+			else:
+
+				try:
+					class_name = self.infer_receiver_class(node)
+				except NotImplementedError:  # pragma: no cover
+					return self.generic_visit(node)
+
+				if class_name is not None:
+					self.check_method_encoding(node, class_name)
+
+		self.generic_visit(node)
+
+	def infer_receiver_class(self, node: ast.Call) -> Optional[str]:
+		"""
+		Returns the name of the checked class the object whose method is being called is an instance of.
+
+		Returns :py:obj:`None` if the type could not be inferred or is not one of the checked classes.
+
+		The receiver is only inferred once for each position in the file,
+		and once for each variable name (e.g. ``cfg``) in each function, until that variable is reassigned.
+
+		For paths built with the ``/`` operator (e.g. ``(tmp_path / "code.py").write_text()``)
+		only the variables being divided are inferred, until one is found to be a path,
+		as dividing a path gives another path of the same class.
+		Likewise for paths built with the methods and properties in :mod:`flake8_encodings.stdlib_types`,
+		such as ``p.with_suffix(".txt").open()``.
+
+		.. versionadded:: 0.6.0
+
+		:param node:
+
+		:raises NotImplementedError: if the receiver is an unsupported expression.
+		"""
+
+		receiver = node.func.value  # type: ignore[attr-defined]
+		method_name = node.func.attr  # type: ignore[attr-defined]
+
+		def has_method(class_name: str) -> bool:
+			return get_checked_method(class_name, method_name) is not None
+
+		if isinstance(receiver, ast.BinOp):
+			operands = get_path_operands(receiver)
+
+			for operand in operands:
+				if not isinstance(operand, ast.Name):
+					# e.g. Path.home() / name, which is left to jedi to infer as a whole.
+					break
+
+				position = (operand.lineno, operand.col_offset + len(operand.id))
+				class_name = self._infer_class(
+						position,
+						(self._scope_id(), operand.id),
+						lambda class_name: class_name in _pathlib_classes and has_method(class_name),
+						)
+
+				if class_name is not None:
+					return class_name
+
+			else:
+				if operands:
+					# None of the variables are paths.
+					return None
+
+		if is_path_expression(receiver):
+			# e.g. p.with_suffix(".txt").open(), where only "p" needs to be inferred.
+			class_name = self._resolve_path(receiver)
+
+			if class_name is not None:
+				if self.stats is not None:
+					self.stats.count("stdlib_table_hits")
+				return class_name if class_name in _checked_classes else None
+
+		if self.index is not None:
+			indexed = self._resolve_indexed(receiver)
+
+			if indexed is not None and indexed[1]:
+				if self.stats is not None:
+					self.stats.count("type_index_hits")
+				return indexed[0] if indexed[0] in _checked_classes else None
+
+		position = get_receiver_position(node)
+
+		if isinstance(receiver, ast.Name):
+			return self._infer_class(position, (self._scope_id(), receiver.id), has_method)
+		else:
+			return self._infer_class(position, accept=has_method)
+
+	def _infer_class(
+			self,
+			position: Tuple[int, int],
+			name_key: Optional[Tuple[int, str]] = None,
+			accept: Optional[Callable[[str], bool]] = None,
+			) -> Optional[str]:
+		# Infer the checked class of the expression ending at the given position,
+		# optionally also caching the result for the given (scope, variable name).
+		# If the expression may be an instance of several classes, the first for which ``accept`` is true is returned.
+
+		for class_name in self._infer_classes(position, name_key):
+			if accept is None or accept(class_name):
+				return class_name
+
+		return None
+
+	def _infer_classes(self, position: Tuple[int, int], name_key: Optional[Tuple[int, str]] = None) -> Tuple[str, ...]:
+		# Infer the checked classes the expression ending at the given position may be an instance of.
+
+		if position in self._position_cache:
+			if self.stats is not None:
+				self.stats.count("inference_cache_hits")
+			return self._position_cache[position]
+
+		if name_key is not None and name_key in self._name_cache:
+			if self.stats is not None:
+				self.stats.count("inference_cache_hits")
+			return self._name_cache[name_key]
+
+		if self.over_budget:
+			return ()
+
+		start = time.perf_counter()
+
+		if self.stats is None:
+			inferred_names: List["Name"] = self.jedi_script.infer(*position)
+		else:
+			self.stats.count("inference_cache_misses")
+			with self.stats.timer("jedi_infer"):
+				inferred_names = self.jedi_script.infer(*position)
+
+		self._charge_budget(time.perf_counter() - start)
+
+		class_names = tuple(dict.fromkeys(
+				inferred_name.full_name for inferred_name in inferred_names if inferred_name.full_name in _checked_classes
+				))
+
+		self._position_cache[position] = class_names
+		if name_key is not None:
+			self._cache_name(name_key, class_names)
+
+		return class_names
+
+	def _cache_name(self, name_key: Tuple[int, str], class_names: Tuple[str, ...]) -> None:
+		self._name_cache[name_key] = class_names
+
+		if self._branch_keys:
+			self._branch_keys[-1].add(name_key)
+
+	def _visit_branch(self, statements: Sequence[ast.AST]) -> None:
+		# Visit one branch of the control flow, forgetting the names inferred in it afterwards.
+
+		self._branch_keys.append(set())
+
+		try:
+			for statement in statements:
+				self.visit(statement)
+		finally:
+			for name_key in self._branch_keys.pop():
+				self._name_cache.pop(name_key, None)
+
+	def _charge_budget(self, seconds: float) -> None:
+		# Record the time taken by an inference, and stop inferring types if the budget has been exceeded.
+		# jedi can't be interrupted, so the inference which exceeds the budget is allowed to finish.
+
+		self._inference_time += seconds
+
+		if (
+				(self.call_budget and seconds > self.call_budget)
+				or (self.time_budget and self._inference_time > self.time_budget)
+				):
+			self.over_budget = True
+
+			if self.stats is not None:
+				self.stats.count("inference_budget_exceeded")
+
+	def _resolve_path(self, node: ast.AST) -> Optional[str]:
+		# Returns the path class of the given expression, following the methods and properties
+		# in the stdlib table, so only the name the expression starts from is inferred by jedi.
+
+		# this package
+		from flake8_encodings.stdlib_types import (
+				CLASS_NAMES,
+				get_attribute_type,
+				get_method_return_type,
+				is_path_class
+				)
+
+		if isinstance(node, ast.Name):
+			position = (node.lineno, node.col_offset + len(node.id))
+			return self._infer_class(position, (self._scope_id(), node.id), is_path_class)
+
+		elif isinstance(node, ast.Call):
+			func = node.func
+
+			if isinstance(func, ast.Attribute) and func.attr in CLASS_NAMES:
+				# A constructor, e.g. pathlib.Path("foo.txt")
+				end_lineno: Optional[int] = getattr(func, "end_lineno", None)
+				end_col_offset: Optional[int] = getattr(func, "end_col_offset", None)
+				if end_lineno is None or end_col_offset is None:
+					return None
+				return self._infer_class((end_lineno, end_col_offset), accept=is_path_class)
+
+			elif isinstance(func, ast.Attribute):
+				base = self._resolve_path(func.value)
+				return None if base is None else get_method_return_type(base, func.attr)
+
+			else:
+				# A constructor, e.g. Path("foo.txt")
+				return self._resolve_path(func)
+
+		elif isinstance(node, ast.Attribute):
+			base = self._resolve_path(node.value)
+			return None if base is None else get_attribute_type(base, node.attr)
+
+		elif isinstance(node, ast.Subscript):
+			# e.g. p.parents[0]
+			return self._resolve_path_items(node.value)
+
+		elif isinstance(node, ast.BinOp):
+			for operand in get_path_operands(node):
+				class_name = self._resolve_path(operand)
+				if class_name is not None:
+					return class_name
+
+		return None
+
+	def _resolve_path_items(self, node: ast.AST) -> Optional[str]:
+		# Returns the path class of the items of the given iterable, e.g. p.glob("*.cfg")
+
+		# this package
+		from flake8_encodings.stdlib_types import get_item_type
+
+		if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+			base = self._resolve_path(node.func.value)
+			return None if base is None else get_item_type(base, node.func.attr, method=True)
+
+		elif isinstance(node, ast.Attribute):
+			base = self._resolve_path(node.value)
+			return None if base is None else get_item_type(base, node.attr, method=False)
+
+		return None
+
+	def _resolve_indexed(self, node: ast.AST) -> Optional[Tuple[str, bool]]:
+		# Look up the type of the given expression in the index.
+		# Returns the fully qualified name it refers to and whether that is an instance of the named class,
+		# or None if it isn't in the index.
+
+		index = self.index
+		assert index is not None
+
+		if isinstance(node, ast.Name):
+			if self._is_bound_locally(node.id):
+				# e.g. a parameter with the same name as a global, whose type jedi must infer.
+				return None
+
+			qualname = self._module_imports.get(node.id)
+
+			if qualname is None:
+				# Defined in this module
+				qualname = f"{self._module_name}.{node.id}"
+				if qualname not in index.returns and qualname not in index.values and qualname not in index.classes:
+					return None
+
+			value: Optional[Tuple[str, bool]] = None
+
+		elif isinstance(node, ast.Attribute):
+			value = self._resolve_indexed(node.value)
+			if value is None:
+				return None
+
+			qualname = f"{value[0]}.{node.attr}"
+			if value[1] and qualname in index.returns:
+				# A method of an instance
+				return qualname, False
+
+		elif isinstance(node, ast.Call):
+			func = self._resolve_indexed(node.func)
+			if func is None or func[1]:
+				return None
+
+			return_type = index.get_return_type(func[0])
+			return None if return_type is None else (return_type, True)
+
+		else:
+			return None
+
+		type_name = index.get_type(qualname)
+		if type_name is not None:
+			return type_name, True
+		elif value is not None and value[1]:
+			# An attribute of an instance which isn't in the index.
+			return None
+
+		return qualname, False
+
+	def visit_Import(self, node: ast.Import) -> None:  # noqa: D102
+		super().visit_Import(node)
+
+		if self.index is not None:
+			for alias in node.names:
+				if alias.asname:
+					self._module_imports[alias.asname] = alias.name
+				else:
+					top_level = alias.name.split('.', 1)[0]
+					self._module_imports[top_level] = top_level
+
+	def visit_ImportFrom(self, node: ast.ImportFrom) -> None:  # noqa: D102
+		super().visit_ImportFrom(node)
+
+		if self.index is not None:
+			# this package
+			from flake8_encodings.index import resolve_import
+
+			is_package = self.filename.name == "__init__.py"
+			module = resolve_import(node, self._module_name, is_package)
+
+			if module is not None:
+				for alias in node.names:
+					self._module_imports[alias.asname or alias.name] = f"{module}.{alias.name}"
+
+	def visit_Assign(self, node: ast.Assign) -> None:  # noqa: D102
+		self.generic_visit(node)
+
+		if self.index is not None and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+			# e.g. "path = data_dir()", so "path.read_text()" needn't be inferred.
+			indexed = self._resolve_indexed(node.value)
+
+			if indexed is not None and indexed[1]:
+				class_names = (indexed[0], ) if indexed[0] in _checked_classes else ()
+				self._cache_name((self._scope_id(), node.targets[0].id), class_names)
+
+	def visit_For(self, node: Union[ast.For, ast.AsyncFor]) -> None:  # noqa: D102
+		self.visit(node.iter)
+		self.visit(node.target)
+
+		if isinstance(node.target, ast.Name) and self.jedi_script is not _get_empty_script():
+			# e.g. "for f in root.glob('*.cfg')", so "f.read_text()" needn't be inferred.
+			if is_path_expression(node.iter, items=True) and self.may_report(node):
+				class_name = self._resolve_path_items(node.iter)
+
+				if class_name is not None:
+					self._cache_name(
+							(self._scope_id(), node.target.id),
+							(class_name, ) if class_name in _checked_classes else (),
+							)
+
+		self._visit_branch(node.body)
+		self._visit_branch(node.orelse)
+
+	visit_AsyncFor = visit_For
+
+	def visit_If(self, node: Union[ast.If, ast.While]) -> None:  # noqa: D102
+		self.visit(node.test)
+		self._visit_branch(node.body)
+		self._visit_branch(node.orelse)
+
+	visit_While = visit_If
+
+	def visit_With(self, node: Union[ast.With, ast.AsyncWith]) -> None:  # noqa: D102
+		for item in node.items:
+			self.visit(item)
+
+		self._visit_branch(node.body)
+
+	visit_AsyncWith = visit_With
+
+	def visit_Try(self, node: ast.Try) -> None:  # noqa: D102
+		self._visit_branch(node.body)
+
+		for handler in node.handlers:
+			self._visit_branch([handler])
+
+		self._visit_branch(node.orelse)
+		self._visit_branch(node.finalbody)
+
+	visit_TryStar = visit_Try
+
+	def visit_Match(self, node: ast.AST) -> None:  # noqa: D102
+		self.visit(node.subject)  # type: ignore[attr-defined]
+
+		for case in node.cases:  # type: ignore[attr-defined]
+			self._visit_branch([case])
+
+	def _scope_id(self) -> int:
+		return id(self._scopes[-1]) if self._scopes else 0
+
+	def _is_bound_locally(self, name: str) -> bool:
+		# Returns whether the given name refers to a local variable of the current function
+		# (or an enclosing one), rather than to a module global or import.
+
+		for depth, scope in enumerate(reversed(self._scopes)):
+			if isinstance(scope, ast.ClassDef) and depth:
+				# Names in a class body aren't visible to the functions defined in it.
+				continue
+
+			if id(scope) not in self._bound_names:
+				self._bound_names[id(scope)] = get_bound_names(scope)
+
+			if name in self._bound_names[id(scope)]:
+				return True
+
+		return False
+
+	def _visit_scope(self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef]) -> None:
+		self._scopes.append(node)
+		try:
+			if isinstance(node, ast.ClassDef):
+				super().visit_ClassDef(node)
+			else:
+				super()._visit_function(node)
+		finally:
+			self._scopes.pop()
+
+	visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = visit_ClassDef = _visit_scope
+
+	def visit_Name(self, node: ast.Name) -> None:  # noqa: D102
+		super().visit_Name(node)
+
+		if not isinstance(node.ctx, ast.Load):
+			# The variable may now refer to an object of a different type.
+			self._name_cache.pop((self._scope_id(), node.id), None)
+
+
+class TypeTrackingVisitor(Visitor):
+	"""
+	AST visitor to identify incorrect use of encodings,
+	with support for :class:`pathlib.Path` and :class:`configparser.ConfigParser`.
+
+	Unlike :class:`~.ClassVisitor` this does not require ``jedi``.
+	Instead the types of objects are tracked through the module by following imports,
+	constructor calls, assignments and annotated arguments.
+	This is much faster, but will not identify objects created in other modules.
+
+	.. versionadded:: 0.6.0
+	"""  # noqa: D400
+
+	# Statements are always visited, as they may bind names whose types are tracked.
+	_prunable_nodes = (ast.expr, )
+
+	def __init__(self):
+		super().__init__()
+
+		# Each scope maps a variable name to its type, or to None if the type is unknown.
+		self._scopes: List[Dict[str, Optional[_TrackedType]]] = [{}]
+
+	def resolve_type(self, node: ast.AST) -> Optional[str]:
+		"""
+		Returns the name of the checked class the expression represented by the given AST node is an instance of.
+
+		Returns :py:obj:`None` if the type could not be determined or is not one of the checked classes.
+
+		:param node:
+		"""
+
+		tracked_type = self._resolve(node)
+
+		if tracked_type is not None and tracked_type.instance:
+			return tracked_type.name
+
+		return None
+
+	def _lookup(self, name: str) -> Optional[_TrackedType]:
+		for depth, scope in enumerate(reversed(self._scopes)):
+			if depth and isinstance(scope, _ClassScope):
+				# Names in a class body are not visible to its methods.
+				continue
+
+			if name in scope:
+				return scope[name]
+
+		return None
+
+	def _resolve(self, node: ast.AST) -> Optional[_TrackedType]:
+		# this package
+		from flake8_encodings.stdlib_types import get_attribute_type, get_method_return_type
+
+		if isinstance(node, ast.Name):
+			return self._lookup(node.id)
+
+		elif isinstance(node, ast.Attribute):
+			value = self._resolve(node.value)
+			if value is not None and not value.instance:
+				# An attribute of a module, e.g. pathlib.Path
+				return _TrackedType(f"{value.name}.{node.attr}", instance=False)
+			elif value is not None:
+				# e.g. p.parent
+				class_name = get_attribute_type(value.name, node.attr)
+				if class_name is not None:
+					return _TrackedType(class_name, instance=True)
+
+		elif isinstance(node, ast.Call):
+			if isinstance(node.func, ast.Attribute):
+				# e.g. p.with_suffix(".txt"), or Path.home()
+				value = self._resolve(node.func.value)
+				class_name = None if value is None else get_method_return_type(value.name, node.func.attr)
+				if class_name is not None:
+					return _TrackedType(class_name, instance=True)
+
+			func = self._resolve(node.func)
+			if func is not None and not func.instance and func.name in _checked_classes:
+				return _TrackedType(func.name, instance=True)
+
+		elif isinstance(node, ast.Subscript):
+			# e.g. p.parents[0]
+			return self._resolve_items(node.value)
+
+		elif isinstance(node, ast.BinOp):
+			# Dividing a path gives another path of the same class, e.g. tmp_path / "code.py" or "src" / p
+			for operand in get_path_operands(node):
+				tracked_type = self._resolve(operand)
+				if tracked_type is not None and tracked_type.instance and tracked_type.name in _pathlib_classes:
+					return tracked_type
+
+		elif sys.version_info >= (3, 8) and isinstance(node, ast.NamedExpr):  # pragma: no cover (<py38)
+			# e.g. (p := Path("foo.txt")).read_text()
+			return self._resolve(node.value)
+
+		return None
+
+	def _resolve_items(self, node: ast.AST) -> Optional[_TrackedType]:
+		# The type of the items of the given iterable, e.g. p.glob("*.cfg")
+
+		# this package
+		from flake8_encodings.stdlib_types import get_item_type
+
+		if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+			value, name, method = self._resolve(node.func.value), node.func.attr, True
+		elif isinstance(node, ast.Attribute):
+			value, name, method = self._resolve(node.value), node.attr, False
+		else:
+			return None
+
+		if value is None or not value.instance:
+			return None
+
+		class_name = get_item_type(value.name, name, method)
+		return None if class_name is None else _TrackedType(class_name, instance=True)
+
+	def _resolve_annotation(self, annotation: Optional[ast.AST]) -> Optional[_TrackedType]:
+		if isinstance(annotation, _constant_nameconstant) and isinstance(annotation.value, str):
+			# String annotations, e.g. "Path"
+			try:
+				annotation = ast.parse(annotation.value, mode="eval").body
+			except SyntaxError:
+				return None
+
+		if annotation is None:
+			return None
+
+		tracked_type = self._resolve(annotation)
+		if tracked_type is not None and not tracked_type.instance and tracked_type.name in _checked_classes:
+			return _TrackedType(tracked_type.name, instance=True)
+
+		return None
+
+	def _bind(self, target: ast.AST, tracked_type: Optional[_TrackedType]) -> None:
+		if isinstance(target, ast.Name):
+			self._scopes[-1][target.id] = tracked_type
+		else:
+			# Any other names in the target (e.g. when unpacking a tuple) now have unknown types.
+			self.visit(target)
+
+	def visit_Import(self, node: ast.Import) -> None:  # noqa: D102
+		for alias in node.names:
+			if alias.asname:
+				self._scopes[-1][alias.asname] = _TrackedType(alias.name, instance=False)
+			else:
+				# "import a.b" binds the top level package "a".
+				top_level = alias.name.split('.', 1)[0]
+				self._scopes[-1][top_level] = _TrackedType(top_level, instance=False)
+
+	def visit_ImportFrom(self, node: ast.ImportFrom) -> None:  # noqa: D102
+		for alias in node.names:
+			if node.module and not node.level:
+				tracked_type: Optional[_TrackedType] = _TrackedType(f"{node.module}.{alias.name}", instance=False)
+			else:
+				tracked_type = None
+
+			self._scopes[-1][alias.asname or alias.name] = tracked_type
+
+	def visit_Assign(self, node: ast.Assign) -> None:  # noqa: D102
+		self.visit(node.value)
+		tracked_type = self._resolve(node.value)
+
+		for target in node.targets:
+			self._bind(target, tracked_type)
+
+	def visit_AnnAssign(self, node: ast.AnnAssign) -> None:  # noqa: D102
+		if node.value is not None:
+			self.visit(node.value)
+
+		tracked_type = self._resolve_annotation(node.annotation)
+		if tracked_type is None and node.value is not None:
+			tracked_type = self._resolve(node.value)
+
+		self._bind(node.target, tracked_type)
+
+	def visit_Name(self, node: ast.Name) -> None:  # noqa: D102
+		if not isinstance(node.ctx, ast.Load):
+			# Assigned to in some other way, e.g. with "with ... as".
+			self._scopes[-1][node.id] = None
+
+	def visit_For(self, node: Union[ast.For, ast.AsyncFor]) -> None:  # noqa: D102
+		self.visit(node.iter)
+		self._bind(node.target, self._resolve_items(node.iter))
+
+		for statement in [*node.body, *node.orelse]:
+			self.visit(statement)
+
+	visit_AsyncFor = visit_For
+
+	def visit_NamedExpr(self, node: "ast.NamedExpr") -> None:  # noqa: D102
+		self.visit(node.value)
+		tracked_type = self._resolve(node.value)
+
+		# In a comprehension the name is bound in the enclosing function or module.
+		for scope in reversed(self._scopes):
+			if not isinstance(scope, _ComprehensionScope):
+				scope[node.target.id] = tracked_type
+				break
+
+	def _visit_comprehension(self, node: Union[ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp]) -> None:
+		# The first iterable is evaluated in the enclosing scope.
+		self.visit(node.generators[0].iter)
+		self._scopes.append(_ComprehensionScope())
+
+		try:
+			for index, generator in enumerate(node.generators):
+				if index:
+					self.visit(generator.iter)
+
+				self._bind(generator.target, self._resolve_items(generator.iter))
+
+				for condition in generator.ifs:
+					self.visit(condition)
+
+			if isinstance(node, ast.DictComp):
+				self.visit(node.key)
+				self.visit(node.value)
+			else:
+				self.visit(node.elt)
+		finally:
+			self._scopes.pop()
+
+	visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = _visit_comprehension
+
+	def _visit_function(self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda]) -> None:
+		if not isinstance(node, ast.Lambda):
+			for decorator in node.decorator_list:
+				self.visit(decorator)
+			self._scopes[-1][node.name] = None
+
+		scope: Dict[str, Optional[_TrackedType]] = {}
+		args = node.args
+
+		for arg in [*getattr(args, "posonlyargs", ()), *args.args, *args.kwonlyargs]:
+			scope[arg.arg] = self._resolve_annotation(arg.annotation)
+
+		for arg in (args.vararg, args.kwarg):
+			if arg is not None:
+				scope[arg.arg] = None
+
+		for default in [*args.defaults, *args.kw_defaults]:
+			if default is not None:
+				self.visit(default)
+
+		self._scopes.append(scope)
+
+		try:
+			if isinstance(node, ast.Lambda):
+				self.visit(node.body)
+			else:
+				for statement in node.body:
+					self.visit(statement)
+		finally:
+			self._scopes.pop()
+
+	visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _visit_function
+
+	def visit_ClassDef(self, node: ast.ClassDef) -> None:  # noqa: D102
+		for expression in [*node.decorator_list, *node.bases, *node.keywords]:
+			self.visit(expression)
+
+		self._scopes[-1][node.name] = None
+		self._scopes.append(_ClassScope())
+
+		try:
+			for statement in node.body:
+				self.visit(statement)
+		finally:
+			self._scopes.pop()
+
+	def visit_Call(self, node: ast.Call) -> None:  # noqa: D102
+		if get_checked_function(node) is None:
+			# Checked functions imported under another name, e.g. "from io import open as io_open"
+			func = self._resolve(node.func)
+
+			if func is not None and func.name in _functions_by_qualname:
+				self.check_call(node, _functions_by_qualname[func.name])
+
+			elif isinstance(node.func, ast.Attribute) and node.func.attr in _inferred_methods:
+				class_name = self.resolve_type(node.func.value)
+
+				if class_name is not None:
+					self.check_method_encoding(node, class_name)
+
+		super().visit_Call(node)
+
+
+class Plugin(flake8_helper.Plugin[Visitor]):
+	"""
+	A Flake8 plugin to identify incorrect use of encodings.
+
+	:param tree: The abstract syntax tree (AST) to check.
+	:param filename:
+	:param lines: The lines of source code being checked. If not given the source is read from ``filename``.
+
+	.. versionchanged:: 0.6.0  Added the ``lines`` argument.
+	"""
+
+	name: str = __name__
+	version: str = __version__  #: The plugin version
+	visitor_class = Visitor
+
+	#: The directory ``jedi`` caches inferred types in.
+	#: If :py:obj:`None` a temporary directory is shared by all files checked in the process.
+	#:
+	#: .. versionadded:: 0.6.0
+	cache_dir: Optional[str] = os.environ.get(_CACHE_DIR_ENV_VAR) or None
+
+	#: The maximum size of :attr:`~.cache_dir`, in megabytes.
+	#:
+	#: .. versionadded:: 0.6.0
+	cache_size: int = _DEFAULT_CACHE_SIZE
+
+	#: The engine used to determine the types of objects whose methods are called.
+	#:
+	#: * ``'jedi'`` -- :class:`~.ClassVisitor`, which uses ``jedi`` for type inference.
+	#: * ``'ast'`` -- :class:`~.TypeTrackingVisitor`, which does not require ``jedi``.
+	#: * ``'auto'`` -- ``'jedi'`` if it is installed, otherwise ``'ast'``.
+	#:
+	#: .. versionadded:: 0.6.0
+	engine: str = "auto"
+
+	#: Whether to store the errors found in each file in a :class:`~.ResultCache`,
+	#: and skip checking files which have not changed since the previous run.
+	#:
+	#: .. versionadded:: 0.6.0
+	result_cache: bool = False
+
+	#: The directory to record statistics for :option:`--encodings-stats` in,
+	#: or :py:obj:`None` if statistics are not being collected.
+	#:
+	#: .. versionadded:: 0.6.0
+	stats_dir: Optional[PathPlus] = None
+
+	#: The root directory of the ``jedi`` project, which affects how imports are resolved.
+	#: If :py:obj:`None` the current working directory is used.
+	#:
+	#: .. versionadded:: 0.6.0
+	project_root: Optional[str] = None
+
+	#: The Python environment ``jedi`` should infer types in.
+	#: If :py:obj:`None` the active virtual environment (or the current interpreter) is used.
+	#:
+	#: .. versionadded:: 0.6.0
+	environment_path: Optional[str] = None
+
+	#: If not :py:obj:`None`, only errors on these lines of each file are reported.
+	#: Files which are not in the mapping are not checked at all.
+	#:
+	#: .. versionadded:: 0.6.0
+	changed_lines: Optional["ChangedLines"] = None
+
+	#: The types of functions, attributes and globals defined in the project,
+	#: used by the :class:`~.ClassVisitor` in preference to ``jedi``'s type inference.
+	#:
+	#: .. versionadded:: 0.6.0
+	type_index: Optional["TypeIndex"] = None
+
+	#: An index of the modules in :attr:`~.project_root`, used when ``jedi`` is used without the :attr:`~.type_index`
+	#: to find the modules each file depends on for the keys of the :attr:`~.result_cache`,
+	#: as the types ``jedi`` infers depend on the modules a file imports.
+	#:
+	#: .. versionadded:: 0.6.0
+	dependency_index: Optional["TypeIndex"] = None
+
+	#: The maximum number of errors to report for each file, or ``0`` for no limit.
+	#: Checking a file stops as soon as the limit is reached.
+	#:
+	#: .. versionadded:: 0.6.0
+	max_errors: int = 0
+
+	#: Whether Flake8's ``--disable-noqa`` option was given. Unless it was, types are not inferred
+	#: for method calls on lines where ``# noqa`` comments would suppress any error reported.
+	#:
+	#: .. versionadded:: 0.6.0
+	disable_noqa: bool = False
+
+	#: The codes Flake8 has been configured to report, as returned by :func:`~.get_enabled_codes`.
+	#: If :py:obj:`None` every code is assumed to be reported.
+	#: If none of the codes which require type inference are enabled, ``jedi`` is not used.
+	#:
+	#: .. versionadded:: 0.6.0
+	enabled_codes: Optional[FrozenSet[str]] = None
+
+	#: The maximum time, in seconds, to spend inferring types in each file, or ``0`` for no limit.
+	#: See :attr:`ClassVisitor.time_budget`.
+	#:
+	#: .. versionadded:: 0.6.0
+	time_budget: float = 0
+
+	#: The maximum time, in seconds, a single type inference may take, or ``0`` for no limit.
+	#: See :attr:`ClassVisitor.call_budget`.
+	#:
+	#: .. versionadded:: 0.6.0
+	call_budget: float = 0
+
+	def __init__(self, tree: ast.AST, filename: PathLike, lines: Optional[Sequence[str]] = None):
+		super().__init__(tree)
+		self.filename = PathPlus(filename)
+		self.lines = lines
+
+		#: Whether type inference was stopped part way through the file,
+		#: as :attr:`~.Plugin.time_budget` or :attr:`~.Plugin.call_budget` was exceeded.
+		#:
+		#: .. versionadded:: 0.6.0
+		self.over_budget = False
+
+	@classmethod
+	def add_options(cls, option_manager: "OptionManager") -> None:
+		"""
+		Register the plugin's command line and configuration file options with Flake8.
+
+		.. versionadded:: 0.6.0
+
+		:param option_manager:
+		"""
+
+		option_manager.add_option(
+				"--encodings-cache-dir",
+				default=os.environ.get(_CACHE_DIR_ENV_VAR) or None,
+				parse_from_config=True,
+				help=(
+						"Directory in which to persist jedi's type inference cache between files and runs. "
+						f"Defaults to the value of ${_CACHE_DIR_ENV_VAR}, "
+						"or a temporary directory which is removed when flake8 exits."
+						),
+				)
+		option_manager.add_option(
+				"--encodings-cache-size",
+				type=int,
+				default=_DEFAULT_CACHE_SIZE,
+				parse_from_config=True,
+				help="Maximum size of the cache directory in megabytes, or 0 for no limit. (Default: %(default)s)",
+				)
+		option_manager.add_option(
+				"--encodings-engine",
+				choices=ENGINES,
+				default="auto",
+				parse_from_config=True,
+				help=(
+						"How to determine the types of objects whose methods are called. "
+						"'jedi' uses jedi's type inference. "
+						"'ast' tracks imports and assignments within each module, which is faster but finds fewer errors. "
+						"'auto' uses jedi if it is installed. (Default: %(default)s)"
+						),
+				)
+		option_manager.add_option(
+				"--encodings-result-cache",
+				action="store_true",
+				parse_from_config=True,
+				help=(
+						"Cache the errors found in each file, and skip files which have not changed since the last run. "
+						"The cache is stored in --encodings-cache-dir, or ~/.cache/flake8-encodings if that is not set."
+						),
+				)
+		option_manager.add_option(
+				"--encodings-project-root",
+				parse_from_config=True,
+				help="Root directory of the project for jedi's type inference. (Default: the current directory)",
+				)
+		option_manager.add_option(
+				"--encodings-environment",
+				parse_from_config=True,
+				help=(
+						"Path to the Python environment (virtualenv or interpreter) jedi should infer types in. "
+						"(Default: the active virtual environment)"
+						),
+				)
+		option_manager.add_option(
+				"--encodings-max-errors",
+				type=int,
+				default=0,
+				metavar="N",
+				parse_from_config=True,
+				help=(
+						"Stop checking each file after this many errors have been found, "
+						"e.g. 1 to only report the first error in each file. (Default: no limit)"
+						),
+				)
+		option_manager.add_option(
+				"--encodings-time-budget",
+				type=float,
+				default=0,
+				metavar="SECONDS",
+				parse_from_config=True,
+				help=(
+						"Stop inferring types in a file once this many seconds have been spent doing so. "
+						"Calls which don't need type inference are still checked. (Default: no limit)"
+						),
+				)
+		option_manager.add_option(
+				"--encodings-call-budget",
+				type=float,
+				default=0,
+				metavar="SECONDS",
+				parse_from_config=True,
+				help=(
+						"Stop inferring types in a file once inferring the type for a single call "
+						"has taken this many seconds. (Default: no limit)"
+						),
+				)
+		option_manager.add_option(
+				"--encodings-type-index",
+				action="store_true",
+				parse_from_config=True,
+				help=(
+						"Index the return types of functions and the types of attributes and globals throughout the project, "
+						"so they needn't be inferred by jedi in every file that uses them. "
+						"The index is stored in the cache directory and updated when files change."
+						),
+				)
+		option_manager.add_option(
+				"--encodings-diff-base",
+				metavar="REVISION",
+				parse_from_config=True,
+				help=(
+						"Only report errors on lines which have changed since this git revision, e.g. origin/master. "
+						"Unchanged files are skipped."
+						),
+				)
+		option_manager.add_option(
+				"--encodings-diff-file",
+				metavar="FILENAME",
+				parse_from_config=True,
+				help=(
+						"Only report errors on lines added or modified by the unified diff in this file, "
+						"e.g. the output of 'git diff'. Unchanged files are skipped."
+						),
+				)
+		option_manager.add_option(
+				"--encodings-stats",
+				action="store_true",
+				parse_from_config=True,
+				help="Print a summary of where flake8-encodings spent its time when flake8 exits.",
+				)
+		option_manager.add_option(
+				"--encodings-stats-file",
+				parse_from_config=True,
+				help="Write a summary of where flake8-encodings spent its time to this JSON file.",
+				)
+
+	@classmethod
+	def parse_options(cls, options: "Namespace") -> None:
+		"""
+		Configure the plugin from the options parsed by Flake8.
+
+		.. versionadded:: 0.6.0
+
+		:param options:
+		"""
+
+		if options.encodings_engine == "jedi" and not _jedi_available():
+			raise ImportError("'--encodings-engine=jedi' requires 'jedi' to be installed but it could not be imported.")
+
+		cls.cache_dir = options.encodings_cache_dir
+		cls.cache_size = options.encodings_cache_size
+		cls.engine = options.encodings_engine
+		cls.result_cache = options.encodings_result_cache
+		cls.project_root = options.encodings_project_root
+		cls.environment_path = options.encodings_environment
+		cls.max_errors = options.encodings_max_errors
+
+		if cls.cache_dir is None and cls.engine != "ast" and _jedi_available():
+			# this package
+			from flake8_encodings.cache import get_cache_directory
+
+			# Create the temporary cache directory now, in Flake8's main process,
+			# so it is shared by the worker processes and removed when Flake8 exits.
+			get_cache_directory(None)
+
+		cls.disable_noqa = getattr(options, "disable_noqa", False)
+		cls.enabled_codes = get_enabled_codes(options)
+		cls.time_budget = options.encodings_time_budget
+		cls.call_budget = options.encodings_call_budget
+
+		# stdlib
+		import multiprocessing
+
+		# The main process finds the state of the project's files, which worker processes reuse.
+		main_process = multiprocessing.current_process().name == "MainProcess"
+
+		cls.type_index = cls.dependency_index = None
+		index_for_cache = cls.result_cache and cls.engine != "ast" and _jedi_available()
+
+		if (options.encodings_type_index and cls.engine != "ast") or index_for_cache:
+			# this package
+			from flake8_encodings.cache import get_cache_directory, get_default_cache_directory
+			from flake8_encodings.index import get_type_index
+
+			index = get_type_index(
+					cls.project_root or '.',
+					get_cache_directory(cls.cache_dir or get_default_cache_directory(), cls.cache_size),
+					update=main_process,
+					)
+
+			if options.encodings_type_index:
+				cls.type_index = index
+			else:
+				cls.dependency_index = index
+
+		if options.encodings_diff_file:
+			# this package
+			from flake8_encodings.diff import parse_diff
+
+			cls.changed_lines = parse_diff(PathPlus(options.encodings_diff_file).read_text())
+		elif options.encodings_diff_base:
+			# this package
+			from flake8_encodings.diff import get_changed_lines
+
+			cls.changed_lines = get_changed_lines(options.encodings_diff_base)
+		else:
+			cls.changed_lines = None
+
+		if options.encodings_stats or options.encodings_stats_file:
+			# this package
+			from flake8_encodings.stats import setup_stats_directory
+
+			cls.stats_dir = setup_stats_directory(options.encodings_stats_file, options.encodings_stats)
+		else:
+			cls.stats_dir = None
+
+	def run(self) -> Iterator[Tuple[int, int, str, Type["Plugin"]]]:  # noqa: D102
+
+		stats: Optional["Stats"] = None
+
+		if self.stats_dir is not None:
+			# this package
+			from flake8_encodings.stats import Stats
+
+			stats = Stats(self.filename.as_posix())
+
+		start = time.perf_counter()
+
+		engine = self.engine
+		if engine == "auto":
+			engine = "jedi" if _jedi_available() else "ast"
+
+		# this package
+		from flake8_encodings.records import ErrorRecords
+
+		result_cache: Optional["ResultCache"] = None
+		errors: Optional[ErrorRecords] = None
+		changed_lines: Optional[Collection[int]] = None
+
+		if self.changed_lines is not None:
+			changed_lines = self.changed_lines.get(os.path.normpath(os.path.abspath(self.filename)), frozenset())
+			if not changed_lines:
+				# Nothing has changed in this file, so there is nothing to report.
+				errors = ErrorRecords()
+
+		if self.result_cache and errors is None:
+			source = self._get_source()
+
+			if source is not None:
+				# this package
+				from flake8_encodings.cache import ResultCache, get_cache_directory, get_default_cache_directory
+
+				result_cache = ResultCache(
+						get_cache_directory(self.cache_dir or get_default_cache_directory(), self.cache_size)
+						)
+				key = result_cache.make_key(source, self._get_cache_context(engine, changed_lines))
+				errors = result_cache.get(key)
+
+				if stats is not None:
+					stats.count("result_cache_misses" if errors is None else "result_cache_hits")
+
+		try:
+			if errors is not None:
+				for line, col, msg in errors:
+					yield line, col, msg, type(self)
+				return
+
+			# Errors are yielded as they are found, so the caller can stop early.
+			found = ErrorRecords()
+
+			with contextlib.closing(self._iter_errors(engine, stats, changed_lines)) as iter_errors:
+				for line, col, msg in iter_errors:
+					found.add(line, col, msg)
+					yield line, col, msg, type(self)
+
+					if len(found) == self.max_errors:
+						break
+
+			if result_cache is not None and not self.over_budget:
+				# The errors found depend on how long inference took, so may differ next time.
+				result_cache.put(key, found)
+
+		finally:
+			if stats is not None:
+				stats.timings["total"] += time.perf_counter() - start
+				stats.record(self.stats_dir)  # type: ignore[arg-type]
+
+	def _iter_errors(
+			self,
+			engine: str,
+			stats: Optional["Stats"] = None,
+			changed_lines: Optional[Collection[int]] = None,
+			) -> Generator[Tuple[int, int, str], None, None]:
+		visitor: Visitor
+
+		with _timer(stats, "prescan"):
+			source = self._get_source()
+			candidate_lines = None if source is None else find_candidate_lines(source)
+
+		if candidate_lines is not None and not candidate_lines:
+			# None of the checked functions or methods are used in this file.
+			if stats is not None:
+				stats.count("files_without_candidates")
+			return
+
+		with _timer(stats, "prescan"):
+			inferred_methods = self._get_inferred_methods()
+			inferable = engine == "jedi" and has_inferable_calls(self._tree, changed_lines, inferred_methods)
+
+		if engine == "jedi" and not inferable:
+			# Nothing for jedi to do, so avoid importing it.
+			# The errors reported are the same, as the ClassVisitor only adds the inferred method calls.
+			visitor = Visitor()
+			visitor.stats = stats
+			visitor.changed_lines = changed_lines
+			visitor.candidate_lines = candidate_lines
+			yield from _iter_timed(stats, "ast_walk", visitor.iter_errors(self._tree))
+
+		elif engine == "jedi":  # pragma: no cover (py313+)
+			# jedi.settings.fast_parser = False
+
+			# this package
+			from flake8_encodings.cache import get_cache_directory, jedi_cache_directory
+			from flake8_encodings.noqa import find_suppressed_lines
+
+			cache_directory = get_cache_directory(self.cache_dir, self.cache_size)
+
+			with jedi_cache_directory(cache_directory):
+				with _timer(stats, "jedi_setup"):
+					# Importing jedi and creating the project, which are only slow for the first file.
+					class_visitor = ClassVisitor(
+							get_jedi_project(self.project_root, self.environment_path),
+							self.type_index,
+							)
+
+				class_visitor.stats = stats
+				class_visitor.changed_lines = changed_lines
+				class_visitor.candidate_lines = candidate_lines
+				class_visitor.inferred_methods = inferred_methods
+				class_visitor.time_budget = self.time_budget
+				class_visitor.call_budget = self.call_budget
+
+				with _timer(stats, "prescan"):
+					if not self.disable_noqa and source is not None:
+						class_visitor.suppressed_lines = find_suppressed_lines(source)
+
+					# has_inferable_calls() was already checked above, so the tree needn't be walked again.
+					class_visitor.prepare(self._tree, self.filename, self.lines, inferable=True)
+
+				try:
+					yield from _iter_timed(stats, "ast_walk", class_visitor.iter_errors(self._tree))
+				finally:
+					self.over_budget = class_visitor.over_budget
+
+					# Don't keep the script alive while the caller processes the errors.
+					class_visitor.release()
+
+		else:
+			visitor = TypeTrackingVisitor()
+			visitor.stats = stats
+			visitor.changed_lines = changed_lines
+			visitor.candidate_lines = candidate_lines
+			yield from _iter_timed(stats, "ast_walk", visitor.iter_errors(self._tree))
+
+	def _get_inferred_methods(self) -> Collection[str]:
+		# The methods which can be reported with any of the enabled codes.
+		if self.enabled_codes is None:
+			return _inferred_methods
+
+		return frozenset(name for name, codes in _inferred_method_codes.items() if not codes.isdisjoint(self.enabled_codes))
+
+	def _get_source(self) -> Optional[str]:
+		if self.lines is not None:
+			return ''.join(self.lines)
+
+		try:
+			return self.filename.read_text()
+		except (OSError, UnicodeDecodeError):
+			return None
+
+	def _get_dependency_digest(self, index: "TypeIndex") -> str:
+		imports = index.get_imports(self.filename)
+
+		if imports is None:
+			# The file is outside the project, or excluded from the index.
+			# this package
+			from flake8_encodings.index import get_imported_modules, get_module_name
+
+			imports = get_imported_modules(
+					self._tree,
+					get_module_name(self.filename),
+					is_package=self.filename.name == "__init__.py",
+					)
+
+		return index.dependency_digest(imports)
+
+	def _get_cache_context(self, engine: str, changed_lines: Optional[Collection[int]] = None) -> List[str]:
+		# Everything other than the source code which affects the errors reported for a file.
+
+		# this package
+		from flake8_encodings.stdlib_types import TABLE_VERSION
+
+		context = [
+				self.filename.as_posix(),
+				__version__,
+				sys.implementation.name,
+				sys.version,
+				engine,
+				f"stdlib-types={TABLE_VERSION}",
+				]
+
+		if changed_lines is not None:
+			context.append(','.join(map(str, sorted(changed_lines))))
+
+		if self.max_errors:
+			context.append(f"max_errors={self.max_errors}")
+
+		if self.disable_noqa:
+			context.append("disable_noqa")
+
+		if self.enabled_codes is not None:
+			context.append(','.join(sorted(self.enabled_codes)))
+
+		# Results may depend on types defined in the modules the file imports,
+		# so only reuse them if those haven't changed.
+		if self.type_index is not None:
+			context.append(self._get_dependency_digest(self.type_index))
+		elif engine == "jedi" and self.dependency_index is not None:  # pragma: no cover (py313+)
+			context.append(self._get_dependency_digest(self.dependency_index))
+
+		if engine == "jedi":  # pragma: no cover (py313+)
+			# 3rd party
+			import jedi  # nodep
+
+			context.extend([jedi.__version__, str(self.project_root), str(self.environment_path)])
+
+		return context
+
+
+def get_enabled_codes(options: "Namespace") -> Optional[FrozenSet[str]]:
+	"""
+	Returns the codes of the errors reported by the plugin which Flake8 will report,
+	as determined from its ``--select``, ``--ignore``, ``--extend-select`` and ``--extend-ignore`` options.
+
+	Returns :py:obj:`None` if this cannot be determined, e.g. if the options were not parsed by Flake8.
+
+	.. versionadded:: 0.6.0
+
+	:param options:
+	"""
+
+	try:
+		# 3rd party
+		from flake8.style_guide import Decision, DecisionEngine  # type: ignore[import-untyped]
+
+		decider = DecisionEngine(options)
+		return frozenset(code for code in _codes if decider.decision_for(code) is Decision.Selected)
+	except (ImportError, AttributeError, TypeError):
+		# Older versions of Flake8, or options from batch mode.
+		return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_jedi_project(root: Optional[str] = None, environment_path: Optional[str] = None) -> "Project":
+	"""
+	Returns a ``jedi`` project for the given root directory and Python environment.
+
+	Projects are cached for the lifetime of the process,
+	so each of Flake8's worker processes only creates one project and discovers the environment once.
+
+	.. versionadded:: 0.6.0
+
+	:param root: The root directory of the project. If :py:obj:`None` the current working directory is used.
+	:param environment_path: The path to the Python environment to use.
+		If :py:obj:`None` the active virtual environment (or the current interpreter) is used.
+	"""
+
+	# 3rd party
+	import jedi  # nodep
+
+	return jedi.Project(os.path.abspath(root or os.getcwd()), environment_path=environment_path)
+
+
+def _timer(stats: Optional["Stats"], phase: str) -> ContextManager[None]:
+	# Time the phase if statistics are being recorded.
+	if stats is None:
+		return contextlib.nullcontext()
+
+	return stats.timer(phase)
+
+
+def _iter_timed(stats: Optional["Stats"], phase: str, iterable: Iterable[_T]) -> Iterable[_T]:
+	# Time producing each item if statistics are being recorded.
+	if stats is None:
+		return iterable
+
+	return stats.iter_timed(phase, iterable)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_empty_script() -> "Script":
+	# Placeholder script for a ClassVisitor which was not given any source code.
+
+	# 3rd party
+	import jedi  # nodep
+
+	return jedi.Script('')
+
+
+@functools.lru_cache(maxsize=None)
+def _jedi_available() -> bool:
+	# Checks whether jedi is installed without importing it, as that is slow.
+	# The result is cached for the lifetime of the process.
+
+	try:
+		return importlib.util.find_spec("jedi") is not None
+	except (ImportError, ValueError):  # pragma: no cover
+		return False
+
+
+def is_configparser_read(class_name: str, method_name: str) -> bool:  # pragma: no cover (py313+)
+	"""
+	Returns :py:obj:`True` if method is :meth:`configparser.ConfigParser.read` or
+	:meth:`configparser.RawConfigParser.read`.
+
+	.. versionadded:: 0.3.0
+
+	:param class_name: The inferred name of the class the method belongs to.
+	:param method_name: The name of the record.
+	"""  # noqa: D400
+
+	if class_name not in _configparser_classes:
+		return False
+
+	if method_name not in _configparser_methods:
+		return False
+
+	return True
+
+
+def is_pathlib_method(class_name: str, method_name: str) -> bool:  # pragma: no cover (py313+)
+	"""
+	Returns :py:obj:`True` if method is :meth:`pathlib.Path.open`,
+	:meth:`read_text() <pathlib.Path.read_text>` or :meth:`write_text() <pathlib.Path.write_text>`.
+
+	.. versionadded:: 0.3.0
+
+	:param class_name: The inferred name of the class the method belongs to.
+	:param method_name: The name of the record.
+	"""  # noqa: D400
+
+	if class_name not in _pathlib_classes:
+		return False
+
+	if method_name not in _pathlib_methods:
+		return False
+
+	return True
+
+
+def is_inferable_call(node: ast.AST, methods: Collection[str] = _inferred_methods) -> bool:
+	"""
+	Returns whether ``node`` is a method call the :class:`~.ClassVisitor` needs to infer the type of.
+
+	This is a cheap, purely syntactic check on the method name,
+	used to avoid type inference for calls which can never be reported.
+
+	.. versionadded:: 0.6.0
+
+	:param node:
+	:param methods: The names of the methods whose calls are inferred.
+		Defaults to all the checked methods.
+	"""
+
+	return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in methods
+
+
+def has_inferable_calls(
+		tree: ast.AST,
+		lines: Optional[Collection[int]] = None,
+		methods: Collection[str] = _inferred_methods,
+		) -> bool:
+	"""
+	Returns whether the given AST contains any calls the :class:`~.ClassVisitor` needs to infer the type of.
+
+	.. versionadded:: 0.6.0
+
+	:param tree:
+	:param lines: If given, only calls which span at least one of these line numbers are considered.
+	:param methods: The names of the methods whose calls are inferred.
+		Defaults to all the checked methods.
+	"""
+
+	if not methods:
+		return False
+
+	if lines is None:
+		return any(is_inferable_call(node, methods) for node in ast.walk(tree))
+
+	return any(is_inferable_call(node, methods) and spans_lines(node, lines) for node in ast.walk(tree))
+
+
+def find_candidate_lines(source: str) -> List[int]:
+	"""
+	Returns the numbers of the lines of source code on which a checked function or method could be called.
+
+	This is a cheap search of the source text for the names of the checked functions and methods,
+	and for names they are bound to by imports and assignments (e.g. ``from io import open as io_open``).
+	Lines which are not included cannot contain errors, so the AST nodes on them need not be visited.
+
+	.. versionadded:: 0.6.0
+
+	:param source:
+	"""
+
+	lines = set()
+
+	# The offset of the start of each line, so the line a match is on can be found with a binary search
+	# rather than by counting the newlines before it.
+	# The last entry is one past the end of the source, as if it ended with a newline.
+	line_starts = [0, *itertools.accumulate(len(line) + 1 for line in source.split('\n'))]
+
+	# A name being assigned to with ":=" may be one whose type is being tracked.
+	position = source.find(":=")
+	while position != -1:
+		lines.add(bisect_right(line_starts, position))
+		position = source.find(":=", position + 2)
+
+	pending = [name for name in _candidate_names if name in source]
+	names = set(pending)
+
+	while pending:
+		name = pending.pop()
+		position = source.find(name)
+
+		while position != -1:
+			end = position + len(name)
+
+			if (
+					(position == 0 or not _is_identifier_character(source[position - 1]))
+					and (end == len(source) or not _is_identifier_character(source[end]))
+					):
+				line = bisect_right(line_starts, position)
+				lines.add(line)
+
+				line_start, line_end = line_starts[line - 1], line_starts[line] - 1
+
+				# Names the function may be called through, e.g. "from io import open as io_open",
+				# or "reader = io.open" after which "reader(...)" may be reported.
+				for match in (
+						_alias_re.match(source, end, line_end),
+						_name_assignment_re.match(source, line_start, line_end),
+						):
+					if match and match.group(1) not in names:
+						names.add(match.group(1))
+						pending.append(match.group(1))
+
+			position = source.find(name, end)
+
+	return sorted(lines)
+
+
+def _is_identifier_character(character: str) -> bool:
+	return character.isalnum() or character == '_'
+
+
+def is_path_expression(node: ast.AST, items: bool = False) -> bool:
+	"""
+	Returns whether ``node`` may be a path built with the methods and properties of :mod:`pathlib` classes,
+	such as ``p.with_suffix(".txt")`` or ``Path.home()``, whose type can be found from the stdlib table.
+
+	This is a cheap, purely syntactic check on the outermost method, property or class name.
+
+	.. versionadded:: 0.6.0
+
+	:param node:
+	:param items: Whether to check if ``node`` may instead be an iterable of paths, such as ``p.glob("*.cfg")``.
+	"""
+
+	# this package
+	from flake8_encodings.stdlib_types import ATTRIBUTE_NAMES, CLASS_NAMES, METHOD_NAMES
+
+	if isinstance(node, ast.Call):
+		func = node.func
+
+		if isinstance(func, ast.Attribute):
+			return func.attr in METHOD_NAMES or (not items and func.attr in CLASS_NAMES)
+
+		return not items and isinstance(func, ast.Name) and func.id in CLASS_NAMES
+
+	elif isinstance(node, ast.Attribute):
+		return node.attr in ATTRIBUTE_NAMES
+
+	elif isinstance(node, ast.Subscript):
+		return not items and is_path_expression(node.value, items=True)
+
+	return False
+
+
+def spans_lines(node: ast.AST, lines: Collection[int]) -> bool:
+	"""
+	Returns whether the given AST node spans at least one of the given line numbers.
+
+	.. versionadded:: 0.6.0
+
+	:param node:
+	:param lines:
+	"""
+
+	start = node.lineno  # type: ignore[attr-defined]
+	end = getattr(node, "end_lineno", None) or start
+
+	return any(line in lines for line in range(start, end + 1))
+
+
+def get_inferred_types(jedi_script: "Script", node: ast.Call) -> List[str]:  # pragma: no cover (py313+)
 	"""
 	Returns a list of types inferred by ``jedi`` for the given call node.
 
+	.. versionchanged:: 0.6.0  Only the object whose method is being called is inferred.
+
 	:param jedi_script:
 	:param node:
 	"""
 
-	attr_names = tuple(get_attribute_name(node.func))
 	inferred_types = set()
 
 	inferred_name: "Name"
-	for inferred_name in jedi_script.infer(node.lineno, node.func.col_offset):
-		inferred_types.add(inferred_name.full_name)
-
-	for inferred_name in jedi_script.infer(node.lineno, node.func.col_offset + len('.'.join(attr_names[:-1]))):
+	for inferred_name in jedi_script.infer(*get_receiver_position(node)):
 		inferred_types.add(inferred_name.full_name)
 
 	return sorted(filter(None, inferred_types))
+
+
+def get_bound_names(scope: ast.AST) -> FrozenSet[str]:
+	"""
+	Returns the names of the local variables of the given function, lambda or class body.
+
+	These are its parameters and the names assigned to within it (including by ``for``, ``with``
+	and ``except`` statements, and nested function and class definitions),
+	other than those declared ``global``. Names bound by ``import`` statements are not included.
+
+	.. versionadded:: 0.6.0
+
+	:param scope:
+	"""
+
+	names = set()
+	global_names = set()
+
+	if isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+		arguments = scope.args
+		for arg in [*getattr(arguments, "posonlyargs", ()), *arguments.args, *arguments.kwonlyargs]:
+			names.add(arg.arg)
+		for arg in (arguments.vararg, arguments.kwarg):
+			if arg is not None:
+				names.add(arg.arg)
+
+		if isinstance(scope, ast.Lambda):
+			return frozenset(names)
+
+	pending: List[ast.AST] = list(scope.body)  # type: ignore[attr-defined]
+
+	while pending:
+		node = pending.pop()
+
+		if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+			# Nested scopes; only the name they are bound to is local.
+			names.add(node.name)
+			pending.extend(node.decorator_list)
+			continue
+		elif isinstance(node, (ast.Lambda, ast.GeneratorExp, ast.ListComp, ast.SetComp, ast.DictComp)):
+			continue
+		elif isinstance(node, ast.Global):
+			global_names.update(node.names)
+		elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+			names.add(node.id)
+		elif isinstance(node, ast.ExceptHandler) and node.name:
+			names.add(node.name)
+
+		pending.extend(ast.iter_child_nodes(node))
+
+	return frozenset(names - global_names)
+
+
+def get_path_operands(node: ast.BinOp) -> List[ast.AST]:
+	"""
+	Returns the operands of a chain of ``/`` operators which may be paths, in the order they are evaluated,
+	e.g. ``tmp_path`` in ``tmp_path / "a" / "b"``, or ``base`` and ``p`` in ``base / p``.
+
+	Dividing a path by a string, or a string by a path (with :meth:`pathlib.PurePath.__rtruediv__`),
+	gives another path of the same class, so the first of the operands which is a path
+	determines the class of the whole expression.
+
+	String literals are omitted. An empty list is returned if any of the operators is not ``/``.
+
+	.. versionadded:: 0.6.0
+
+	:param node:
+	"""
+
+	operands: List[ast.AST] = []
+	operand: ast.AST = node
+
+	while isinstance(operand, ast.BinOp):
+		if not isinstance(operand.op, ast.Div):
+			return []
+		operands.append(operand.right)
+		operand = operand.left
+
+	operands.append(operand)
+
+	return [operand for operand in reversed(operands) if not _is_string_literal(operand)]
+
+
+def _is_string_literal(node: ast.AST) -> bool:
+	if isinstance(node, ast.JoinedStr):
+		return True
+	elif isinstance(node, ast.Constant):  # pragma: no cover (<py38)
+		return isinstance(node.value, str)
+	elif sys.version_info < (3, 8):  # pragma: no cover (py38+)
+		return isinstance(node, ast.Str)
+
+	return False
+
+
+def get_receiver_position(node: ast.Call) -> Tuple[int, int]:
+	"""
+	Returns the line and column ``jedi`` should infer to determine the type of the object whose method is called.
+
+	This is the end of the dotted name preceding the method name,
+	e.g. immediately after ``cfg`` in ``cfg.read()``, or after ``pathlib.Path`` in ``pathlib.Path("x").open()``.
+	For other expressions, such as ``(tmp_path / "code.py").open()`` and ``paths[0].open()``,
+	it is the ``.`` before the method name, where ``jedi`` infers the type of the whole expression.
+
+	.. versionadded:: 0.6.0
+
+	:param node:
+
+	:raises NotImplementedError: if the receiver is an unsupported expression.
+	"""
+
+	func = node.func
+
+	if isinstance(func, ast.Attribute) and isinstance(func.value, (ast.BinOp, ast.Subscript)):
+		end_lineno: Optional[int] = getattr(func, "end_lineno", None)
+		end_col_offset: Optional[int] = getattr(func, "end_col_offset", None)
+
+		if end_lineno is None or end_col_offset is None:  # pragma: no cover (py38+)
+			raise NotImplementedError(type(func.value))
+
+		# Assumes there is no whitespace between the "." and the method name, as is conventional.
+		return end_lineno, end_col_offset - len(func.attr) - 1
+
+	# 3rd party
+	from astatine import get_attribute_name
+
+	attr_names = tuple(get_attribute_name(func))
+	return node.lineno, func.col_offset + len('.'.join(attr_names[:-1]))
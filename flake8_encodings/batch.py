@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+#
+#  batch.py
+"""
+Check many files for incorrect use of encodings at once, without Flake8.
+
+Files are divided into shards which are checked by a pool of worker processes.
+Each worker keeps its ``jedi`` project and inference state for every file it checks,
+and results are reported as soon as each shard is complete.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import argparse
+import ast
+import fnmatch
+import glob
+import json
+import os
+import sys
+import tokenize
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# this package
+from flake8_encodings import Plugin, __version__
+from flake8_encodings.noqa import find_suppressed_lines, is_suppressed
+from flake8_encodings.records import ErrorRecords
+
+__all__ = [
+		"DEFAULT_EXCLUDE",
+		"FORMATS",
+		"check_file",
+		"check_files",
+		"format_default",
+		"format_json",
+		"format_sarif",
+		"iter_python_files",
+		"main",
+		]
+
+#: Files and directories which are not checked unless given explicitly, as for Flake8.
+DEFAULT_EXCLUDE = (".svn", "CVS", ".bzr", ".hg", ".git", "__pycache__", ".tox", ".nox", ".eggs", "*.egg")
+
+#: The output formats which can be selected with ``--format``.
+FORMATS = ("default", "json", "sarif")
+
+#: The maximum number of files sent to a worker process at once.
+MAX_SHARD_SIZE = 16
+
+
+def _is_excluded(path: str, exclude: Sequence[str]) -> bool:
+	basename = os.path.basename(path)
+	absolute = os.path.abspath(path)
+	return any(fnmatch.fnmatch(basename, pattern) or fnmatch.fnmatch(absolute, pattern) for pattern in exclude)
+
+
+def iter_python_files(paths: Iterable[str], exclude: Sequence[str] = DEFAULT_EXCLUDE) -> Iterator[str]:
+	"""
+	Returns an iterator over the Python files in the given paths.
+
+	Directories are searched recursively for ``*.py`` files, and glob patterns (e.g. ``src/**/*.py``) are expanded.
+	Files given explicitly are always included.
+
+	:param paths:
+	:param exclude: Patterns for files and directories to skip, matched against their names and absolute paths.
+	"""
+
+	seen = set()
+
+	def unique(filename: str) -> Iterator[str]:
+		if filename not in seen:
+			seen.add(filename)
+			yield filename
+
+	for path in paths:
+		if glob.has_magic(path):
+			matches = sorted(glob.glob(path, recursive=True))
+		else:
+			matches = [path]
+
+		for match in matches:
+			if not os.path.isdir(match):
+				if not glob.has_magic(path) or (match.endswith(".py") and not _is_excluded(match, exclude)):
+					yield from unique(os.path.normpath(match))
+				continue
+
+			for root, dirnames, filenames in os.walk(match):
+				dirnames[:] = sorted(d for d in dirnames if not _is_excluded(os.path.join(root, d), exclude))
+
+				for filename in sorted(filenames):
+					full_path = os.path.join(root, filename)
+					if filename.endswith(".py") and not _is_excluded(full_path, exclude):
+						yield from unique(os.path.normpath(full_path))
+
+
+def check_file(filename: str, source: Optional[str] = None) -> ErrorRecords:
+	"""
+	Returns the errors in the given file, sorted by position.
+
+	The file is checked by the :class:`~.Plugin`, using the options it was configured with.
+	Files which cannot be read or parsed are reported with Flake8's ``E902`` and ``E999`` codes.
+	Errors suppressed by ``# noqa`` comments are not included, unless ``--disable-noqa`` was given.
+
+	:param filename:
+	:param source: The source code to check, such as the unsaved contents of an editor.
+		If not given the source is read from ``filename``.
+	"""
+
+	if source is not None:
+		lines = source.splitlines(True)
+	else:
+		try:
+			# Honours PEP 263 encoding declarations, as Flake8 does.
+			with tokenize.open(filename) as fp:
+				lines = fp.readlines()
+		except (OSError, SyntaxError, UnicodeDecodeError) as e:
+			return ErrorRecords([(1, 0, f"E902 {type(e).__name__}: {e}")])
+
+	try:
+		tree = ast.parse(''.join(lines), filename=filename)
+	except SyntaxError as e:
+		return ErrorRecords([(e.lineno or 1, max((e.offset or 1) - 1, 0), f"E999 SyntaxError: {e.msg}")])
+
+	plugin = Plugin(tree, filename=filename, lines=lines)
+	errors = ErrorRecords(error[:3] for error in plugin.run())
+
+	if not Plugin.disable_noqa:
+		# As Flake8 would, remove errors suppressed by noqa comments.
+		suppressed_lines = find_suppressed_lines(''.join(lines))
+		errors = ErrorRecords(
+				(line, col, msg) for line, col, msg in errors
+				if not is_suppressed(suppressed_lines, line, [msg.split(' ', 1)[0]])
+				)
+
+	errors.sort()
+
+	return errors
+
+
+def _check_shard(filenames: Sequence[str]) -> List[Tuple[str, ErrorRecords]]:
+	return [(filename, check_file(filename)) for filename in filenames]
+
+
+def _initialise_worker(options: argparse.Namespace) -> None:
+	Plugin.parse_options(options)
+
+
+def _shard(filenames: Sequence[str], jobs: int) -> Iterator[Sequence[str]]:
+	# Several shards per process, so the work stays balanced when some files are much slower than others.
+	size = max(1, min(MAX_SHARD_SIZE, len(filenames) // (jobs * 4)))
+
+	for start in range(0, len(filenames), size):
+		yield filenames[start:start + size]
+
+
+def check_files(
+		filenames: Sequence[str],
+		options: argparse.Namespace,
+		jobs: int = 1,
+		) -> Iterator[Tuple[str, ErrorRecords]]:
+	"""
+	Check the given files, yielding each filename and its errors as soon as they are available.
+
+	:param filenames:
+	:param options: The options to configure the :class:`~.Plugin` with, as returned by ``parse_args``.
+	:param jobs: The number of worker processes to use. If ``1`` the files are checked in this process.
+	"""
+
+	if jobs <= 1 or len(filenames) <= 1:
+		_initialise_worker(options)
+
+		for filename in filenames:
+			yield filename, check_file(filename)
+
+		return
+
+	with ProcessPoolExecutor(max_workers=jobs, initializer=_initialise_worker, initargs=(options, )) as executor:
+		futures = [executor.submit(_check_shard, shard) for shard in _shard(filenames, jobs)]
+
+		for future in as_completed(futures):
+			yield from future.result()
+
+
+def format_default(filename: str, errors: ErrorRecords) -> Iterator[str]:
+	"""
+	Format the errors for the given file in Flake8's default format, e.g. ``code.py:1:1: ENC001 ...``.
+
+	:param filename:
+	:param errors:
+	"""
+
+	for line, col, msg in errors:
+		yield f"{filename}:{line}:{col + 1}: {msg}"
+
+
+def _split_message(msg: str) -> Tuple[str, str]:
+	code, _, text = msg.partition(' ')
+	return code, text
+
+
+def format_json(results: Iterable[Tuple[str, ErrorRecords]]) -> Dict[str, List[Dict[str, Any]]]:
+	"""
+	Returns the errors for each file, in a form which can be serialised to JSON.
+
+	:param results: Pairs of filenames and their errors.
+	"""
+
+	output: Dict[str, List[Dict[str, Any]]] = {}
+
+	for filename, errors in results:
+		output[filename] = []
+
+		for line, col, msg in errors:
+			code, text = _split_message(msg)
+			output[filename].append({
+					"code": code,
+					"filename": filename,
+					"line_number": line,
+					"column_number": col + 1,
+					"text": text,
+					})
+
+	return output
+
+
+def format_sarif(results: Iterable[Tuple[str, ErrorRecords]]) -> Dict[str, Any]:
+	"""
+	Returns the errors as a `SARIF 2.1.0 <https://sarifweb.azurewebsites.net/>`_ log.
+
+	:param results: Pairs of filenames and their errors.
+	"""
+
+	rules: Dict[str, Dict[str, Any]] = {}
+	sarif_results = []
+
+	for filename, errors in results:
+		for line, col, msg in errors:
+			code, text = _split_message(msg)
+			rules.setdefault(code, {"id": code, "shortDescription": {"text": text}})
+			sarif_results.append({
+					"ruleId": code,
+					"level": "warning",
+					"message": {"text": text},
+					"locations": [{
+							"physicalLocation": {
+									"artifactLocation": {"uri": filename.replace(os.sep, '/')},
+									"region": {"startLine": line, "startColumn": col + 1},
+									},
+							}],
+					})
+
+	return {
+			"$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+			"version": "2.1.0",
+			"runs": [{
+					"tool": {
+							"driver": {
+									"name": "flake8-encodings",
+									"version": __version__,
+									"informationUri": "https://github.com/python-formate/flake8-encodings",
+									"rules": [rules[code] for code in sorted(rules)],
+									},
+							},
+					"results": sarif_results,
+					}],
+			}
+
+
+class _OptionManager:
+	# Adapts an ArgumentParser so the Plugin can register the same options it gives Flake8.
+	# Flake8's own options which the Plugin reads are also added.
+
+	def __init__(self, parser: argparse.ArgumentParser):
+		self.parser = parser
+		self.parser.add_argument(
+				"--disable-noqa",
+				action="store_true",
+				help="Report errors on lines with '# noqa' comments, as Flake8's option of the same name.",
+				)
+
+	def add_option(self, *args, parse_from_config: bool = False, **kwargs) -> None:  # noqa: MAN001,MAN002
+		self.parser.add_argument(*args, **kwargs)
+
+
+def _get_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+			prog="python -m flake8_encodings",
+			description="Check Python files for incorrect use of encodings.",
+			)
+	parser.add_argument(
+			"paths",
+			nargs='*',
+			default=['.'],
+			help="Files, directories and glob patterns to check. (Default: the current directory)",
+			)
+	parser.add_argument(
+			"-j",
+			"--jobs",
+			type=int,
+			default=os.cpu_count() or 1,
+			help="The number of worker processes to use. (Default: the number of CPUs)",
+			)
+	parser.add_argument(
+			"--format",
+			choices=FORMATS,
+			default="default",
+			help="The output format. (Default: %(default)s)",
+			)
+	parser.add_argument(
+			"--output-file",
+			help="Write the output to this file instead of standard output.",
+			)
+	parser.add_argument(
+			"--exclude",
+			default=','.join(DEFAULT_EXCLUDE),
+			help="Comma-separated patterns for files and directories to skip. (Default: %(default)s)",
+			)
+	parser.add_argument("--version", action="version", version=f"flake8-encodings {__version__}")
+
+	Plugin.add_options(_OptionManager(parser))
+
+	return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+	"""
+	Entry point for ``python -m flake8_encodings``.
+
+	:param argv: The command line arguments. Defaults to :py:data:`sys.argv`.
+
+	:returns: ``1`` if any errors were found, otherwise ``0``.
+	"""
+
+	options = _get_parser().parse_args(argv)
+
+	# Configure the main process first, so invalid options fail early
+	# and the statistics directory (if enabled) is shared with the worker processes.
+	Plugin.parse_options(options)
+
+	exclude = [pattern.strip() for pattern in options.exclude.split(',') if pattern.strip()]
+	filenames = list(iter_python_files(options.paths, exclude))
+
+	if Plugin.changed_lines is not None:
+		# Only files with changes need to be read.
+		filenames = [f for f in filenames if os.path.normpath(os.path.abspath(f)) in Plugin.changed_lines]
+
+	results = check_files(filenames, options, jobs=options.jobs)
+	found_errors = False
+
+	output: IO[str]
+	if options.output_file:
+		output = open(options.output_file, 'w', encoding="UTF-8")  # noqa: SIM115
+	else:
+		output = sys.stdout
+
+	try:
+		if options.format == "default":
+			for filename, errors in results:
+				for line in format_default(filename, errors):
+					found_errors = True
+					print(line, file=output, flush=True)
+
+		else:
+			collected = sorted(results)
+			found_errors = any(errors for _, errors in collected)
+
+			if options.format == "json":
+				json.dump(format_json(collected), output, indent=2)
+			else:
+				json.dump(format_sarif(collected), output, indent=2)
+
+			output.write('\n')
+
+	finally:
+		if output is not sys.stdout:
+			output.close()
+
+	return int(found_errors)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+#
+#  cache.py
+"""
+Management of the on-disk caches used for type inference and for the errors found in each file.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import atexit
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+# this package
+from flake8_encodings import _CACHE_DIR_ENV_VAR, _DEFAULT_CACHE_SIZE
+from flake8_encodings.records import ErrorRecords
+
+__all__ = [
+		"CACHE_DIR_ENV_VAR",
+		"DEFAULT_CACHE_SIZE",
+		"ResultCache",
+		"get_cache_directory",
+		"get_default_cache_directory",
+		"jedi_cache_directory",
+		"prune_cache",
+		]
+
+#: The environment variable which may be used to set the persistent cache directory.
+CACHE_DIR_ENV_VAR = _CACHE_DIR_ENV_VAR
+
+#: The default maximum size of the persistent cache directory, in megabytes.
+DEFAULT_CACHE_SIZE = _DEFAULT_CACHE_SIZE
+
+#: Lock files older than this many seconds are assumed to have been left behind by a crashed process.
+_STALE_LOCK_AGE = 60
+
+_LOCK_FILENAME = ".flake8-encodings.lock"
+
+# The subdirectories of the cache directory the plugin writes to, and which are pruned.
+# Nothing else in the directory is touched, as it may be shared with other tools (e.g. ~/.cache).
+_CACHE_SUBDIRECTORIES = ("jedi", "results", "index")
+
+# The temporary directory used when no persistent cache directory has been configured.
+# It is created by the main process and shared with worker processes through the environment,
+# as worker processes don't run atexit handlers to remove their own.
+_TEMPORARY_DIR_ENV_VAR = "_FLAKE8_ENCODINGS_TEMPORARY_CACHE_DIR"
+
+# Directories which have already been prepared (and pruned) in this process.
+_prepared_directories: Set[PathPlus] = set()
+
+
+def get_cache_directory(directory: Optional[PathLike] = None, max_size: int = DEFAULT_CACHE_SIZE) -> PathPlus:
+	"""
+	Returns the directory ``jedi`` should use for its cache.
+
+	If ``directory`` is :py:obj:`None` a temporary directory is created the first time this function is called,
+	and reused for the remainder of the process and by any worker processes it starts.
+	The directory is removed when the process which created it exits, so this should first be called
+	in Flake8's main process (as :meth:`Plugin.parse_options <flake8_encodings.Plugin.parse_options>` does).
+
+	Otherwise the given directory is created if necessary and, the first time it is used in this process,
+	pruned to at most ``max_size`` megabytes.
+
+	:param directory:
+	:param max_size: The maximum size of the cache directory, in megabytes. ``0`` disables pruning.
+	"""
+
+	if directory is None:
+		return _get_temporary_directory()
+
+	directory = PathPlus(directory).expanduser().abspath()
+
+	if directory not in _prepared_directories:
+		directory.maybe_make(parents=True)
+
+		if max_size:
+			prune_cache(directory, max_size)
+
+		_prepared_directories.add(directory)
+
+	return directory
+
+
+def _get_temporary_directory() -> PathPlus:
+	# stdlib
+	import multiprocessing.util
+
+	directory = os.environ.get(_TEMPORARY_DIR_ENV_VAR)
+
+	if directory is None or not os.path.isdir(directory):
+		directory = tempfile.mkdtemp(prefix="flake8-encodings-")
+		os.environ[_TEMPORARY_DIR_ENV_VAR] = directory
+
+		if multiprocessing.current_process().name == "MainProcess":
+			atexit.register(_remove_temporary_directory, directory)
+		else:  # pragma: no cover
+			# Only reached if the main process never configured the plugin.
+			# Finalizers are run when multiprocessing workers exit normally.
+			multiprocessing.util.Finalize(None, _remove_temporary_directory, args=(directory, ), exitpriority=0)
+
+	return PathPlus(directory)
+
+
+def _remove_temporary_directory(directory: str) -> None:
+	shutil.rmtree(directory, ignore_errors=True)
+
+	if os.environ.get(_TEMPORARY_DIR_ENV_VAR) == directory:
+		del os.environ[_TEMPORARY_DIR_ENV_VAR]
+
+
+def get_default_cache_directory() -> PathPlus:
+	"""
+	Returns the default location for persistent caches, following the XDG Base Directory Specification.
+
+	This is used for the :class:`~.ResultCache` when no cache directory has been configured.
+
+	.. versionadded:: 0.6.0
+	"""
+
+	base = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+	return PathPlus(base).expanduser() / "flake8-encodings"
+
+
+@contextlib.contextmanager
+def jedi_cache_directory(directory: PathLike) -> Iterator[PathPlus]:
+	"""
+	Context manager to temporarily point ``jedi`` at the ``jedi`` subdirectory of the given cache directory.
+
+	The previous cache directory is restored on exit.
+
+	The directory may be shared by several processes (including the temporary directory,
+	which is shared with worker processes), so ``parso`` is made to write its cache files atomically.
+
+	.. versionchanged:: 0.6.0  ``jedi`` now uses a subdirectory, so the directory can be pruned safely.
+
+	:param directory:
+	"""
+
+	# 3rd party
+	import jedi  # type: ignore[import-untyped]  # nodep
+
+	_make_parso_writes_atomic()
+
+	original_cache_dir = jedi.settings.cache_directory
+	jedi_directory = PathPlus(directory) / "jedi"
+	jedi.settings.cache_directory = str(jedi_directory)
+
+	try:
+		yield jedi_directory
+	finally:
+		jedi.settings.cache_directory = original_cache_dir
+
+
+def prune_cache(directory: PathLike, max_size: int) -> bool:
+	"""
+	Remove the least recently used files from the cache directory until it is no larger than ``max_size``.
+
+	Only the subdirectories written by the plugin (``jedi``, ``results`` and ``index``) are considered,
+	so other files in the directory are never removed.
+
+	The directory is locked while it is being pruned.
+	If another process already holds the lock this function returns immediately,
+	as that process is already doing the work.
+
+	:param directory:
+	:param max_size: The maximum size of the cache directory, in megabytes.
+
+	:returns: Whether the directory was pruned.
+	"""
+
+	directory = PathPlus(directory)
+	lock_file = directory / _LOCK_FILENAME
+
+	if not _acquire_lock(lock_file):
+		return False
+
+	try:
+		entries: List[Tuple[float, int, str]] = []
+		total_size = 0
+
+		for subdirectory in _CACHE_SUBDIRECTORIES:
+			for root, _, filenames in os.walk(directory / subdirectory):
+				for filename in filenames:
+					path = os.path.join(root, filename)
+
+					try:
+						stat = os.stat(path)
+					except OSError:  # pragma: no cover
+						continue
+
+					entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+					total_size += stat.st_size
+
+		limit = max_size * 1024 * 1024
+
+		for _, size, path in sorted(entries):
+			if total_size <= limit:
+				break
+
+			with contextlib.suppress(OSError):
+				os.unlink(path)
+				total_size -= size
+
+		return True
+
+	finally:
+		with contextlib.suppress(OSError):
+			os.unlink(lock_file)
+
+
+class ResultCache:
+	"""
+	On-disk cache of the errors found in each file.
+
+	Entries are keyed by a hash of the file's contents together with anything else which could affect the result,
+	so unchanged files can be skipped entirely on subsequent runs.
+
+	Each entry is written to a temporary file and renamed into place,
+	so concurrent processes never read a partially written entry.
+
+	:param directory: The cache directory. Entries are stored in its ``results`` subdirectory.
+	"""
+
+	def __init__(self, directory: PathLike):
+		self.directory = PathPlus(directory) / "results"
+
+	@staticmethod
+	def make_key(source: str, context: Iterable[str]) -> str:
+		"""
+		Returns the key for the given source code.
+
+		:param source:
+		:param context: Strings which must match for an entry to be used,
+			such as the filename, the plugin version and the options it was run with.
+		"""
+
+		# stdlib
+		import hashlib
+
+		digest = hashlib.sha256(source.encode("UTF-8", "surrogatepass"))
+
+		for item in context:
+			digest.update(b'\0')
+			digest.update(item.encode("UTF-8", "surrogatepass"))
+
+		return digest.hexdigest()
+
+	def _path_for(self, key: str) -> PathPlus:
+		return self.directory / key[:2] / f"{key}.json"
+
+	def get(self, key: str) -> Optional[ErrorRecords]:
+		"""
+		Returns the errors stored for the given key, or :py:obj:`None` if there is no entry.
+
+		.. versionchanged:: 0.6.0  Returns :class:`~.ErrorRecords`.
+
+		:param key:
+		"""
+
+		path = self._path_for(key)
+
+		try:
+			with open(path, encoding="UTF-8") as fp:
+				errors = ErrorRecords.from_dict(json.load(fp))
+		except (OSError, ValueError, TypeError):
+			# Missing or corrupt entries are treated as cache misses.
+			return None
+
+		# Record the entry as recently used. Access times are unreliable on many filesystems.
+		with contextlib.suppress(OSError):
+			os.utime(path)
+
+		return errors
+
+	def put(self, key: str, errors: Iterable[Tuple[int, int, str]]) -> None:
+		"""
+		Store the errors for the given key.
+
+		Failure to write the entry is not an error, as the errors will simply be recomputed next time.
+
+		:param key:
+		:param errors:
+		"""
+
+		path = self._path_for(key)
+
+		try:
+			path.parent.maybe_make(parents=True)
+			fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+		except OSError:  # pragma: no cover
+			return
+
+		try:
+			with os.fdopen(fd, 'w', encoding="UTF-8") as fp:
+				if not isinstance(errors, ErrorRecords):
+					errors = ErrorRecords(errors)
+				json.dump(errors.to_dict(), fp)
+			os.replace(tmp_name, path)
+		except OSError:  # pragma: no cover
+			with contextlib.suppress(OSError):
+				os.unlink(tmp_name)
+
+
+def _acquire_lock(lock_file: PathPlus) -> bool:
+	try:
+		os.close(os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+		return True
+	except FileExistsError:
+		pass
+	except OSError:  # pragma: no cover
+		return False
+
+	# Reclaim locks left behind by processes which died while pruning.
+	try:
+		if time.time() - os.stat(lock_file).st_mtime < _STALE_LOCK_AGE:
+			return False
+		os.unlink(lock_file)
+		os.close(os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+		return True
+	except OSError:
+		return False
+
+
+def _make_parso_writes_atomic() -> None:
+	# parso (which jedi uses to cache parsed modules) writes its pickles in place,
+	# so a flake8 worker can read a file another worker has only partially written.
+	# Writing to a temporary file and renaming it into place means readers only ever see complete files.
+
+	try:
+		# 3rd party
+		import parso.cache  # nodep
+	except ImportError:  # pragma: no cover
+		return
+
+	if getattr(parso.cache._save_to_file_system, "_flake8_encodings_atomic", False):
+		return
+
+	# stdlib
+	import pickle
+
+	def _save_to_file_system(hashed_grammar, path, item, cache_path=None) -> None:  # noqa: MAN001
+		target = parso.cache._get_hashed_path(hashed_grammar, path, cache_path=cache_path)
+		fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+
+		try:
+			with os.fdopen(fd, "wb") as fp:
+				pickle.dump(item, fp, pickle.HIGHEST_PROTOCOL)
+			os.replace(tmp_name, target)
+		except BaseException:
+			with contextlib.suppress(OSError):
+				os.unlink(tmp_name)
+			raise
+
+	_save_to_file_system._flake8_encodings_atomic = True  # type: ignore[attr-defined]
+	parso.cache._save_to_file_system = _save_to_file_system
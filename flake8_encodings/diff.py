@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+#
+#  diff.py
+"""
+Determine which lines have changed, so only those need to be checked.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import functools
+import os
+import re
+import subprocess
+from typing import Dict, FrozenSet, Optional, Set
+
+# 3rd party
+from domdf_python_tools.typing import PathLike
+
+__all__ = ["ChangedLines", "get_changed_lines", "parse_diff"]
+
+#: Mapping of absolute, normalised filenames to the numbers of the lines which have changed in them.
+ChangedLines = Dict[str, FrozenSet[int]]
+
+_hunk_re = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def parse_diff(diff: str, root: PathLike = '.') -> ChangedLines:
+	"""
+	Returns the lines added or modified by the given unified diff, such as the output of ``git diff``.
+
+	Lines which were only removed are not included, as there is nothing left on them to check.
+
+	:param diff:
+	:param root: The directory the paths in the diff are relative to.
+	"""
+
+	changed: Dict[str, Set[int]] = {}
+	current: Optional[Set[int]] = None
+
+	for line in diff.splitlines():
+		if line.startswith("+++ "):
+			path = line[4:].split('\t', 1)[0].strip('"')
+
+			if path == "/dev/null":
+				# The file was deleted.
+				current = None
+				continue
+
+			if path.startswith("b/"):
+				path = path[2:]
+
+			current = changed.setdefault(os.path.normpath(os.path.abspath(os.path.join(root, path))), set())
+
+		elif current is not None:
+			match = _hunk_re.match(line)
+
+			if match:
+				start, count = int(match.group(1)), int(match.group(2) or 1)
+				current.update(range(start, start + count))
+
+	return {filename: frozenset(lines) for filename, lines in changed.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def get_changed_lines(base: str, cwd: Optional[str] = None) -> ChangedLines:
+	"""
+	Returns the lines which have changed in the working tree since the given ``git`` revision.
+
+	The result is cached for the lifetime of the process,
+	so worker processes started by :mod:`multiprocessing` with ``fork`` do not need to run ``git`` again.
+
+	:param base: The revision to compare with, e.g. ``'origin/master'`` or ``'HEAD~1'``.
+	:param cwd: A directory within the repository. Defaults to the current working directory.
+
+	:raises ValueError: If ``git`` fails, e.g. if the revision does not exist.
+	"""
+
+	def git(*args: str) -> str:
+		try:
+			process = subprocess.run(
+					["git", *args],
+					cwd=cwd,
+					stdout=subprocess.PIPE,
+					stderr=subprocess.PIPE,
+					encoding="UTF-8",
+					errors="surrogateescape",
+					check=True,
+					)
+		except FileNotFoundError:
+			raise ValueError("Could not determine the changed lines: 'git' could not be found.") from None
+		except subprocess.CalledProcessError as e:
+			raise ValueError(f"Could not determine the changed lines since {base!r}: {e.stderr.strip()}") from None
+
+		return process.stdout
+
+	root = git("rev-parse", "--show-toplevel").strip()
+	diff = git("diff", "--unified=0", "--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/", base, "--")
+
+	return parse_diff(diff, root)
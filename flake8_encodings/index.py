@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+#
+#  index.py
+"""
+An index of the types of functions, attributes and module globals defined across a project.
+
+Code often creates paths and config parsers in helper functions in other modules,
+e.g. ``def data_dir() -> Path``. Without the index ``jedi`` has to follow those definitions again in every file.
+The index records their types once, from annotations and constructor calls,
+so the :class:`~.ClassVisitor` can look them up directly.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import ast
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# 3rd party
+from domdf_python_tools.typing import PathLike
+
+# this package
+from flake8_encodings import _checked_classes
+
+__all__ = [
+		"INDEX_EXCLUDE",
+		"TypeIndex",
+		"get_imported_modules",
+		"get_module_name",
+		"get_type_index",
+		"index_module",
+		"resolve_import",
+		]
+
+#: Directories which are not indexed, in addition to those skipped by the batch mode.
+INDEX_EXCLUDE = (".venv", "venv", "env", "build", "dist", "node_modules", "site-packages")
+
+# Increment when the format of the index file changes, so old indexes are rebuilt.
+_FORMAT_VERSION = 2
+
+# The type of a value: either ("type", <class>) from an annotation,
+# or ("call", <callable>) for the result of calling a function or class, which is resolved on lookup.
+_Value = Tuple[str, str]
+
+
+def get_module_name(filename: PathLike) -> str:
+	"""
+	Returns the dotted name of the module in the given file, e.g. ``'pkg.sub.mod'`` for ``src/pkg/sub/mod.py``.
+
+	The name is determined by the packages (directories containing an ``__init__.py`` file) the module is within.
+
+	:param filename:
+	"""
+
+	directory, basename = os.path.split(os.path.abspath(filename))
+	parts = [] if basename == "__init__.py" else [os.path.splitext(basename)[0]]
+
+	while os.path.isfile(os.path.join(directory, "__init__.py")):
+		directory, package = os.path.split(directory)
+		parts.insert(0, package)
+
+	return '.'.join(parts)
+
+
+def resolve_import(node: ast.ImportFrom, module: str, is_package: bool = False) -> Optional[str]:
+	"""
+	Returns the absolute name of the module imported from by the given ``from ... import`` statement.
+
+	:param node:
+	:param module: The name of the module containing the statement.
+	:param is_package: Whether that module is a package (i.e. an ``__init__.py`` file).
+	"""
+
+	if not node.level:
+		return node.module
+
+	parts = module.split('.')
+	if not is_package:
+		parts = parts[:-1]
+
+	if node.level > 1:
+		if node.level - 1 > len(parts):
+			return None
+		parts = parts[:len(parts) - (node.level - 1)]
+
+	if node.module:
+		parts.append(node.module)
+
+	return '.'.join(parts) or None
+
+
+def get_imported_modules(tree: ast.AST, module: str, is_package: bool = False) -> List[str]:
+	"""
+	Returns the absolute names of the modules imported anywhere in the given module.
+
+	For ``from pkg import name`` both ``pkg`` and ``pkg.name`` are included, as ``name`` may be a submodule.
+
+	:param tree:
+	:param module: The name of the module.
+	:param is_package: Whether the module is a package (i.e. an ``__init__.py`` file).
+	"""
+
+	imported: Set[str] = set()
+
+	for node in ast.walk(tree):
+		if isinstance(node, ast.Import):
+			imported.update(alias.name for alias in node.names)
+
+		elif isinstance(node, ast.ImportFrom):
+			base = resolve_import(node, module, is_package)
+			if base is not None:
+				imported.add(base)
+				imported.update(f"{base}.{alias.name}" for alias in node.names if alias.name != '*')
+
+	return sorted(imported)
+
+
+class _ModuleIndexer:
+	# Records the types of the functions, classes, attributes and globals defined in one module.
+
+	def __init__(self, module: str, is_package: bool):
+		self.module = module
+		self.is_package = is_package
+		self.imports: Dict[str, str] = {}
+		self.local_names: Set[str] = set()
+		self.returns: Dict[str, str] = {}
+		self.values: Dict[str, _Value] = {}
+		self.classes: List[str] = []
+
+	def qualify(self, node: Optional[ast.AST]) -> Optional[str]:
+		# Returns the fully qualified name referred to by the given expression, if it can be determined.
+
+		if isinstance(node, ast.Name):
+			if node.id in self.imports:
+				return self.imports[node.id]
+			elif node.id in self.local_names:
+				return f"{self.module}.{node.id}"
+
+		elif isinstance(node, ast.Attribute):
+			value = self.qualify(node.value)
+			if value is not None:
+				return f"{value}.{node.attr}"
+
+		return None
+
+	def annotation(self, node: Optional[ast.AST]) -> Optional[str]:
+		# Returns the class named by the given annotation, if it can be determined.
+
+		if isinstance(node, ast.Constant) and isinstance(node.value, str):
+			try:
+				node = ast.parse(node.value, mode="eval").body
+			except SyntaxError:
+				return None
+
+		if isinstance(node, ast.Subscript) and self.qualify(node.value) in {"typing.Optional", "Optional"}:
+			# Optional[Path]
+			node = node.slice
+			if sys.version_info < (3, 9) and isinstance(node, ast.Index):  # pragma: no cover (py39+)
+				node = node.value  # type: ignore[attr-defined]
+
+		elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+			# Path | None
+			if isinstance(node.right, ast.Constant) and node.right.value is None:
+				node = node.left
+			elif isinstance(node.left, ast.Constant) and node.left.value is None:
+				node = node.right
+
+		return self.qualify(node)
+
+	def value(self, annotation: Optional[ast.AST], value: Optional[ast.AST]) -> Optional[_Value]:
+		type_name = self.annotation(annotation)
+		if type_name is not None:
+			return ("type", type_name)
+
+		if isinstance(value, ast.Call):
+			func = self.qualify(value.func)
+			if func is not None:
+				return ("call", func)
+
+		return None
+
+	def index(self, tree: ast.Module) -> None:
+		# Names are collected first, so annotations can refer to classes defined later in the module.
+
+		for node in tree.body:
+			if isinstance(node, ast.Import):
+				for alias in node.names:
+					if alias.asname:
+						self.imports[alias.asname] = alias.name
+					else:
+						top_level = alias.name.split('.', 1)[0]
+						self.imports[top_level] = top_level
+
+			elif isinstance(node, ast.ImportFrom):
+				module = resolve_import(node, self.module, self.is_package)
+				if module is not None:
+					for alias in node.names:
+						self.imports[alias.asname or alias.name] = f"{module}.{alias.name}"
+
+			elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+				self.local_names.add(node.name)
+
+		for node in tree.body:
+			self.index_statement(node, self.module)
+
+	def index_statement(self, node: ast.AST, owner: str, class_name: Optional[str] = None) -> None:
+		if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+			qualname = f"{owner}.{node.name}"
+			returns = self.annotation(node.returns)
+
+			is_property = any(
+					(isinstance(d, ast.Name) and d.id == "property") or self.qualify(d) == "functools.cached_property"
+					for d in node.decorator_list
+					)
+
+			if returns is not None:
+				if is_property and class_name is not None:
+					self.values[qualname] = ("type", returns)
+				else:
+					self.returns[qualname] = returns
+
+			if class_name is not None:
+				self.index_instance_attributes(node, class_name)
+
+		elif isinstance(node, ast.ClassDef):
+			qualname = f"{owner}.{node.name}"
+			self.classes.append(qualname)
+
+			for statement in node.body:
+				self.index_statement(statement, qualname, class_name=qualname)
+
+		elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+			value = self.value(node.annotation, node.value)
+			if value is not None:
+				self.values[f"{owner}.{node.target.id}"] = value
+
+		elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+			value = self.value(None, node.value)
+			if value is not None:
+				self.values[f"{owner}.{node.targets[0].id}"] = value
+
+	def index_instance_attributes(self, function: ast.AST, class_name: str) -> None:
+		# Attributes assigned in methods, e.g. "self.path = Path(filename)"
+
+		for node in ast.walk(function):
+			if isinstance(node, ast.Assign) and len(node.targets) == 1:
+				target, annotation = node.targets[0], None
+			elif isinstance(node, ast.AnnAssign):
+				target, annotation = node.target, node.annotation
+			else:
+				continue
+
+			if (
+					isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+					and target.value.id == "self"
+					):
+				value = self.value(annotation, node.value)
+				if value is not None:
+					self.values.setdefault(f"{class_name}.{target.attr}", value)
+
+
+def index_module(tree: ast.Module, module: str, is_package: bool = False) -> Dict[str, Any]:
+	"""
+	Returns the types of the functions, attributes and globals defined in the given module.
+
+	:param tree:
+	:param module: The name of the module.
+	:param is_package: Whether the module is a package (i.e. an ``__init__.py`` file).
+
+	:returns: A dictionary with the keys ``'returns'`` (functions and methods, mapped to their return type),
+		``'values'`` (globals and attributes, mapped to their type), ``'classes'`` (the classes defined in the module)
+		and ``'imports'`` (the modules it imports, as returned by :func:`~.get_imported_modules`).
+	"""
+
+	indexer = _ModuleIndexer(module, is_package)
+	indexer.index(tree)
+
+	return {
+			"returns": indexer.returns,
+			"values": {name: list(value) for name, value in indexer.values.items()},
+			"classes": indexer.classes,
+			"imports": get_imported_modules(tree, module, is_package),
+			}
+
+
+class TypeIndex:
+	"""
+	The types of functions, attributes and module globals defined across a project, keyed by their qualified names.
+
+	The index is updated incrementally: only files whose modification time, size and contents have changed
+	since the index was saved are parsed again.
+	"""
+
+	def __init__(self) -> None:
+		#: Mapping of functions and methods to the classes they return.
+		self.returns: Dict[str, str] = {}
+
+		#: Mapping of module globals and attributes to their types.
+		self.values: Dict[str, _Value] = {}
+
+		#: The classes defined in the project.
+		self.classes: Set[str] = set()
+
+		self._files: Dict[str, Dict[str, Any]] = {}
+		self._digest: Optional[str] = None
+
+		# The indexed files containing each module.
+		self._modules: Dict[str, List[str]] = {}
+
+	@classmethod
+	def load(cls, filename: PathLike) -> "TypeIndex":
+		"""
+		Load the index from the given file.
+
+		An empty index is returned if the file does not exist or cannot be read.
+
+		:param filename:
+		"""
+
+		index = cls()
+
+		try:
+			with open(filename, encoding="UTF-8") as fp:
+				data = json.load(fp)
+		except (OSError, ValueError):
+			return index
+
+		if isinstance(data, dict) and data.get("version") == _FORMAT_VERSION:
+			index._files = data.get("files", {})
+			index._merge()
+
+		return index
+
+	def save(self, filename: PathLike) -> None:
+		"""
+		Save the index to the given file.
+
+		The file is written to a temporary file and renamed into place,
+		so concurrent processes never read a partially written index.
+
+		:param filename:
+		"""
+
+		directory = os.path.dirname(os.path.abspath(filename))
+
+		try:
+			os.makedirs(directory, exist_ok=True)
+			fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+		except OSError:  # pragma: no cover
+			return
+
+		try:
+			with os.fdopen(fd, 'w', encoding="UTF-8") as fp:
+				json.dump({"version": _FORMAT_VERSION, "files": self._files}, fp)
+			os.replace(tmp_name, filename)
+		except OSError:  # pragma: no cover
+			with contextlib.suppress(OSError):
+				os.unlink(tmp_name)
+
+	def update(self, filenames: Iterable[str]) -> int:
+		"""
+		Update the index from the given files, and remove any other files from it.
+
+		:param filenames:
+
+		:returns: The number of files which were parsed or removed.
+		"""
+
+		# stdlib
+		import hashlib
+
+		files: Dict[str, Dict[str, Any]] = {}
+		changed = 0
+
+		for filename in filenames:
+			filename = os.path.abspath(filename)
+
+			try:
+				stat = os.stat(filename)
+			except OSError:
+				continue
+
+			previous = self._files.get(filename)
+			if previous is not None and previous["mtime"] == stat.st_mtime and previous["size"] == stat.st_size:
+				files[filename] = previous
+				continue
+
+			try:
+				with open(filename, "rb") as fp:
+					source = fp.read()
+			except OSError:  # pragma: no cover
+				continue
+
+			digest = hashlib.sha256(source).hexdigest()
+
+			if previous is not None and previous["hash"] == digest:
+				# Touched, but not changed.
+				files[filename] = dict(previous, mtime=stat.st_mtime, size=stat.st_size)
+				continue
+
+			module = get_module_name(filename)
+
+			try:
+				tree = ast.parse(source, filename=filename)
+			except (SyntaxError, ValueError):
+				entries: Dict[str, Any] = {"returns": {}, "values": {}, "classes": [], "imports": []}
+			else:
+				is_package = os.path.basename(filename) == "__init__.py"
+				entries = index_module(tree, module, is_package)
+
+			files[filename] = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": digest, "module": module, **entries}
+			changed += 1
+
+		changed += len(self._files.keys() - files.keys())
+
+		self._files = files
+		self._merge()
+
+		return changed
+
+	def digest(self) -> str:
+		"""
+		Returns a hash of the contents of the indexed files, which changes whenever the index does.
+		"""
+
+		if self._digest is None:
+			# stdlib
+			import hashlib
+
+			digest = hashlib.sha256()
+			for filename in sorted(self._files):
+				digest.update(f"{filename}\0{self._files[filename]['hash']}\0".encode("UTF-8", "surrogateescape"))
+
+			self._digest = digest.hexdigest()
+
+		return self._digest
+
+	def get_imports(self, filename: PathLike) -> Optional[List[str]]:
+		"""
+		Returns the modules imported by the given file, or :py:obj:`None` if it isn't in the index.
+
+		:param filename:
+		"""
+
+		entries = self._files.get(os.path.abspath(filename))
+		return None if entries is None else entries["imports"]
+
+	def dependency_digest(self, imports: Iterable[str]) -> str:
+		"""
+		Returns a hash of the contents of the indexed modules which a module importing the given modules depends on,
+		directly or through the modules they import in turn.
+
+		The types ``jedi`` infers for the module can only change when one of these does.
+		Modules are identified by name rather than by filename, so the hash is the same for other copies
+		of the project (e.g. a fresh checkout in CI).
+
+		:param imports: The names of the modules imported, as returned by :func:`~.get_imported_modules`.
+		"""
+
+		# stdlib
+		import hashlib
+
+		dependencies: Set[str] = set()
+		pending = list(imports)
+
+		while pending:
+			name = pending.pop()
+			parts = name.split('.')
+
+			# Importing "pkg.mod" also imports "pkg".
+			for end in range(1, len(parts) + 1):
+				for filename in self._modules.get('.'.join(parts[:end]), ()):
+					if filename not in dependencies:
+						dependencies.add(filename)
+						pending.extend(self._files[filename]["imports"])
+
+		digest = hashlib.sha256()
+		for module, content_hash in sorted((self._files[f]["module"], self._files[f]["hash"]) for f in dependencies):
+			digest.update(f"{module}\0{content_hash}\0".encode("UTF-8", "surrogateescape"))
+
+		return digest.hexdigest()
+
+	def _merge(self) -> None:
+		self._digest = None
+		self.returns, self.values, self.classes = {}, {}, set()
+		self._modules = {}
+
+		for filename, entries in self._files.items():
+			self._modules.setdefault(entries["module"], []).append(filename)
+			self.returns.update(entries["returns"])
+			self.values.update({name: tuple(value) for name, value in entries["values"].items()})
+			self.classes.update(entries["classes"])
+
+	def get_return_type(self, qualname: str) -> Optional[str]:
+		"""
+		Returns the class of the object returned by calling the function or class with the given qualified name.
+
+		:param qualname:
+		"""
+
+		if qualname in self.classes or qualname in _checked_classes:
+			return qualname
+
+		return self.returns.get(qualname)
+
+	def get_type(self, qualname: str) -> Optional[str]:
+		"""
+		Returns the class of the module global or attribute with the given qualified name.
+
+		:param qualname:
+		"""
+
+		value = self.values.get(qualname)
+
+		if value is None:
+			return None
+
+		kind, name = value
+		if kind == "call":
+			return self.get_return_type(name)
+
+		return name
+
+
+def get_type_index(root: PathLike, cache_directory: PathLike, update: bool = True) -> TypeIndex:
+	"""
+	Returns the index for the project in the given directory, updating the copy saved in the cache directory.
+
+	:param root: The root directory of the project.
+	:param cache_directory:
+	:param update: Whether to check the project's files for changes.
+		If :py:obj:`False` the saved copy is returned as it is, if there is one.
+		This is used by worker processes, as the main process has just updated it.
+	"""
+
+	# stdlib
+	import hashlib
+
+	# this package
+	from flake8_encodings.batch import DEFAULT_EXCLUDE, iter_python_files
+
+	root = os.path.abspath(root)
+	key = hashlib.sha256(root.encode("UTF-8", "surrogateescape")).hexdigest()[:16]
+	filename = os.path.join(cache_directory, "index", f"{key}.json")
+
+	index = TypeIndex.load(filename)
+
+	if not update and index._files:
+		return index
+
+	if index.update(iter_python_files([root], (*DEFAULT_EXCLUDE, *INDEX_EXCLUDE))):
+		index.save(filename)
+
+	return index
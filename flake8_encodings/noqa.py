@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#
+#  noqa.py
+"""
+Determine which errors will be suppressed by ``# noqa`` comments, so they need not be looked for.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import io
+import re
+import tokenize
+from typing import Dict, Iterable, Optional, Tuple
+
+__all__ = ["SuppressedLines", "find_suppressed_lines", "is_suppressed"]
+
+#: Mapping of line numbers to the codes (or prefixes of codes) suppressed on them,
+#: or :py:obj:`None` if every error on the line is suppressed.
+SuppressedLines = Dict[int, Optional[Tuple[str, ...]]]
+
+# The same expression Flake8 uses.
+_noqa_re = re.compile(r"# noqa(?::[\s]?(?P<codes>([A-Z]+[0-9]+(?:[,\s]+)?)+))?", re.IGNORECASE)
+
+_skipped_tokens = frozenset({tokenize.ENDMARKER, tokenize.DEDENT})
+_newline_tokens = frozenset({tokenize.NL, tokenize.NEWLINE})
+
+
+def find_suppressed_lines(source: str) -> SuppressedLines:
+	"""
+	Returns the lines with ``# noqa`` comments, and the codes suppressed on them.
+
+	As for Flake8, a comment at the end of a string which spans several lines
+	applies to every line of the string.
+
+	:param source:
+	"""
+
+	if not _noqa_re.search(source):
+		# Most files have no noqa comments, and don't need to be tokenized.
+		return {}
+
+	lines = source.splitlines(True)
+	suppressed: SuppressedLines = {}
+	start, end = None, 0
+
+	try:
+		for token in tokenize.generate_tokens(io.StringIO(source).readline):
+			if token.type in _skipped_tokens:
+				continue
+
+			if start is None:
+				start = token.start[0]
+			end = max(end, token.end[0])
+
+			if token.type in _newline_tokens:
+				match = _noqa_re.search(''.join(lines[start - 1:end]))
+
+				if match:
+					codes = match.group("codes")
+					suppressed.update(dict.fromkeys(
+							range(start, end + 1),
+							None if codes is None else tuple(filter(None, re.split(r"[,\s]", codes))),
+							))
+
+				start, end = None, 0
+
+	except (tokenize.TokenError, SyntaxError):
+		# Flake8 doesn't apply noqa comments to files which can't be tokenized.
+		return {}
+
+	return suppressed
+
+
+def is_suppressed(suppressed_lines: SuppressedLines, line: int, codes: Iterable[str]) -> bool:
+	"""
+	Returns whether errors with every one of the given codes would be suppressed on the given line.
+
+	:param suppressed_lines:
+	:param line:
+	:param codes: e.g. ``['ENC021', 'ENC022']``.
+	"""
+
+	if line not in suppressed_lines:
+		return False
+
+	suppressed = suppressed_lines[line]
+
+	if suppressed is None:
+		return True
+
+	return all(code.startswith(suppressed) for code in codes)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+#
+#  records.py
+"""
+Compact storage for the errors found in a file.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union, overload
+
+__all__ = ["Error", "ErrorRecords"]
+
+#: An error, as a tuple of its line number, column offset and message.
+Error = Tuple[int, int, str]
+
+
+class ErrorRecords(Sequence[Error]):
+	r"""
+	A sequence of errors, stored compactly.
+
+	The line numbers, column offsets and messages of the errors are stored in three :class:`array.array`\s,
+	with each message represented by an integer id.
+	The text of the messages is only looked up when the errors are retrieved.
+
+	Instances compare equal to lists of ``(line, col, msg)`` tuples containing the same errors,
+	and can be used in their place.
+
+	:param errors: ``(line, col, msg)`` tuples to populate the records with.
+	"""
+
+	# Each distinct message is stored once per process, and the records refer to it by its index in this list.
+	# The ids are not stable between processes, so the messages themselves are included when serialising.
+	_messages: List[str] = []
+	_message_ids: Dict[str, int] = {}
+
+	__slots__ = ("lines", "columns", "message_ids")
+
+	def __init__(self, errors: Iterable[Error] = ()):
+
+		#: The line number of each error.
+		self.lines = array('I')
+
+		#: The column offset of each error.
+		self.columns = array('I')
+
+		#: The id of the message of each error. See :meth:`~.ErrorRecords.get_message`.
+		self.message_ids = array('I')
+
+		self.extend(errors)
+
+	@classmethod
+	def get_message_id(cls, msg: str) -> int:
+		"""
+		Returns the id for the given message, allocating one if necessary.
+
+		:param msg:
+		"""
+
+		try:
+			return cls._message_ids[msg]
+		except KeyError:
+			message_id = cls._message_ids[msg] = len(cls._messages)
+			cls._messages.append(msg)
+			return message_id
+
+	@classmethod
+	def get_message(cls, message_id: int) -> str:
+		"""
+		Returns the message with the given id.
+
+		:param message_id:
+		"""
+
+		return cls._messages[message_id]
+
+	def add(self, line: int, col: int, msg: str) -> None:
+		"""
+		Add an error to the records.
+
+		:param line:
+		:param col:
+		:param msg:
+		"""
+
+		self.lines.append(line)
+		self.columns.append(col)
+		self.message_ids.append(self.get_message_id(msg))
+
+	def append(self, error: Error) -> None:
+		"""
+		Add an error to the records.
+
+		:param error: A ``(line, col, msg)`` tuple.
+		"""
+
+		self.add(*error)
+
+	def extend(self, errors: Iterable[Error]) -> None:
+		"""
+		Add the given errors to the records.
+
+		:param errors: ``(line, col, msg)`` tuples.
+		"""
+
+		for line, col, msg in errors:
+			self.add(line, col, msg)
+
+	def clear(self) -> None:
+		"""
+		Remove all errors from the records.
+		"""
+
+		del self.lines[:]
+		del self.columns[:]
+		del self.message_ids[:]
+
+	def sort(self) -> None:
+		"""
+		Sort the errors by position, and then by message.
+		"""
+
+		errors = sorted(self)
+		self.clear()
+		self.extend(errors)
+
+	def __len__(self) -> int:
+		return len(self.lines)
+
+	@overload
+	def __getitem__(self, index: int) -> Error: ...
+
+	@overload
+	def __getitem__(self, index: slice) -> "ErrorRecords": ...
+
+	def __getitem__(self, index: Union[int, slice]) -> Union[Error, "ErrorRecords"]:
+		if isinstance(index, slice):
+			records = ErrorRecords()
+			records.lines = self.lines[index]
+			records.columns = self.columns[index]
+			records.message_ids = self.message_ids[index]
+			return records
+
+		return self.lines[index], self.columns[index], self._messages[self.message_ids[index]]
+
+	def __iter__(self) -> Iterator[Error]:
+		messages = self._messages
+
+		for line, col, message_id in zip(self.lines, self.columns, self.message_ids):
+			yield line, col, messages[message_id]
+
+	def __eq__(self, other: object) -> bool:
+		if isinstance(other, (ErrorRecords, list, tuple)):
+			return list(self) == list(other)
+
+		return NotImplemented
+
+	__hash__ = None  # type: ignore[assignment]
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}({list(self)!r})"
+
+	def to_dict(self) -> Dict[str, List[Any]]:
+		"""
+		Returns the records in a form which can be serialised to JSON.
+
+		Each distinct message is only included once.
+		"""
+
+		messages: List[str] = []
+		local_ids: Dict[int, int] = {}
+
+		for message_id in self.message_ids:
+			if message_id not in local_ids:
+				local_ids[message_id] = len(messages)
+				messages.append(self._messages[message_id])
+
+		return {
+				"messages": messages,
+				"lines": self.lines.tolist(),
+				"columns": self.columns.tolist(),
+				"message_ids": [local_ids[message_id] for message_id in self.message_ids],
+				}
+
+	@classmethod
+	def from_dict(cls, data: Dict[str, List[Any]]) -> "ErrorRecords":
+		"""
+		Construct :class:`~.ErrorRecords` from the output of :meth:`~.ErrorRecords.to_dict`.
+
+		:param data:
+
+		:raises ValueError: If the data is malformed.
+		"""
+
+		records = cls()
+
+		try:
+			message_ids = [cls.get_message_id(str(msg)) for msg in data["messages"]]
+			records.lines = array('I', data["lines"])
+			records.columns = array('I', data["columns"])
+			records.message_ids = array('I', (message_ids[local_id] for local_id in data["message_ids"]))
+		except (KeyError, IndexError, TypeError, OverflowError) as e:
+			raise ValueError(f"Malformed error records: {e}") from None
+
+		if not len(records.lines) == len(records.columns) == len(records.message_ids):
+			raise ValueError("The line, column and message arrays must be the same length.")
+
+		return records
+
+	def __reduce__(self):  # noqa: MAN002
+		# The message ids are specific to this process.
+		return self.from_dict, (self.to_dict(), )
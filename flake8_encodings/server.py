@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+#
+#  server.py
+"""
+A long-running server which checks files on request, for editors and ``pre-commit`` hooks.
+
+Starting Python, importing the plugin and warming up ``jedi`` often takes longer than checking a file.
+The server pays those costs once, and keeps the ``jedi`` project, the type index
+and the errors found in each file in memory between requests.
+
+The server listens on a Unix socket (``serve``), and is queried by a thin client (``check``).
+Alternatively it can communicate over standard input and output using the
+`Language Server Protocol <https://microsoft.github.io/language-server-protocol/>`_ (``lsp``).
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+from collections import OrderedDict
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+# 3rd party
+from domdf_python_tools.typing import PathLike
+
+# this package
+from flake8_encodings import Plugin, __version__
+from flake8_encodings.cache import get_cache_directory, get_default_cache_directory
+from flake8_encodings.records import ErrorRecords
+
+__all__ = ["LanguageServer", "Server", "get_default_socket_path", "main", "request", "serve"]
+
+#: The maximum number of files whose errors are kept in memory by the :class:`~.Server`.
+MAX_RESULTS = 1024
+
+#: How often, in seconds, :func:`~.serve` checks whether it has been shut down while waiting for connections.
+ACCEPT_TIMEOUT = 0.5
+
+
+def get_default_socket_path(root: PathLike = '.') -> str:
+	"""
+	Returns the default path of the socket for the server for the project in the given directory.
+
+	:param root: The root directory of the project.
+	"""
+
+	key = hashlib.sha256(os.path.abspath(root).encode("UTF-8", "surrogateescape")).hexdigest()[:16]
+	return os.path.join(get_default_cache_directory(), f"server-{key}.sock")
+
+
+class Server:
+	"""
+	Checks files on request, keeping everything which can be reused between requests in memory.
+
+	The errors found in each file are kept until the file, or any other Python file in the project, changes.
+	The contents of the file (or the source code given with the request) are compared for every request,
+	and the modification times of the project's other files are checked, as changes to one module may change the
+	types ``jedi`` infers in another. Changes to installed packages are not detected.
+
+	:param options: The options to configure the :class:`~.Plugin` with, as returned by ``parse_args``.
+	"""
+
+	def __init__(self, options: argparse.Namespace):
+		self.options = options
+		Plugin.parse_options(options)
+
+		self._results: "OrderedDict[Tuple[str, str], ErrorRecords]" = OrderedDict()
+
+		# Files which have been checked but aren't in the project.
+		self._checked: Set[str] = set()
+		self._mtimes: Dict[str, Optional[Tuple[float, int]]] = self._stat_files()
+
+	def check(self, filename: str, source: Optional[str] = None) -> ErrorRecords:
+		"""
+		Returns the errors in the given file, sorted by position.
+
+		:param filename:
+		:param source: The source code to check, such as the unsaved contents of an editor.
+			If not given the source is read from ``filename``.
+		"""
+
+		# this package
+		from flake8_encodings.batch import check_file
+
+		filename = os.path.abspath(filename)
+		self._refresh()
+
+		if filename not in self._mtimes:
+			self._checked.add(filename)
+			self._mtimes[filename] = _stat(filename)
+
+		if source is None:
+			try:
+				with open(filename, "rb") as fp:
+					digest = hashlib.sha256(fp.read()).hexdigest()
+			except OSError:
+				return check_file(filename)
+		else:
+			digest = hashlib.sha256(source.encode("UTF-8", "surrogatepass")).hexdigest()
+
+		key = (filename, digest)
+
+		if key in self._results:
+			self._results.move_to_end(key)
+			return self._results[key]
+
+		errors = self._results[key] = check_file(filename, source)
+
+		while len(self._results) > MAX_RESULTS:
+			self._results.popitem(last=False)
+
+		return errors
+
+	def invalidate(self) -> None:
+		"""
+		Forget the errors found in every file, and bring the type index up to date.
+		"""
+
+		self._results.clear()
+
+		for attribute in ("type_index", "dependency_index"):
+			if getattr(Plugin, attribute) is not None:
+				# this package
+				from flake8_encodings.index import get_type_index
+
+				setattr(Plugin, attribute, get_type_index(
+						Plugin.project_root or '.',
+						get_cache_directory(Plugin.cache_dir or get_default_cache_directory(), Plugin.cache_size),
+						))
+
+	def _stat_files(self) -> Dict[str, Optional[Tuple[float, int]]]:
+		# The modification time and size of the project's Python files, and the other files which have been checked.
+
+		# this package
+		from flake8_encodings.batch import DEFAULT_EXCLUDE, iter_python_files
+
+		filenames = set(self._checked)
+		filenames.update(map(os.path.abspath, iter_python_files([Plugin.project_root or '.'], DEFAULT_EXCLUDE)))
+
+		return {filename: _stat(filename) for filename in filenames}
+
+	def _refresh(self) -> None:
+		# Files which were added or removed may also change what jedi infers.
+		mtimes = self._stat_files()
+
+		if mtimes != self._mtimes:
+			self._mtimes = mtimes
+			self.invalidate()
+
+	def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+		"""
+		Returns the response to the given request.
+
+		Requests are dictionaries with either a ``"filename"`` key (and optionally ``"source"``),
+		in which case the response contains the ``"errors"`` in that file as ``[line, col, msg]`` lists,
+		or a ``"command"`` key, which may be ``"ping"``, ``"invalidate"`` or ``"shutdown"``.
+
+		:param request:
+		"""
+
+		command = request.get("command", "check")
+
+		try:
+			if command == "check":
+				errors = self.check(request["filename"], request.get("source"))
+				return {"errors": [list(error) for error in errors]}
+			elif command == "ping":
+				return {"version": __version__, "pid": os.getpid()}
+			elif command == "invalidate":
+				self.invalidate()
+				return {}
+			elif command == "shutdown":
+				return {}
+			else:
+				return {"error": f"Unknown command {command!r}."}
+
+		except KeyError as e:
+			return {"error": f"Missing {e} in request."}
+		except Exception as e:  # pragma: no cover
+			return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _stat(filename: str) -> Optional[Tuple[float, int]]:
+	try:
+		stat = os.stat(filename)
+	except OSError:
+		return None
+
+	return stat.st_mtime, stat.st_size
+
+
+def serve(server: Server, address: str) -> None:
+	"""
+	Answer requests sent to the given Unix socket until a ``shutdown`` command is received.
+
+	Each connection may send any number of requests, one JSON object per line,
+	and each is answered with a JSON object on a single line.
+	Connections are handled concurrently, so a client which keeps its connection open doesn't block others,
+	but requests are answered one at a time.
+
+	:param server:
+	:param address: The path of the socket.
+
+	:raises OSError: If the socket is already in use by another server.
+	"""
+
+	if os.path.exists(address):
+		try:
+			request(address, {"command": "ping"})
+		except OSError:
+			# Left behind by a server which didn't exit cleanly.
+			os.unlink(address)
+		else:
+			raise OSError(f"A server is already listening on {address!r}.")
+
+	os.makedirs(os.path.dirname(os.path.abspath(address)), exist_ok=True)
+
+	lock = threading.Lock()
+	stopped = threading.Event()
+
+	def answer(connection: socket.socket) -> None:
+		with connection, connection.makefile("rwb") as stream:
+			for line in stream:
+				try:
+					message = json.loads(line)
+				except ValueError:
+					message = None
+
+				if isinstance(message, dict):
+					with lock:
+						response = server.handle(message)
+				else:
+					message, response = {}, {"error": "Malformed request."}
+
+				stream.write(json.dumps(response).encode("UTF-8") + b'\n')
+				stream.flush()
+
+				if message.get("command") == "shutdown":
+					stopped.set()
+					break
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+		listener.bind(address)
+
+		try:
+			os.chmod(address, 0o600)
+			listener.listen()
+
+			# Periodically stop waiting for connections to check whether the server has been shut down.
+			listener.settimeout(ACCEPT_TIMEOUT)
+
+			while not stopped.is_set():
+				try:
+					connection, _ = listener.accept()
+				except socket.timeout:
+					continue
+
+				connection.settimeout(None)
+				threading.Thread(target=answer, args=(connection, ), daemon=True).start()
+
+		finally:
+			os.unlink(address)
+
+
+def request(address: str, message: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+	"""
+	Send a request to the server listening on the given socket, and return its response.
+
+	:param address: The path of the socket.
+	:param message: The request. See :meth:`Server.handle`.
+	:param timeout: The maximum time to wait for the response, in seconds.
+
+	:raises OSError: If the server cannot be reached.
+	"""
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+		client.settimeout(timeout)
+		client.connect(address)
+
+		with client.makefile("rwb") as stream:
+			stream.write(json.dumps(message).encode("UTF-8") + b'\n')
+			stream.flush()
+			response = stream.readline()
+
+	if not response:
+		raise ConnectionError("The server closed the connection without responding.")
+
+	return json.loads(response)
+
+
+class LanguageServer:
+	"""
+	Publishes the errors in the files open in an editor as diagnostics, using the Language Server Protocol.
+
+	Files are checked when they are opened, changed or saved.
+
+	:param server:
+	:param stdin: The stream messages from the editor are read from.
+	:param stdout: The stream messages to the editor are written to.
+	"""
+
+	def __init__(self, server: Server, stdin: IO[bytes], stdout: IO[bytes]):
+		self.server = server
+		self.stdin = stdin
+		self.stdout = stdout
+
+		# The contents of the open documents, keyed by URI.
+		self.documents: Dict[str, str] = {}
+		self._shutdown = False
+
+	def read_message(self) -> Optional[Dict[str, Any]]:
+		"""
+		Returns the next message from the editor, or :py:obj:`None` if the stream has ended.
+		"""
+
+		headers = {}
+
+		while True:
+			line = self.stdin.readline()
+
+			if not line:
+				return None
+
+			line = line.strip()
+			if not line:
+				break
+
+			name, _, value = line.decode("ASCII").partition(':')
+			headers[name.strip().lower()] = value.strip()
+
+		return json.loads(self.stdin.read(int(headers["content-length"])))
+
+	def send_message(self, message: Dict[str, Any]) -> None:
+		"""
+		Send the given message to the editor.
+
+		:param message:
+		"""
+
+		body = json.dumps({"jsonrpc": "2.0", **message}).encode("UTF-8")
+		self.stdout.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ASCII") + body)
+		self.stdout.flush()
+
+	def publish_diagnostics(self, uri: str) -> None:
+		"""
+		Check the document with the given URI, and send the errors in it to the editor.
+
+		:param uri:
+		"""
+
+		diagnostics = []
+
+		if uri in self.documents:
+			for line, col, msg in self.server.check(_uri_to_path(uri), self.documents[uri]):
+				code, _, text = msg.partition(' ')
+				position = {"line": max(line - 1, 0), "character": col}
+				diagnostics.append({
+						"range": {"start": position, "end": position},
+						"severity": 2,
+						"code": code,
+						"source": "flake8-encodings",
+						"message": text,
+						})
+
+		self.send_message({
+				"method": "textDocument/publishDiagnostics",
+				"params": {"uri": uri, "diagnostics": diagnostics},
+				})
+
+	def run(self) -> int:
+		"""
+		Handle messages from the editor until it asks the server to exit.
+
+		:returns: The exit code, which is ``1`` if the editor exited without first asking the server to shut down.
+		"""
+
+		for message in iter(self.read_message, None):
+			method = message.get("method")
+			params = message.get("params") or {}
+
+			if method == "exit":
+				return 0 if self._shutdown else 1
+
+			elif method == "initialize":
+				result: Any = {
+						"capabilities": {"textDocumentSync": {"openClose": True, "change": 1, "save": True}},
+						"serverInfo": {"name": "flake8-encodings", "version": __version__},
+						}
+
+			elif method == "shutdown":
+				self._shutdown = True
+				result = None
+
+			elif method in {"textDocument/didOpen", "textDocument/didChange", "textDocument/didSave"}:
+				document = params["textDocument"]
+
+				if method == "textDocument/didOpen":
+					self.documents[document["uri"]] = document["text"]
+				elif method == "textDocument/didChange" and params["contentChanges"]:
+					# Only full document synchronisation is supported.
+					self.documents[document["uri"]] = params["contentChanges"][-1]["text"]
+				elif method == "textDocument/didSave":
+					# Other modules may depend on the file which was saved.
+					self.server.invalidate()
+
+				self.publish_diagnostics(document["uri"])
+				continue
+
+			elif method == "textDocument/didClose":
+				uri = params["textDocument"]["uri"]
+				self.documents.pop(uri, None)
+				self.publish_diagnostics(uri)
+				continue
+
+			elif "id" in message:
+				self.send_message({
+						"id": message["id"],
+						"error": {"code": -32601, "message": f"Method not found: {method}"},
+						})
+				continue
+
+			else:
+				# Other notifications are ignored.
+				continue
+
+			if "id" in message:
+				self.send_message({"id": message["id"], "result": result})
+
+		return 1
+
+
+def _uri_to_path(uri: str) -> str:
+	parsed = urlparse(uri)
+
+	if parsed.scheme != "file":
+		return uri
+
+	return url2pathname(unquote(parsed.path))
+
+
+def _get_parser() -> argparse.ArgumentParser:
+	# this package
+	from flake8_encodings.batch import _OptionManager
+
+	parser = argparse.ArgumentParser(
+			prog="python -m flake8_encodings.server",
+			description="Check Python files for incorrect use of encodings, using a long-running server.",
+			)
+	parser.add_argument("--version", action="version", version=f"flake8-encodings {__version__}")
+	commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+	commands.required = True
+
+	socket_parser = argparse.ArgumentParser(add_help=False)
+	socket_parser.add_argument(
+			"--socket",
+			help="The path of the server's socket. (Default: a socket for the current directory in the cache directory)",
+			)
+
+	serve_parser = commands.add_parser(
+			"serve",
+			parents=[socket_parser],
+			help="Start a server which listens on a Unix socket.",
+			)
+	Plugin.add_options(_OptionManager(serve_parser))
+
+	check_parser = commands.add_parser(
+			"check",
+			parents=[socket_parser],
+			help="Check files using the running server.",
+			)
+	check_parser.add_argument("filenames", nargs='*', metavar="FILENAME", help="The files to check.")
+	check_parser.add_argument(
+			"--stdin-filename",
+			help="Check the source code given on standard input, as though it were the contents of this file.",
+			)
+
+	commands.add_parser("stop", parents=[socket_parser], help="Stop the running server.")
+
+	lsp_parser = commands.add_parser(
+			"lsp",
+			help="Start a Language Server Protocol server which communicates over standard input and output.",
+			)
+	Plugin.add_options(_OptionManager(lsp_parser))
+
+	return parser
+
+
+def _iter_requests(options: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+	if options.stdin_filename:
+		yield {"filename": os.path.abspath(options.stdin_filename), "source": sys.stdin.read()}
+
+	for filename in options.filenames:
+		yield {"filename": os.path.abspath(filename)}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+	"""
+	Entry point for ``python -m flake8_encodings.server``.
+
+	:param argv: The command line arguments. Defaults to :py:data:`sys.argv`.
+
+	:returns: For ``check``, ``1`` if any errors were found, and ``2`` if the server could not be reached.
+	"""
+
+	# this package
+	from flake8_encodings.batch import format_default
+
+	options = _get_parser().parse_args(argv)
+
+	if options.command == "lsp":
+		return LanguageServer(Server(options), sys.stdin.buffer, sys.stdout.buffer).run()
+
+	if not hasattr(socket, "AF_UNIX"):  # pragma: no cover
+		print("The server requires Unix sockets, which are not supported on this platform.", file=sys.stderr)
+		return 2
+
+	address = os.path.abspath(options.socket) if options.socket else get_default_socket_path()
+
+	if options.command == "serve":
+		serve(Server(options), address)
+		return 0
+
+	found_errors = False
+	messages: List[Dict[str, Any]]
+
+	if options.command == "stop":
+		messages = [{"command": "shutdown"}]
+	else:
+		messages = list(_iter_requests(options))
+
+	for message in messages:
+		try:
+			response = request(address, message)
+		except OSError as e:
+			print(f"Could not connect to the server at {address!r}: {e}", file=sys.stderr)
+			print("Start it with 'python -m flake8_encodings.server serve'.", file=sys.stderr)
+			return 2
+
+		if "error" in response:
+			print(response["error"], file=sys.stderr)
+			return 2
+
+		if "filename" in message:
+			for line in format_default(os.path.relpath(message["filename"]), response["errors"]):
+				found_errors = True
+				print(line, flush=True)
+
+	return int(found_errors)
+
+
+if __name__ == "__main__":
+	sys.exit(main())
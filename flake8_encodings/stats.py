@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+#
+#  stats.py
+"""
+Optional instrumentation of where ``flake8-encodings`` spends its time.
+
+Statistics are recorded for each file as it is checked and appended to a file in a directory
+shared by all of Flake8's worker processes. When Flake8 exits the main process combines them into a summary.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import atexit
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+__all__ = ["STATS_DIR_ENV_VAR", "Stats", "format_summary", "setup_stats_directory", "summarise"]
+
+#: Environment variable used to share the statistics directory with worker processes started with ``spawn``.
+STATS_DIR_ENV_VAR = "FLAKE8_ENCODINGS_STATS_DIR"
+
+#: The number of slowest files to include in the summary.
+SLOWEST_FILES = 10
+
+_T = TypeVar("_T")
+
+
+class Stats:
+	"""
+	Timings and counters for checking a single file.
+
+	:param filename: The file being checked.
+	"""
+
+	def __init__(self, filename: str):
+		self.filename = filename
+
+		#: Mapping of phase names to the number of seconds spent in them.
+		self.timings: Dict[str, float] = defaultdict(float)
+
+		#: Mapping of counter names to their values.
+		self.counts: Dict[str, int] = defaultdict(int)
+
+		# The time spent in nested timers, for each timer which is running.
+		self._nested: List[float] = []
+
+	@contextlib.contextmanager
+	def timer(self, phase: str) -> Iterator[None]:
+		"""
+		Context manager to add the time spent within it to the given phase.
+
+		Time spent in a nested timer is only added to the inner phase.
+
+		:param phase:
+		"""
+
+		start = time.perf_counter()
+		self._nested.append(0.0)
+
+		try:
+			yield
+		finally:
+			elapsed = time.perf_counter() - start
+			self.timings[phase] += elapsed - self._nested.pop()
+			if self._nested:
+				self._nested[-1] += elapsed
+
+	def iter_timed(self, phase: str, iterable: Iterable[_T]) -> Iterator[_T]:
+		"""
+		Iterate over the given iterable, adding the time spent producing each item to the given phase.
+
+		Unlike wrapping the loop in :meth:`~.Stats.timer`,
+		the time spent by the caller between items is not included.
+
+		:param phase:
+		:param iterable:
+		"""
+
+		iterator = iter(iterable)
+
+		try:
+			while True:
+				with self.timer(phase):
+					try:
+						item = next(iterator)
+					except StopIteration:
+						return
+
+				yield item
+
+		finally:
+			close = getattr(iterator, "close", None)
+			if close is not None:
+				close()
+
+	def count(self, counter: str, value: int = 1) -> None:
+		"""
+		Increment the given counter.
+
+		:param counter:
+		:param value: The amount to increment the counter by.
+		"""
+
+		self.counts[counter] += value
+
+	def record(self, directory: PathLike) -> None:
+		"""
+		Append these statistics to this process's file in the given directory.
+
+		:param directory:
+		"""
+
+		data = {"filename": self.filename, "timings": self.timings, "counts": self.counts}
+
+		with contextlib.suppress(OSError):
+			with open(os.path.join(directory, f"{os.getpid()}.jsonl"), 'a', encoding="UTF-8") as fp:
+				fp.write(json.dumps(data) + '\n')
+
+
+def _is_main_process() -> bool:
+	return multiprocessing.current_process().name == "MainProcess"
+
+
+def setup_stats_directory(stats_file: Optional[str] = None, print_summary: bool = True) -> PathPlus:
+	"""
+	Returns the directory in which statistics for each file are recorded.
+
+	In Flake8's main process the directory is created,
+	and the statistics from all processes are summarised and reported when the process exits.
+	Worker processes reuse the main process's directory.
+
+	:param stats_file: Write the summary as JSON to this file.
+	:param print_summary: Whether to print the summary to standard error.
+	"""
+
+	directory = os.environ.get(STATS_DIR_ENV_VAR)
+
+	if directory is None or not os.path.isdir(directory):
+		directory = tempfile.mkdtemp(prefix="flake8-encodings-stats-")
+		os.environ[STATS_DIR_ENV_VAR] = directory
+
+		if _is_main_process():
+			atexit.register(_report, directory, stats_file, print_summary)
+
+	return PathPlus(directory)
+
+
+def _report(directory: str, stats_file: Optional[str], print_summary: bool) -> None:
+	try:
+		summary = summarise(directory)
+
+		if print_summary:
+			print(format_summary(summary), file=sys.stderr)
+
+		if stats_file:
+			PathPlus(stats_file).dump_json(summary, indent=2)
+
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+		os.environ.pop(STATS_DIR_ENV_VAR, None)
+
+
+def summarise(directory: PathLike) -> Dict[str, Any]:
+	"""
+	Combine the statistics recorded in the given directory.
+
+	:param directory:
+	"""
+
+	timings: Dict[str, float] = defaultdict(float)
+	counts: Dict[str, int] = defaultdict(int)
+	files: List[Dict[str, Any]] = []
+	over_budget: List[str] = []
+
+	for path in sorted(PathPlus(directory).glob("*.jsonl")):
+		for line in path.read_lines():
+			if not line:
+				continue
+
+			try:
+				data = json.loads(line)
+			except ValueError:  # pragma: no cover
+				# Partially written by a process which was killed.
+				continue
+
+			files.append({"filename": data["filename"], "seconds": data["timings"].get("total", 0.0)})
+
+			if data["counts"].get("inference_budget_exceeded"):
+				over_budget.append(data["filename"])
+
+			for phase, seconds in data["timings"].items():
+				timings[phase] += seconds
+			for counter, value in data["counts"].items():
+				counts[counter] += value
+
+	# Time which isn't attributed to any phase, such as looking up results in the cache.
+	phases = sum(seconds for phase, seconds in timings.items() if phase != "total")
+	timings["other"] = max(timings.get("total", 0.0) - phases, 0.0)
+
+	files.sort(key=lambda f: f["seconds"], reverse=True)
+
+	return {
+			"files": len(files),
+			"processes": len(list(PathPlus(directory).glob("*.jsonl"))),
+			"timings": dict(timings),
+			"counts": dict(counts),
+			"slowest_files": files[:SLOWEST_FILES],
+			"over_budget_files": sorted(over_budget),
+			}
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+	"""
+	Format the summary returned by :func:`~.summarise` for display.
+
+	:param summary:
+	"""
+
+	lines = [f"flake8-encodings: checked {summary['files']} files in {summary['processes']} processes", "Timings:"]
+
+	for phase, seconds in sorted(summary["timings"].items(), key=lambda t: t[1], reverse=True):
+		lines.append(f"  {phase:<24} {seconds:>10.3f}s")
+
+	if summary["counts"]:
+		lines.append("Counts:")
+		for counter, value in sorted(summary["counts"].items()):
+			lines.append(f"  {counter:<24} {value:>10}")
+
+	if summary["slowest_files"]:
+		lines.append("Slowest files:")
+		for file in summary["slowest_files"]:
+			lines.append(f"  {file['seconds']:>10.3f}s  {file['filename']}")
+
+	if summary.get("over_budget_files"):
+		lines.append("Files where type inference exceeded the time budget:")
+		for filename in summary["over_budget_files"]:
+			lines.append(f"  {filename}")
+
+	return '\n'.join(lines)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+#
+#  stdlib_types.py
+"""
+The types returned by methods and properties of :mod:`pathlib` classes,
+so chains such as ``Path.home().joinpath("x").read_text()`` can be resolved without ``jedi``.
+
+Without this table ``jedi`` has to follow each method through ``typeshed``
+to learn that the result is still a path.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright © 2020-2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import sys
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+__all__ = [
+		"ATTRIBUTE_NAMES",
+		"CLASS_NAMES",
+		"METHOD_NAMES",
+		"TABLE_VERSION",
+		"get_attribute_type",
+		"get_item_type",
+		"get_method_return_type",
+		"is_path_class",
+		]
+
+#: The version of the tables. This changes whenever the tables do, so cached results are not reused.
+#: The tables also depend on the version of Python, which is part of the cache key anyway.
+TABLE_VERSION = 2
+
+# The classes which the tables apply to, and their base classes.
+_path_bases: Dict[str, Tuple[str, ...]] = {
+		"pathlib.PurePath": ("pathlib.PurePath", ),
+		"pathlib.PurePosixPath": ("pathlib.PurePosixPath", "pathlib.PurePath"),
+		"pathlib.PureWindowsPath": ("pathlib.PureWindowsPath", "pathlib.PurePath"),
+		"pathlib.Path": ("pathlib.Path", "pathlib.PurePath"),
+		"pathlib.PosixPath": ("pathlib.PosixPath", "pathlib.Path", "pathlib.PurePosixPath", "pathlib.PurePath"),
+		"pathlib.WindowsPath": ("pathlib.WindowsPath", "pathlib.Path", "pathlib.PureWindowsPath", "pathlib.PurePath"),
+		}
+
+# Methods which return another path of the same class as the one they are called on
+# (or, for class methods such as Path.home(), the class they are called on),
+# in every supported version of Python.
+_pure_path_methods: Set[str] = {"joinpath", "relative_to", "with_name", "with_suffix"}
+_path_methods: Set[str] = {"absolute", "cwd", "expanduser", "home", "resolve"}
+
+if sys.version_info >= (3, 8):  # pragma: no cover (<py38)
+	# These returned None before Python 3.8.
+	_path_methods.update({"rename", "replace"})
+
+if sys.version_info >= (3, 9):  # pragma: no cover (<py39)
+	_pure_path_methods.add("with_stem")
+	_path_methods.add("readlink")
+
+if sys.version_info >= (3, 12):  # pragma: no cover (<py312)
+	_pure_path_methods.add("with_segments")
+
+_methods_returning_self: Dict[str, FrozenSet[str]] = {
+		"pathlib.PurePath": frozenset(_pure_path_methods),
+		"pathlib.Path": frozenset(_path_methods),
+		}
+
+# Properties which return another path of the same class.
+_attributes_returning_self: Dict[str, FrozenSet[str]] = {
+		"pathlib.PurePath": frozenset({"parent"}),
+		}
+
+# Methods which return iterators of paths of the same class, e.g. "for f in root.glob('*.cfg')".
+_methods_iterating_self: Dict[str, FrozenSet[str]] = {
+		"pathlib.Path": frozenset({"glob", "iterdir", "rglob"}),
+		}
+
+# Properties which return sequences of paths of the same class, e.g. "p.parents[0]".
+_attributes_iterating_self: Dict[str, FrozenSet[str]] = {
+		"pathlib.PurePath": frozenset({"parents"}),
+		}
+
+
+#: The names of the methods in the tables.
+METHOD_NAMES = frozenset().union(*_methods_returning_self.values(), *_methods_iterating_self.values())
+
+#: The names of the attributes in the tables.
+ATTRIBUTE_NAMES = frozenset().union(*_attributes_returning_self.values(), *_attributes_iterating_self.values())
+
+#: The unqualified names of the classes the tables apply to, e.g. ``'Path'``.
+CLASS_NAMES = frozenset(class_name.rsplit('.', 1)[-1] for class_name in _path_bases)
+
+
+def is_path_class(class_name: str) -> bool:
+	"""
+	Returns whether the tables apply to the class with the given fully qualified name.
+
+	:param class_name:
+	"""
+
+	return class_name in _path_bases
+
+
+def _lookup(table: Dict[str, FrozenSet[str]], class_name: str, name: str) -> Optional[str]:
+	for base in _path_bases.get(class_name, ()):
+		if name in table.get(base, ()):
+			return class_name
+
+	return None
+
+
+def get_method_return_type(class_name: str, method_name: str) -> Optional[str]:
+	"""
+	Returns the class of the object returned by the given method, or :py:obj:`None` if it isn't in the table.
+
+	Class methods such as :meth:`pathlib.Path.home` are included, so ``class_name`` may refer to the class itself.
+
+	:param class_name: The fully qualified name of the class.
+	:param method_name:
+	"""
+
+	return _lookup(_methods_returning_self, class_name, method_name)
+
+
+def get_attribute_type(class_name: str, attribute: str) -> Optional[str]:
+	"""
+	Returns the class of the given attribute of an instance, or :py:obj:`None` if it isn't in the table.
+
+	:param class_name: The fully qualified name of the class.
+	:param attribute:
+	"""
+
+	return _lookup(_attributes_returning_self, class_name, attribute)
+
+
+def get_item_type(class_name: str, name: str, method: bool) -> Optional[str]:
+	"""
+	Returns the class of the items of the iterator returned by the given method or attribute,
+	or :py:obj:`None` if it isn't in the table.
+
+	:param class_name: The fully qualified name of the class.
+	:param name: The name of the method or attribute.
+	:param method: Whether ``name`` is a method which is being called, rather than an attribute.
+	"""
+
+	return _lookup(_methods_iterating_self if method else _attributes_iterating_self, class_name, name)
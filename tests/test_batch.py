@@ -0,0 +1,180 @@
+# stdlib
+import json
+import multiprocessing
+import os
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from flake8_encodings import Plugin
+from flake8_encodings.batch import _get_parser, _initialise_worker, iter_python_files, main
+from flake8_encodings.index import TypeIndex
+
+source = "import pathlib\nopen('foo.txt')\npathlib.Path('foo.txt').read_text()\n"
+
+plugin_options = (
+		"cache_dir",
+		"cache_size",
+		"engine",
+		"result_cache",
+		"stats_dir",
+		"project_root",
+		"environment_path",
+		"changed_lines",
+		"type_index",
+		"dependency_index",
+		"max_errors",
+		"disable_noqa",
+		"enabled_codes",
+		"time_budget",
+		"call_budget",
+		)
+
+
+@pytest.fixture()
+def project(tmp_pathplus: PathPlus, monkeypatch) -> PathPlus:
+	# main() configures the Plugin class; make sure that doesn't leak into other tests.
+	for attribute in plugin_options:
+		monkeypatch.setattr(Plugin, attribute, getattr(Plugin, attribute))
+
+	monkeypatch.chdir(tmp_pathplus)
+
+	(tmp_pathplus / "a.py").write_text(source)
+	(tmp_pathplus / "pkg").mkdir()
+	(tmp_pathplus / "pkg" / "b.py").write_text("open('foo.txt', encoding=None)\n")
+	(tmp_pathplus / "pkg" / "c.py").write_text("print('Hello World')\n")
+	(tmp_pathplus / "pkg" / "d.txt").write_text("open('foo.txt')\n")
+	(tmp_pathplus / "pkg" / "broken.py").write_text("def foo(:\n")
+	(tmp_pathplus / ".tox").mkdir()
+	(tmp_pathplus / ".tox" / "e.py").write_text(source)
+
+	return tmp_pathplus
+
+
+def test_iter_python_files(project: PathPlus):
+	expected = ["a.py", os.path.join("pkg", "b.py"), os.path.join("pkg", "broken.py"), os.path.join("pkg", "c.py")]
+	assert list(iter_python_files(['.'])) == expected
+	assert list(iter_python_files(["**/b.py", "pkg/b.py"])) == [os.path.join("pkg", "b.py")]
+	assert list(iter_python_files(["pkg"], exclude=["broken.py", "c.py"])) == [os.path.join("pkg", "b.py")]
+
+	# Files given explicitly are always checked.
+	assert list(iter_python_files([".tox/e.py"])) == [os.path.join(".tox", "e.py")]
+
+
+@pytest.mark.parametrize("jobs", ['1', '2'])
+def test_main(project: PathPlus, capsys, jobs: str):
+	assert main(["--encodings-engine", "ast", "--jobs", jobs]) == 1
+
+	assert sorted(capsys.readouterr().out.splitlines()) == [
+			"a.py:2:1: ENC001 no encoding specified for 'open'.",
+			"a.py:3:1: ENC023 no encoding specified for 'pathlib.Path.read_text'.",
+			f"{os.path.join('pkg', 'b.py')}:1:1: ENC002 'encoding=None' used for 'open'.",
+			f"{os.path.join('pkg', 'broken.py')}:1:9: E999 SyntaxError: invalid syntax",
+			]
+
+
+def test_main_no_errors(project: PathPlus, capsys):
+	assert main(["pkg/c.py", "--encodings-engine", "ast"]) == 0
+	assert capsys.readouterr().out == ''
+
+
+def test_main_json(project: PathPlus):
+	assert main(["a.py", "pkg/c.py", "--format", "json", "--output-file", "out.json", "-j1"]) == 1
+
+	assert (project / "out.json").load_json() == {
+			"a.py": [
+					{
+							"code": "ENC001",
+							"filename": "a.py",
+							"line_number": 2,
+							"column_number": 1,
+							"text": "no encoding specified for 'open'.",
+							},
+					{
+							"code": "ENC023",
+							"filename": "a.py",
+							"line_number": 3,
+							"column_number": 1,
+							"text": "no encoding specified for 'pathlib.Path.read_text'.",
+							},
+					],
+			os.path.join("pkg", "c.py"): [],
+			}
+
+
+def test_main_sarif(project: PathPlus, capsys):
+	assert main(["a.py", "--format", "sarif", "-j1"]) == 1
+
+	sarif = json.loads(capsys.readouterr().out)
+	assert sarif["version"] == "2.1.0"
+
+	run = sarif["runs"][0]
+	assert [rule["id"] for rule in run["tool"]["driver"]["rules"]] == ["ENC001", "ENC023"]
+	assert [result["ruleId"] for result in run["results"]] == ["ENC001", "ENC023"]
+	assert run["results"][0]["locations"][0]["physicalLocation"] == {
+			"artifactLocation": {"uri": "a.py"},
+			"region": {"startLine": 2, "startColumn": 1},
+			}
+
+
+def test_main_diff_file(project: PathPlus, capsys):
+	(project / "changes.diff").write_lines([
+			"diff --git a/a.py b/a.py",
+			"--- a/a.py",
+			"+++ b/a.py",
+			"@@ -3 +3 @@ import pathlib",
+			"-pathlib.Path('foo.txt').read_text(encoding='UTF-8')",
+			"+pathlib.Path('foo.txt').read_text()",
+			])
+
+	assert main(["--encodings-engine", "ast", "--encodings-diff-file", "changes.diff", "-j1"]) == 1
+	assert capsys.readouterr().out.splitlines() == [
+			"a.py:3:1: ENC023 no encoding specified for 'pathlib.Path.read_text'.",
+			]
+
+
+def test_main_noqa(project: PathPlus, capsys):
+	(project / "a.py").write_lines([
+			"import pathlib",
+			"open('foo.txt')  # noqa: ENC001",
+			"pathlib.Path('foo.txt').read_text()  # noqa",
+			])
+
+	assert main(["a.py", "--encodings-engine", "ast"]) == 0
+	assert capsys.readouterr().out == ''
+
+	assert main(["a.py", "--encodings-engine", "ast", "--disable-noqa"]) == 1
+	assert capsys.readouterr().out.splitlines() == [
+			"a.py:2:1: ENC001 no encoding specified for 'open'.",
+			"a.py:3:1: ENC023 no encoding specified for 'pathlib.Path.read_text'.",
+			]
+
+
+def test_initialise_worker(project: PathPlus, monkeypatch):
+	pytest.importorskip("jedi")
+
+	args = ["--encodings-result-cache", "--encodings-cache-dir", str(project / "cache")]
+	options = _get_parser().parse_args(args)
+	index_options = _get_parser().parse_args([*args, "--encodings-type-index"])
+
+	# The main process checks every file in the project.
+	Plugin.parse_options(options)
+	dependency_index = Plugin.dependency_index
+	Plugin.parse_options(index_options)
+	type_index = Plugin.type_index
+	assert dependency_index is not None
+	assert type_index is not None
+
+	# Worker processes reuse what the main process found, rather than checking the files again.
+	monkeypatch.setattr(multiprocessing.current_process(), "name", "Process-1")
+	monkeypatch.setattr(TypeIndex, "update", lambda *args: pytest.fail("The index should not be updated"))
+	(project / "a.py").write_text("print('Hello World')\n")
+
+	_initialise_worker(options)
+	assert Plugin.dependency_index is not None
+	assert Plugin.dependency_index.digest() == dependency_index.digest()
+	_initialise_worker(index_options)
+	assert Plugin.type_index is not None
+	assert Plugin.type_index.digest() == type_index.digest()
@@ -0,0 +1,158 @@
+# stdlib
+import ast
+import multiprocessing
+import os
+from typing import List
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from flake8_encodings import Plugin
+from flake8_encodings.cache import (
+		_TEMPORARY_DIR_ENV_VAR,
+		ResultCache,
+		get_cache_directory,
+		jedi_cache_directory,
+		prune_cache
+		)
+from flake8_encodings.index import get_type_index
+from tests.example_source import example_source
+
+
+def test_get_cache_directory_temporary():
+	directory = get_cache_directory()
+	assert directory.is_dir()
+	assert get_cache_directory() == directory
+
+
+def test_get_cache_directory_persistent(tmp_pathplus: PathPlus):
+	directory = get_cache_directory(tmp_pathplus / "cache", max_size=1)
+	assert directory == tmp_pathplus / "cache"
+	assert directory.is_dir()
+
+
+def test_get_cache_directory_temporary_shared(monkeypatch):
+	directory = get_cache_directory()
+
+	# Worker processes inherit the directory through the environment, rather than creating their own.
+	monkeypatch.setattr(multiprocessing.current_process(), "name", "Worker-1")
+	assert os.environ[_TEMPORARY_DIR_ENV_VAR] == str(directory)
+	assert get_cache_directory() == directory
+
+
+def test_prune_cache(tmp_pathplus: PathPlus):
+	for idx, subdirectory in enumerate(["jedi", "results", "index", "jedi"]):
+		path = tmp_pathplus / subdirectory / f"{idx}.pkl"
+		path.parent.maybe_make()
+		path.write_bytes(b'\0' * 512 * 1024)
+		os.utime(path, (idx, idx))
+
+	# Files which don't belong to the plugin are left alone, e.g. if the cache directory is ~/.cache
+	(tmp_pathplus / "other.pkl").write_bytes(b'\0' * 2 * 1024 * 1024)
+	os.utime(tmp_pathplus / "other.pkl", (0, 0))
+
+	assert prune_cache(tmp_pathplus, max_size=1)
+
+	assert sorted(p.relative_to(tmp_pathplus).as_posix() for p in tmp_pathplus.rglob("*.pkl")) == [
+			"index/2.pkl",
+			"jedi/3.pkl",
+			"other.pkl",
+			]
+
+
+def test_prune_cache_locked(tmp_pathplus: PathPlus):
+	(tmp_pathplus / ".flake8-encodings.lock").touch()
+	(tmp_pathplus / "0.pkl").write_bytes(b'\0' * 2 * 1024 * 1024)
+
+	assert not prune_cache(tmp_pathplus, max_size=1)
+	assert (tmp_pathplus / "0.pkl").is_file()
+
+
+def test_plugin_persistent_cache(tmp_pathplus: PathPlus, monkeypatch):
+	jedi = pytest.importorskip("jedi")
+
+	(tmp_pathplus / "code.py").write_text(example_source)
+	monkeypatch.setattr(Plugin, "cache_dir", str(tmp_pathplus / "cache"))
+	original_cache_dir = jedi.settings.cache_directory
+
+	plugin = Plugin(ast.parse(example_source), filename=str(tmp_pathplus / "code.py"))
+	assert list(plugin.run())
+
+	assert jedi.settings.cache_directory == original_cache_dir
+	assert (tmp_pathplus / "cache").is_dir()
+
+
+def test_result_cache(tmp_pathplus: PathPlus):
+	cache = ResultCache(tmp_pathplus)
+	key = cache.make_key("open('foo.txt')", ["code.py", "ast"])
+
+	assert key != cache.make_key("open('foo.txt')", ["code.py", "jedi"])
+	assert cache.get(key) is None
+
+	cache.put(key, [(1, 0, "ENC001 no encoding specified for 'open'.")])
+	assert cache.get(key) == [(1, 0, "ENC001 no encoding specified for 'open'.")]
+
+	(tmp_pathplus / "results" / key[:2] / f"{key}.json").write_text("[[1, 0")
+	assert cache.get(key) is None
+
+
+def test_plugin_result_cache(tmp_pathplus: PathPlus, monkeypatch):
+	monkeypatch.setattr(Plugin, "cache_dir", str(tmp_pathplus / "cache"))
+	monkeypatch.setattr(Plugin, "result_cache", True)
+	monkeypatch.setattr(Plugin, "engine", "ast")
+
+	source = "open('foo.txt')\n"
+	(tmp_pathplus / "code.py").write_text(source)
+
+	plugin = Plugin(ast.parse(source), filename=str(tmp_pathplus / "code.py"))
+	assert [error[:3] for error in plugin.run()] == [(1, 0, "ENC001 no encoding specified for 'open'.")]
+
+	# Subsequent runs use the cached errors rather than checking the file.
+	monkeypatch.setattr(Plugin, "_iter_errors", lambda self, *args: pytest.fail("Should be cached"))
+	plugin = Plugin(ast.parse(source), filename=str(tmp_pathplus / "code.py"))
+	assert [error[:3] for error in plugin.run()] == [(1, 0, "ENC001 no encoding specified for 'open'.")]
+
+
+def test_plugin_result_cache_jedi(tmp_pathplus: PathPlus, monkeypatch):
+	pytest.importorskip("jedi")
+
+	(tmp_pathplus / "project").mkdir()
+	(tmp_pathplus / "project" / "code.py").write_text("import helpers\nhelpers.data_dir().read_text()\n")
+	(tmp_pathplus / "project" / "helpers.py").write_text("import pathlib\ndef data_dir(): ...\n")
+	(tmp_pathplus / "project" / "unrelated.py").write_text("x = 1\n")
+
+	def get_context() -> List[str]:
+		index = get_type_index(tmp_pathplus / "project", tmp_pathplus / "cache")
+		monkeypatch.setattr(Plugin, "dependency_index", index)
+
+		source = (tmp_pathplus / "project" / "code.py").read_text()
+		plugin = Plugin(ast.parse(source), filename=str(tmp_pathplus / "project" / "code.py"))
+		return plugin._get_cache_context("jedi")
+
+	context = get_context()
+
+	# Only changes to the modules the file imports affect the types jedi infers.
+	(tmp_pathplus / "project" / "unrelated.py").write_text("x = 2\n")
+	assert get_context() == context
+
+	(tmp_pathplus / "project" / "helpers.py").write_text("import pathlib\ndef data_dir(): return pathlib.Path()\n")
+	assert get_context() != context
+
+
+def test_jedi_cache_directory(tmp_pathplus: PathPlus):
+	jedi = pytest.importorskip("jedi")
+	parso_cache = pytest.importorskip("parso.cache")
+
+	original_cache_dir = jedi.settings.cache_directory
+
+	with jedi_cache_directory(tmp_pathplus) as directory:
+		# jedi's files are kept in a subdirectory, which is all that is pruned.
+		assert directory == tmp_pathplus / "jedi"
+		assert jedi.settings.cache_directory == str(tmp_pathplus / "jedi")
+
+		# The directory may be shared with other processes, so parso's cache files are written atomically.
+		assert getattr(parso_cache._save_to_file_system, "_flake8_encodings_atomic", False)
+
+	assert jedi.settings.cache_directory == original_cache_dir
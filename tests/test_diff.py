@@ -0,0 +1,123 @@
+# stdlib
+import ast
+import os
+import subprocess
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from flake8_encodings import ClassVisitor, Plugin, TypeTrackingVisitor, Visitor
+from flake8_encodings.diff import get_changed_lines, parse_diff
+
+diff = """\
+diff --git a/code.py b/code.py
+index 1234567..89abcde 100644
+--- a/code.py
++++ b/code.py
+@@ -2,0 +3,2 @@ import pathlib
++open("a.txt")
++open("b.txt")
+@@ -10 +12 @@ def foo():
+-	pass
++	return 1
+@@ -20,3 +21,0 @@ def bar():
+-	x
+-	y
+-	z
+diff --git a/removed.py b/removed.py
+deleted file mode 100644
+--- a/removed.py
++++ /dev/null
+@@ -1 +0,0 @@
+-print("Hello World")
+"""
+
+
+def test_parse_diff(tmp_pathplus: PathPlus):
+	assert parse_diff(diff, tmp_pathplus) == {
+			os.path.normpath(tmp_pathplus / "code.py"): frozenset({3, 4, 12}),
+			}
+
+
+def test_get_changed_lines(tmp_pathplus: PathPlus):
+	def git(*args: str) -> None:
+		subprocess.run(
+				["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+				cwd=tmp_pathplus,
+				check=True,
+				stdout=subprocess.DEVNULL,
+				)
+
+	try:
+		git("init", "-q")
+	except (OSError, subprocess.CalledProcessError):  # pragma: no cover
+		pytest.skip("git is not available")
+
+	(tmp_pathplus / "code.py").write_lines(["import pathlib", "print('Hello World')", ''])
+	git("add", "code.py")
+	git("commit", "-q", "-m", "Initial commit")
+
+	(tmp_pathplus / "code.py").write_lines(["import pathlib", "open('foo.txt')", "print('Hello World')", ''])
+
+	changed_lines = get_changed_lines("HEAD", str(tmp_pathplus))
+	assert changed_lines == {os.path.normpath(os.path.realpath(tmp_pathplus / "code.py")): frozenset({2})}
+
+	with pytest.raises(ValueError, match="Could not determine the changed lines since 'not-a-revision'"):
+		get_changed_lines("not-a-revision", str(tmp_pathplus))
+
+
+source = """\
+import pathlib
+path = pathlib.Path("foo.txt")
+path.read_text()
+open(
+	"foo.txt",
+	)
+path.write_text("Hello World")
+"""
+
+
+@pytest.mark.parametrize("visitor_type", [Visitor, TypeTrackingVisitor])
+def test_visitor_changed_lines(visitor_type):
+	visitor = visitor_type()
+	visitor.changed_lines = {2, 5, 7}
+	visitor.visit(ast.parse(source))
+
+	# The call to open() spans line 5.
+	assert [error[0] for error in visitor.errors] == ([4, 7] if visitor_type is TypeTrackingVisitor else [4])
+
+
+def test_class_visitor_changed_lines(tmp_pathplus: PathPlus):
+	jedi = pytest.importorskip("jedi")
+
+	visitor = ClassVisitor()
+	visitor.filename = tmp_pathplus / "code.py"
+	visitor.jedi_script = jedi.Script(source, path=visitor.filename)
+	visitor.changed_lines = {7}
+
+	positions = []
+	infer = visitor.jedi_script.infer
+
+	def counting_infer(line, column):
+		positions.append((line, column))
+		return infer(line, column)
+
+	visitor.jedi_script.infer = counting_infer
+	visitor.visit(ast.parse(source))
+
+	assert positions == [(7, 4)]
+	assert [error[0] for error in visitor.errors] == [7]
+
+
+def test_plugin_changed_lines(tmp_pathplus: PathPlus, monkeypatch):
+	filename = tmp_pathplus / "code.py"
+	monkeypatch.setattr(Plugin, "changed_lines", {os.path.normpath(filename): frozenset({3})})
+
+	plugin = Plugin(ast.parse(source), filename=filename, lines=source.splitlines(keepends=True))
+	assert [error[0] for error in plugin.run()] == [3]
+
+	# Files without changes are not checked.
+	plugin = Plugin(ast.parse(source), filename=tmp_pathplus / "other.py", lines=source.splitlines(keepends=True))
+	assert list(plugin.run()) == []
@@ -0,0 +1,278 @@
+# stdlib
+import ast
+import os
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from flake8_encodings import ClassVisitor
+from flake8_encodings.batch import iter_python_files
+from flake8_encodings.index import TypeIndex, get_module_name, get_type_index, index_module, resolve_import
+
+helpers_source = '''
+import configparser
+from pathlib import Path
+from typing import Optional
+
+CONFIG = configparser.ConfigParser()
+README: "Path" = Path("README.rst")
+NAME = "helpers"
+
+def data_dir() -> Path:
+	return Path("data")
+
+def maybe_dir() -> Optional[Path]:
+	return None
+
+def count() -> int:
+	return 1
+
+class Settings:
+	cache: Path
+
+	def __init__(self):
+		self.log_file = Path("log.txt")
+
+	def config_parser(self) -> configparser.ConfigParser:
+		return configparser.ConfigParser()
+
+	@property
+	def output_dir(self) -> Path:
+		return Path("output")
+
+settings = Settings()
+'''
+
+main_source = '''
+import configparser
+from . import helpers
+from .helpers import data_dir, settings, README
+
+data_dir().read_text()
+helpers.data_dir().open()
+helpers.maybe_dir().write_text("Hello World")
+helpers.CONFIG.read("tox.ini")
+settings.config_parser().read("tox.ini")
+helpers.Settings().log_file.read_text()
+settings.output_dir.read_text(encoding="UTF-8")
+README.read_text()
+helpers.count().read_text()
+
+def foo():
+	path = data_dir()
+	path.read_text()
+'''
+
+
+def test_index_module():
+	entries = index_module(ast.parse(helpers_source), "pkg.helpers")
+
+	assert entries["returns"] == {
+			"pkg.helpers.data_dir": "pathlib.Path",
+			"pkg.helpers.maybe_dir": "pathlib.Path",
+			"pkg.helpers.Settings.config_parser": "configparser.ConfigParser",
+			}
+	assert entries["values"] == {
+			"pkg.helpers.CONFIG": ["call", "configparser.ConfigParser"],
+			"pkg.helpers.README": ["type", "pathlib.Path"],
+			"pkg.helpers.Settings.cache": ["type", "pathlib.Path"],
+			"pkg.helpers.Settings.log_file": ["call", "pathlib.Path"],
+			"pkg.helpers.Settings.output_dir": ["type", "pathlib.Path"],
+			"pkg.helpers.settings": ["call", "pkg.helpers.Settings"],
+			}
+	assert entries["classes"] == ["pkg.helpers.Settings"]
+
+
+def test_get_module_name(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "src" / "pkg" / "sub").mkdir(parents=True)
+	(tmp_pathplus / "src" / "pkg" / "__init__.py").touch()
+	(tmp_pathplus / "src" / "pkg" / "sub" / "__init__.py").touch()
+
+	assert get_module_name(tmp_pathplus / "src" / "pkg" / "sub" / "mod.py") == "pkg.sub.mod"
+	assert get_module_name(tmp_pathplus / "src" / "pkg" / "__init__.py") == "pkg"
+	assert get_module_name(tmp_pathplus / "script.py") == "script"
+
+
+@pytest.mark.parametrize(
+		"statement, module, is_package, expected",
+		[
+				("from os import path", "pkg.mod", False, "os"),
+				("from . import helpers", "pkg.mod", False, "pkg"),
+				("from .helpers import data_dir", "pkg.mod", False, "pkg.helpers"),
+				("from .helpers import data_dir", "pkg", True, "pkg.helpers"),
+				("from ..helpers import data_dir", "pkg.sub.mod", False, "pkg.helpers"),
+				("from ...helpers import data_dir", "pkg.mod", False, None),
+				]
+		)
+def test_resolve_import(statement: str, module: str, is_package: bool, expected: str):
+	node = ast.parse(statement).body[0]
+	assert resolve_import(node, module, is_package) == expected  # type: ignore[arg-type]
+
+
+def test_type_index_update(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "a.py").write_text("from pathlib import Path\ndef a() -> Path: ...\n")
+	(tmp_pathplus / "b.py").write_text("from pathlib import Path\ndef b() -> Path: ...\n")
+	filenames = [tmp_pathplus / "a.py", tmp_pathplus / "b.py"]
+
+	index = TypeIndex()
+	assert index.update(filenames) == 2
+	assert index.returns == {"a.a": "pathlib.Path", "b.b": "pathlib.Path"}
+	digest = index.digest()
+
+	index.save(tmp_pathplus / "index.json")
+	index = TypeIndex.load(tmp_pathplus / "index.json")
+	assert index.returns == {"a.a": "pathlib.Path", "b.b": "pathlib.Path"}
+	assert index.digest() == digest
+
+	# Unchanged
+	assert index.update(filenames) == 0
+
+	# Touched, but the contents are the same
+	stat = os.stat(filenames[0])
+	os.utime(filenames[0], (stat.st_atime, stat.st_mtime + 10))
+	assert index.update(filenames) == 0
+
+	(tmp_pathplus / "a.py").write_text("def a() -> int: ...\n")
+	assert index.update(filenames) == 1
+	assert index.returns == {"b.b": "pathlib.Path"}
+	assert index.digest() != digest
+
+	assert index.update(filenames[1:]) == 1
+	assert index.update(filenames[1:]) == 0
+
+	assert TypeIndex.load(tmp_pathplus / "missing.json").returns == {}
+
+
+def test_get_type_index(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "project").mkdir()
+	(tmp_pathplus / "project" / "helpers.py").write_text(helpers_source)
+	(tmp_pathplus / "project" / "venv").mkdir()
+	(tmp_pathplus / "project" / "venv" / "ignored.py").write_text("def x() -> int: ...\n")
+
+	index = get_type_index(tmp_pathplus / "project", tmp_pathplus / "cache")
+	assert "helpers.data_dir" in index.returns
+	assert len(index._files) == 1
+	assert len(list((tmp_pathplus / "cache" / "index").iterdir())) == 1
+
+
+def test_get_type_index_no_update(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "project").mkdir()
+
+	# There is no saved index to use yet.
+	(tmp_pathplus / "project" / "helpers.py").write_text(helpers_source)
+	index = get_type_index(tmp_pathplus / "project", tmp_pathplus / "cache", update=False)
+	assert "helpers.data_dir" in index.returns
+
+	# The saved index is used without checking the project's files.
+	(tmp_pathplus / "project" / "helpers.py").write_text('')
+	index = get_type_index(tmp_pathplus / "project", tmp_pathplus / "cache", update=False)
+	assert "helpers.data_dir" in index.returns
+
+	index = get_type_index(tmp_pathplus / "project", tmp_pathplus / "cache")
+	assert "helpers.data_dir" not in index.returns
+
+
+def test_dependency_digest(tmp_pathplus: PathPlus):
+	for checkout in ("a", "b"):
+		(tmp_pathplus / checkout / "pkg").mkdir(parents=True)
+		(tmp_pathplus / checkout / "pkg" / "__init__.py").write_text('')
+		(tmp_pathplus / checkout / "pkg" / "helpers.py").write_text("from .paths import data_dir\n")
+		(tmp_pathplus / checkout / "pkg" / "paths.py").write_text(helpers_source)
+		(tmp_pathplus / checkout / "unrelated.py").write_text("x = 1\n")
+
+	index = TypeIndex()
+	index.update(iter_python_files([str(tmp_pathplus / 'a')], ()))
+	assert index.get_imports(tmp_pathplus / 'a' / "pkg" / "helpers.py") == ["pkg.paths", "pkg.paths.data_dir"]
+	assert index.get_imports(tmp_pathplus / "missing.py") is None
+
+	digest = index.dependency_digest(["pkg.helpers"])
+	assert index.dependency_digest(["pkg.helpers"]) != index.dependency_digest(["pkg"])
+
+	# Other copies of the project have the same digest.
+	other_index = TypeIndex()
+	other_index.update(iter_python_files([str(tmp_pathplus / 'b')], ()))
+	assert other_index.dependency_digest(["pkg.helpers"]) == digest
+
+	# Modules imported indirectly are included, but not unrelated ones.
+	(tmp_pathplus / 'b' / "unrelated.py").write_text("x = 2\n")
+	other_index.update(iter_python_files([str(tmp_pathplus / 'b')], ()))
+	assert other_index.dependency_digest(["pkg.helpers"]) == digest
+
+	(tmp_pathplus / 'b' / "pkg" / "paths.py").write_text('')
+	other_index.update(iter_python_files([str(tmp_pathplus / 'b')], ()))
+	assert other_index.dependency_digest(["pkg.helpers"]) != digest
+
+
+def test_class_visitor_with_index(tmp_pathplus: PathPlus):
+	jedi = pytest.importorskip("jedi")
+
+	(tmp_pathplus / "pkg").mkdir()
+	(tmp_pathplus / "pkg" / "__init__.py").touch()
+	(tmp_pathplus / "pkg" / "helpers.py").write_text(helpers_source)
+	(tmp_pathplus / "pkg" / "main.py").write_text(main_source)
+
+	index = TypeIndex()
+	index.update([tmp_pathplus / "pkg" / "helpers.py"])
+
+	visitor = ClassVisitor(jedi.Project(tmp_pathplus), index)
+
+	infer = jedi.Script.infer
+	positions = []
+
+	def counting_infer(self, line, column):
+		positions.append((line, column))
+		return infer(self, line, column)
+
+	jedi.Script.infer = counting_infer
+	try:
+		visitor.first_visit(ast.parse(main_source), tmp_pathplus / "pkg" / "main.py")
+	finally:
+		jedi.Script.infer = infer
+
+	# Only helpers.count() isn't in the index, and has to be inferred.
+	assert positions == [(14, 13)]
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(6, "ENC023"),
+			(7, "ENC021"),
+			(8, "ENC025"),
+			(9, "ENC011"),
+			(10, "ENC011"),
+			(11, "ENC023"),
+			(13, "ENC023"),
+			(18, "ENC023"),
+			]
+
+
+shadowed_source = """\
+from configparser import ConfigParser
+
+parser = ConfigParser()
+
+
+def load(parser):
+	return parser.read("x.txt")
+
+
+def load_global():
+	global parser
+	return parser.read("x.txt")
+"""
+
+
+def test_class_visitor_with_index_shadowed(tmp_pathplus: PathPlus):
+	jedi = pytest.importorskip("jedi")
+
+	(tmp_pathplus / "pkg").mkdir()
+	(tmp_pathplus / "pkg" / "__init__.py").touch()
+	(tmp_pathplus / "pkg" / "config.py").write_text(shadowed_source)
+
+	index = TypeIndex()
+	index.update([tmp_pathplus / "pkg" / "config.py"])
+
+	visitor = ClassVisitor(jedi.Project(tmp_pathplus), index)
+	visitor.first_visit(ast.parse(shadowed_source), tmp_pathplus / "pkg" / "config.py")
+
+	# The parameter isn't the global of the same name, so only the second call is reported.
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [(12, "ENC011")]
@@ -0,0 +1,53 @@
+# 3rd party
+import pytest
+
+# this package
+from flake8_encodings.noqa import find_suppressed_lines, is_suppressed
+
+source = """\
+open("a")  # noqa
+open("b")  # noqa: ENC001
+open("c")  # NOQA:ENC001,ENC002 E501
+open('''
+d
+''')  # noqa: ENC0
+open(
+		"e",
+		)  # noqa
+s = "# noqa"
+open("f")  # noqa : ENC001
+open("g")
+"""
+
+
+def test_find_suppressed_lines():
+	assert find_suppressed_lines(source) == {
+			1: None,
+			2: ("ENC001", ),
+			3: ("ENC001", "ENC002", "E501"),
+			4: ("ENC0", ),
+			5: ("ENC0", ),
+			6: ("ENC0", ),
+			9: None,
+			10: None,
+			11: None,
+			}
+
+	assert find_suppressed_lines("open('a')\n") == {}
+	assert find_suppressed_lines("open('a'  # noqa\n") == {}
+
+
+@pytest.mark.parametrize(
+		"line, codes, expected",
+		[
+				pytest.param(1, ["ENC001", "ENC002"], True, id="blanket"),
+				pytest.param(2, ["ENC001"], True, id="code"),
+				pytest.param(2, ["ENC001", "ENC002"], False, id="some_codes"),
+				pytest.param(3, ["ENC001", "ENC002"], True, id="all_codes"),
+				pytest.param(5, ["ENC001", "ENC002"], True, id="prefix"),
+				pytest.param(7, ["ENC001"], False, id="multiline_call"),
+				pytest.param(12, ["ENC001"], False, id="no_comment"),
+				]
+		)
+def test_is_suppressed(line: int, codes, expected: bool):
+	assert is_suppressed(find_suppressed_lines(source), line, codes) is expected
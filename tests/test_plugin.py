@@ -1,5 +1,8 @@
 # stdlib
+import argparse
 import ast
+import subprocess
+import sys
 
 # 3rd party
 import pytest
@@ -7,7 +10,8 @@ from coincidence.regressions import AdvancedDataRegressionFixture
 from domdf_python_tools.paths import PathPlus
 
 # this package
-from flake8_encodings import Plugin
+import flake8_encodings
+from flake8_encodings import Plugin, get_enabled_codes
 from tests.example_source import example_source
 
 try:
@@ -36,3 +40,180 @@ def test_plugin(
 
 	plugin = Plugin(ast.parse(example_source), filename=str(tmp_pathplus / "code.py"))
 	advanced_data_regression.check(list("{}:{}: {}".format(*r) for r in plugin.run()))
+
+
+def test_plugin_lines(advanced_data_regression: AdvancedDataRegressionFixture):
+	pytest.importorskip("jedi")
+
+	# The file does not exist on disk, e.g. when running "flake8 -"
+	plugin = Plugin(
+			ast.parse(example_source),
+			filename="stdin",
+			lines=example_source.splitlines(keepends=True),
+			)
+	advanced_data_regression.check(list("{}:{}: {}".format(*r) for r in plugin.run()))
+
+
+@pytest.mark.parametrize(
+		"engine",
+		["ast", pytest.param("jedi", marks=pytest.mark.skipif(not has_jedi, reason="Requires jedi"))],
+		)
+def test_plugin_engine(
+		tmp_pathplus: PathPlus,
+		advanced_data_regression: AdvancedDataRegressionFixture,
+		monkeypatch,
+		engine: str,
+		):
+	monkeypatch.setattr(Plugin, "engine", engine)
+	(tmp_pathplus / "code.py").write_text(example_source)
+
+	plugin = Plugin(ast.parse(example_source), filename=str(tmp_pathplus / "code.py"))
+	advanced_data_regression.check(list("{}:{}: {}".format(*r) for r in plugin.run()))
+
+
+def test_plugin_jedi_not_needed(monkeypatch):
+	monkeypatch.setattr(Plugin, "engine", "jedi")
+	monkeypatch.setattr(flake8_encodings, "ClassVisitor", lambda *args: pytest.fail("jedi should not be used"))
+
+	source = "import logging\nlogging.info('Hello World')\nopen('foo.txt')\n"
+	plugin = Plugin(ast.parse(source), filename="code.py")
+	assert [error[:3] for error in plugin.run()] == [(3, 0, "ENC001 no encoding specified for 'open'.")]
+
+
+@pytest.mark.skipif(not has_jedi, reason="Requires jedi")
+def test_plugin_has_inferable_calls_once(tmp_pathplus: PathPlus, monkeypatch):
+	monkeypatch.setattr(Plugin, "engine", "jedi")
+
+	calls = []
+	has_inferable_calls = flake8_encodings.has_inferable_calls
+
+	def record_call(*args, **kwargs):  # noqa: MAN002
+		calls.append(args)
+		return has_inferable_calls(*args, **kwargs)
+
+	monkeypatch.setattr(flake8_encodings, "has_inferable_calls", record_call)
+
+	source = "import pathlib\npathlib.Path('foo.txt').read_text()\n"
+	(tmp_pathplus / "code.py").write_text(source)
+	plugin = Plugin(ast.parse(source), filename=str(tmp_pathplus / "code.py"))
+	assert [error[:3] for error in plugin.run()] == [(2, 0, "ENC023 no encoding specified for 'pathlib.Path.read_text'.")]
+
+	# The tree is only walked once to find the calls which need inferring.
+	assert len(calls) == 1
+
+
+def _flake8_options(**kwargs) -> argparse.Namespace:
+	options = argparse.Namespace(
+			select=None,
+			extend_select=None,
+			ignore=None,
+			extend_ignore=None,
+			extended_default_select=["ENC"],
+			extended_default_ignore=[],
+			)
+	options.__dict__.update(kwargs)
+	return options
+
+
+@pytest.mark.parametrize(
+		"options, expected",
+		[
+				pytest.param({}, flake8_encodings._codes, id="default"),
+				pytest.param({"select": ["ENC00"]}, {"ENC001", "ENC002", "ENC003", "ENC004"}, id="select"),
+				pytest.param(
+						{"extend_ignore": ["ENC01", "ENC02"]},
+						flake8_encodings._codes - {"ENC011", "ENC012", "ENC021", "ENC022", "ENC023", "ENC024", "ENC025", "ENC026"},
+						id="extend_ignore",
+						),
+				pytest.param({"select": ["F", "W"]}, set(), id="other_plugins"),
+				]
+		)
+def test_get_enabled_codes(options, expected):
+	assert get_enabled_codes(_flake8_options(**options)) == expected
+
+
+def test_get_enabled_codes_not_flake8():
+	assert get_enabled_codes(argparse.Namespace()) is None
+
+
+def test_plugin_jedi_not_enabled(monkeypatch):
+	monkeypatch.setattr(Plugin, "engine", "jedi")
+	monkeypatch.setattr(Plugin, "enabled_codes", get_enabled_codes(_flake8_options(select=["ENC00"])))
+	monkeypatch.setattr(flake8_encodings, "ClassVisitor", lambda *args: pytest.fail("jedi should not be used"))
+
+	source = "import pathlib\npathlib.Path('foo.txt').read_text()\nopen('foo.txt')\n"
+	plugin = Plugin(ast.parse(source), filename="code.py")
+	assert [error[:3] for error in plugin.run()] == [(3, 0, "ENC001 no encoding specified for 'open'.")]
+
+
+@pytest.mark.parametrize(
+		"engine",
+		["ast", pytest.param("jedi", marks=pytest.mark.skipif(not has_jedi, reason="Requires jedi"))],
+		)
+def test_plugin_max_errors(tmp_pathplus: PathPlus, monkeypatch, engine: str):
+	monkeypatch.setattr(Plugin, "engine", engine)
+	monkeypatch.setattr(Plugin, "max_errors", 2)
+	(tmp_pathplus / "code.py").write_text(example_source)
+
+	plugin = Plugin(ast.parse(example_source), filename=str(tmp_pathplus / "code.py"))
+	assert len(list(plugin.run())) == 2
+
+
+def test_plugin_streaming(monkeypatch):
+	monkeypatch.setattr(Plugin, "engine", "ast")
+
+	visited = []
+	visit_call = flake8_encodings.TypeTrackingVisitor.visit_Call
+
+	def recording_visit_call(self, node):
+		visited.append(node.lineno)
+		visit_call(self, node)
+
+	monkeypatch.setattr(flake8_encodings.TypeTrackingVisitor, "visit_Call", recording_visit_call)
+
+	source = "open('a.txt')\nopen('b.txt')\nopen('c.txt')\n"
+	errors = Plugin(ast.parse(source), filename="code.py").run()
+
+	# Errors are produced as the tree is walked, so the rest of the file isn't visited until they're needed.
+	assert next(errors)[0] == 1
+	assert visited == [1]
+	assert [error[0] for error in errors] == [2, 3]
+	assert visited == [1, 2, 3]
+
+
+budget_source = """\
+import configparser
+cfg = configparser.ConfigParser()
+cfg.read("a.ini")
+
+
+def read(c: configparser.ConfigParser):
+	c.read("b.ini")
+
+
+open("c.txt")
+"""
+
+
+@pytest.mark.skipif(not has_jedi, reason="Requires jedi")
+@pytest.mark.parametrize("budget", ["time_budget", "call_budget"])
+def test_plugin_inference_budget(tmp_pathplus: PathPlus, monkeypatch, budget: str):
+	monkeypatch.setattr(Plugin, "engine", "jedi")
+	(tmp_pathplus / "code.py").write_text(budget_source)
+
+	plugin = Plugin(ast.parse(budget_source), filename=str(tmp_pathplus / "code.py"))
+	assert [error[0] for error in plugin.run()] == [3, 7, 10]
+	assert not plugin.over_budget
+
+	# Inference stops after the first call, but open() is still checked.
+	monkeypatch.setattr(Plugin, budget, 1e-9)
+	plugin = Plugin(ast.parse(budget_source), filename=str(tmp_pathplus / "code.py"))
+	assert [error[0] for error in plugin.run()] == [3, 10]
+	assert plugin.over_budget
+
+
+def test_plugin_submodules_not_imported():
+	# The submodules are only imported when needed, to keep flake8's startup time down.
+	code = "import sys, flake8_encodings; print(sorted(m for m in sys.modules if m.startswith('flake8_encodings.')))"
+	output = subprocess.check_output([sys.executable, "-c", code], text=True)
+	assert output.strip() == "[]"
@@ -0,0 +1,73 @@
+# stdlib
+import json
+import pickle
+
+# 3rd party
+import pytest
+
+# this package
+from flake8_encodings.records import ErrorRecords
+
+errors = [
+		(3, 4, "ENC001 no encoding specified for 'open'."),
+		(1, 0, "ENC023 no encoding specified for 'pathlib.Path.read_text'."),
+		(2, 8, "ENC001 no encoding specified for 'open'."),
+		]
+
+
+def test_error_records():
+	records = ErrorRecords(errors)
+
+	assert len(records) == 3
+	assert records == errors
+	assert records != errors[:2]
+	assert list(records) == errors
+	assert records[1] == errors[1]
+	assert records[-1] == errors[-1]
+	assert records[1:] == errors[1:]
+	assert isinstance(records[1:], ErrorRecords)
+	assert errors[0] in records
+	assert repr(ErrorRecords(errors[:1])) == f"ErrorRecords({errors[:1]!r})"
+
+	# Each message is only stored once.
+	assert records.message_ids[0] == records.message_ids[2]
+	assert ErrorRecords.get_message(records.message_ids[1]) == errors[1][2]
+
+	records.sort()
+	assert records == sorted(errors)
+
+	records.append((4, 0, "E999 SyntaxError: invalid syntax"))
+	assert records[-1] == (4, 0, "E999 SyntaxError: invalid syntax")
+
+	records.clear()
+	assert not records
+	assert records == []
+
+
+def test_error_records_serialisation():
+	records = ErrorRecords(errors)
+
+	data = json.loads(json.dumps(records.to_dict()))
+	assert data == {
+			"messages": [errors[0][2], errors[1][2]],
+			"lines": [3, 1, 2],
+			"columns": [4, 0, 8],
+			"message_ids": [0, 1, 0],
+			}
+	assert ErrorRecords.from_dict(data) == errors
+
+	assert pickle.loads(pickle.dumps(records)) == errors  # nosec: B301
+
+
+@pytest.mark.parametrize(
+		"data",
+		[
+				[[1, 0, "ENC001 no encoding specified for 'open'."]],
+				{"messages": [], "lines": [1], "columns": [0], "message_ids": [0]},
+				{"messages": ["ENC001"], "lines": [1, 2], "columns": [0], "message_ids": [0]},
+				{"messages": ["ENC001"], "lines": [-1], "columns": [0], "message_ids": [0]},
+				],
+		)
+def test_error_records_from_dict_malformed(data):
+	with pytest.raises(ValueError, match="(Malformed error records|must be the same length)"):
+		ErrorRecords.from_dict(data)
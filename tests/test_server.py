@@ -0,0 +1,194 @@
+# stdlib
+import io
+import json
+import os
+import socket
+import threading
+from typing import Any, Dict, List
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+import flake8_encodings.batch
+from flake8_encodings import Plugin
+from flake8_encodings.server import LanguageServer, Server, _get_parser, main, request, serve
+from tests.test_batch import plugin_options
+
+source = "import pathlib\nopen('foo.txt')\npathlib.Path('foo.txt').read_text()\n"
+
+
+@pytest.fixture()
+def server(tmp_pathplus: PathPlus, monkeypatch) -> Server:
+	# The server configures the Plugin class; make sure that doesn't leak into other tests.
+	for attribute in plugin_options:
+		monkeypatch.setattr(Plugin, attribute, getattr(Plugin, attribute))
+
+	monkeypatch.chdir(tmp_pathplus)
+	(tmp_pathplus / "code.py").write_text(source)
+
+	return Server(_get_parser().parse_args(["serve", "--encodings-engine", "ast"]))
+
+
+def test_server_check(server: Server, tmp_pathplus: PathPlus, monkeypatch):
+	expected = [
+			(2, 0, "ENC001 no encoding specified for 'open'."),
+			(3, 0, "ENC023 no encoding specified for 'pathlib.Path.read_text'."),
+			]
+	assert server.check("code.py") == expected
+
+	# Unsaved changes.
+	assert server.check("code.py", "open('foo.txt', encoding=None)\n") == [
+			(1, 0, "ENC002 'encoding=None' used for 'open'."),
+			]
+
+	# Unchanged files aren't checked again.
+	calls: List[str] = []
+	check_file = flake8_encodings.batch.check_file
+
+	def counting_check_file(filename: str, source: Any = None) -> Any:
+		calls.append(os.path.basename(filename))
+		return check_file(filename, source)
+
+	monkeypatch.setattr(flake8_encodings.batch, "check_file", counting_check_file)
+
+	assert server.check(str(tmp_pathplus / "code.py")) == expected
+	assert calls == []
+
+	# A change to any file the server has seen may affect the others.
+	(tmp_pathplus / "other.py").write_text("print('Hello World')\n")
+	assert server.check("other.py") == []
+	(tmp_pathplus / "other.py").write_text("print('Hello World!')\n")
+
+	assert server.check("code.py") == expected
+	assert calls == ["other.py", "code.py"]
+
+	# Including files which the server hasn't checked, such as modules imported by the checked files.
+	(tmp_pathplus / "helpers.py").write_text("print('Hello World')\n")
+	assert server.check("code.py") == expected
+	assert calls == ["other.py", "code.py", "code.py"]
+
+	(tmp_pathplus / "helpers.py").write_text("print('Hello World!')\n")
+	assert server.check("code.py") == expected
+	assert calls == ["other.py", "code.py", "code.py", "code.py"]
+
+	assert server.check("code.py") == expected
+	assert calls == ["other.py", "code.py", "code.py", "code.py"]
+
+
+def test_server_handle(server: Server):
+	assert server.handle({"filename": "code.py"})["errors"][0] == [2, 0, "ENC001 no encoding specified for 'open'."]
+	assert server.handle({"command": "ping"})["pid"] == os.getpid()
+	assert server.handle({"command": "invalidate"}) == {}
+	assert server.handle({"command": "check"}) == {"error": "Missing 'filename' in request."}
+	assert server.handle({"command": "foo"}) == {"error": "Unknown command 'foo'."}
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Requires Unix sockets")
+def test_serve(server: Server, tmp_pathplus: PathPlus, capsys):
+	address = str(tmp_pathplus / "server.sock")
+
+	thread = threading.Thread(target=serve, args=(server, address))
+	thread.start()
+
+	try:
+		for _ in range(500):
+			if os.path.exists(address):
+				break
+			threading.Event().wait(0.01)
+
+		assert request(address, {"command": "ping"})["pid"] == os.getpid()
+
+		# A client which keeps its connection open doesn't prevent others being answered.
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle_client:
+			idle_client.connect(address)
+			assert request(address, {"command": "ping"}, timeout=10)["pid"] == os.getpid()
+
+		with pytest.raises(OSError, match="A server is already listening"):
+			serve(server, address)
+
+		assert main(["check", "--socket", address, "code.py"]) == 1
+		assert capsys.readouterr().out.splitlines() == [
+				"code.py:2:1: ENC001 no encoding specified for 'open'.",
+				"code.py:3:1: ENC023 no encoding specified for 'pathlib.Path.read_text'.",
+				]
+
+	finally:
+		assert main(["stop", "--socket", address]) == 0
+		thread.join(10)
+
+	assert not thread.is_alive()
+	assert not os.path.exists(address)
+
+	assert main(["check", "--socket", address, "code.py"]) == 2
+	assert "Could not connect to the server" in capsys.readouterr().err
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+	body = json.dumps(message).encode("UTF-8")
+	return f"Content-Length: {len(body)}\r\n\r\n".encode("ASCII") + body
+
+
+def _decode(stream: bytes) -> List[Dict[str, Any]]:
+	messages = []
+
+	while stream:
+		headers, _, stream = stream.partition(b"\r\n\r\n")
+		length = int(headers.split(b':')[1])
+		messages.append(json.loads(stream[:length]))
+		stream = stream[length:]
+
+	return messages
+
+
+def test_language_server(server: Server, tmp_pathplus: PathPlus):
+	uri = (tmp_pathplus / "code.py").as_uri()
+	document = {"uri": uri, "languageId": "python", "version": 1, "text": source}
+
+	stdin = io.BytesIO(
+			b''.join([
+					_encode({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}),
+					_encode({"jsonrpc": "2.0", "method": "initialized", "params": {}}),
+					_encode({"jsonrpc": "2.0", "method": "textDocument/didOpen", "params": {"textDocument": document}}),
+					_encode({
+							"jsonrpc": "2.0",
+							"method": "textDocument/didChange",
+							"params": {
+									"textDocument": {"uri": uri, "version": 2},
+									"contentChanges": [{"text": "print('Hello World')\n"}],
+									},
+							}),
+					_encode({"jsonrpc": "2.0", "id": 2, "method": "textDocument/hover", "params": {}}),
+					_encode({"jsonrpc": "2.0", "id": 3, "method": "shutdown"}),
+					_encode({"jsonrpc": "2.0", "method": "exit"}),
+					])
+			)
+	stdout = io.BytesIO()
+
+	assert LanguageServer(server, stdin, stdout).run() == 0
+
+	initialize, opened, changed, hover, shutdown = _decode(stdout.getvalue())
+
+	assert initialize["id"] == 1
+	assert initialize["result"]["capabilities"]["textDocumentSync"]["change"] == 1
+
+	assert opened["method"] == "textDocument/publishDiagnostics"
+	assert opened["params"]["uri"] == uri
+	assert opened["params"]["diagnostics"][0] == {
+			"range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 0}},
+			"severity": 2,
+			"code": "ENC001",
+			"source": "flake8-encodings",
+			"message": "no encoding specified for 'open'.",
+			}
+	assert [d["code"] for d in opened["params"]["diagnostics"]] == ["ENC001", "ENC023"]
+
+	assert changed["params"]["diagnostics"] == []
+	assert hover["error"]["code"] == -32601
+	assert shutdown == {"jsonrpc": "2.0", "id": 3, "result": None}
+
+
+def test_language_server_exit_without_shutdown(server: Server):
+	stdin = io.BytesIO(_encode({"jsonrpc": "2.0", "method": "exit"}))
+	assert LanguageServer(server, stdin, io.BytesIO()).run() == 1
@@ -0,0 +1,86 @@
+# stdlib
+import ast
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from flake8_encodings import Plugin
+from flake8_encodings.stats import Stats, format_summary, summarise
+
+
+def test_summarise(tmp_pathplus: PathPlus):
+	for filename, seconds in [("a.py", 0.5), ("b.py", 1.5)]:
+		stats = Stats(filename)
+		stats.timings["total"] = seconds
+		stats.timings["jedi_infer"] = seconds / 2
+		stats.count("inference_cache_misses", 2)
+		if filename == "b.py":
+			stats.count("inference_budget_exceeded")
+		stats.record(tmp_pathplus)
+
+	summary = summarise(tmp_pathplus)
+
+	assert summary["files"] == 2
+	assert summary["processes"] == 1
+	assert summary["timings"] == {"total": 2.0, "jedi_infer": 1.0, "other": 1.0}
+	assert summary["counts"] == {"inference_cache_misses": 4, "inference_budget_exceeded": 1}
+	assert [f["filename"] for f in summary["slowest_files"]] == ["b.py", "a.py"]
+	assert summary["over_budget_files"] == ["b.py"]
+
+	formatted = format_summary(summary).splitlines()
+	assert formatted[0] == "flake8-encodings: checked 2 files in 1 processes"
+	assert formatted[-2:] == ["Files where type inference exceeded the time budget:", "  b.py"]
+
+
+def test_plugin_stats(tmp_pathplus: PathPlus, monkeypatch):
+	monkeypatch.setattr(Plugin, "stats_dir", tmp_pathplus)
+	monkeypatch.setattr(Plugin, "engine", "ast")
+
+	source = "import pathlib\nopen('foo.txt')\npathlib.Path('foo.txt').read_text()\n"
+	plugin = Plugin(ast.parse(source), filename="code.py")
+	assert len(list(plugin.run())) == 2
+
+	summary = summarise(tmp_pathplus)
+	assert summary["files"] == 1
+	assert summary["slowest_files"][0]["filename"] == "code.py"
+	assert "bind_arguments" in summary["timings"]
+	assert "prescan" in summary["timings"]
+	assert "ast_walk" in summary["timings"]
+
+
+def test_nested_timers(monkeypatch):
+	clock = iter(range(100))
+	monkeypatch.setattr("time.perf_counter", lambda: next(clock))
+
+	stats = Stats("code.py")
+
+	with stats.timer("outer"):  # 0
+		with stats.timer("inner"):  # 1
+			pass  # 2
+		with stats.timer("inner"):  # 3
+			pass  # 4
+	# 5
+
+	assert stats.timings == {"outer": 3, "inner": 2}
+
+
+def test_iter_timed(monkeypatch):
+	clock = iter(range(100))
+	monkeypatch.setattr("time.perf_counter", lambda: next(clock))
+
+	def produce():
+		yield 1
+		with stats.timer("inner"):
+			pass
+		yield 2
+
+	stats = Stats("code.py")
+	iterator = stats.iter_timed("outer", produce())
+
+	for _ in iterator:
+		# Not included in either phase.
+		next(clock)
+
+	# 0 to 1, 3 to 6 less 4 to 5 for the inner phase, and 8 to 9 to reach the end.
+	assert stats.timings == {"outer": 4, "inner": 1}
@@ -0,0 +1,47 @@
+# stdlib
+import sys
+
+# 3rd party
+import pytest
+
+# this package
+from flake8_encodings.stdlib_types import get_attribute_type, get_item_type, get_method_return_type, is_path_class
+
+
+@pytest.mark.parametrize(
+		"class_name, method_name, expected",
+		[
+				("pathlib.Path", "with_suffix", "pathlib.Path"),
+				("pathlib.PosixPath", "joinpath", "pathlib.PosixPath"),
+				("pathlib.WindowsPath", "resolve", "pathlib.WindowsPath"),
+				("pathlib.Path", "home", "pathlib.Path"),
+				("pathlib.PurePath", "with_name", "pathlib.PurePath"),
+				("pathlib.PurePath", "resolve", None),
+				("pathlib.Path", "read_text", None),
+				("configparser.ConfigParser", "read", None),
+				("pathlib.Path", "rename", "pathlib.Path" if sys.version_info >= (3, 8) else None),
+				("pathlib.PurePath", "with_stem", "pathlib.PurePath" if sys.version_info >= (3, 9) else None),
+				("pathlib.Path", "readlink", "pathlib.Path" if sys.version_info >= (3, 9) else None),
+				("pathlib.PurePath", "with_segments", "pathlib.PurePath" if sys.version_info >= (3, 12) else None),
+				],
+		)
+def test_get_method_return_type(class_name: str, method_name: str, expected: str):
+	assert get_method_return_type(class_name, method_name) == expected
+
+
+def test_get_attribute_type():
+	assert get_attribute_type("pathlib.PosixPath", "parent") == "pathlib.PosixPath"
+	assert get_attribute_type("pathlib.Path", "name") is None
+
+
+def test_get_item_type():
+	assert get_item_type("pathlib.Path", "glob", method=True) == "pathlib.Path"
+	assert get_item_type("pathlib.Path", "parents", method=False) == "pathlib.Path"
+	assert get_item_type("pathlib.Path", "parents", method=True) is None
+	assert get_item_type("pathlib.PurePath", "iterdir", method=True) is None
+
+
+def test_is_path_class():
+	assert is_path_class("pathlib.Path")
+	assert is_path_class("pathlib.PureWindowsPath")
+	assert not is_path_class("configparser.ConfigParser")
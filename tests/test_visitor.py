@@ -1,5 +1,15 @@
 # stdlib
 import ast
+import codecs
+import configparser
+import fileinput
+import logging
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List, Type
 
 # 3rd party
 import pytest
@@ -7,7 +17,17 @@ from coincidence.regressions import AdvancedDataRegressionFixture
 from domdf_python_tools.paths import PathPlus
 
 # this package
-from flake8_encodings import ClassVisitor, Visitor
+import flake8_encodings
+from flake8_encodings import (
+		ClassVisitor,
+		TypeTrackingVisitor,
+		Visitor,
+		find_candidate_lines,
+		get_jedi_project,
+		get_positional_parameters,
+		has_inferable_calls
+		)
+from flake8_encodings.noqa import find_suppressed_lines
 from tests.example_source import example_source
 
 try:
@@ -57,3 +77,694 @@ def test_classvisitor_importerror():
 			ImportError, match="This class requires 'jedi' to be installed but it could not be imported."
 			):
 		ClassVisitor()
+
+
+def test_visitor_with_jedi_no_inferable_calls(tmp_pathplus: PathPlus):
+	pytest.importorskip("jedi")
+
+	source = "import logging\nlogging.info('Hello World')\nopen('foo.txt')\n"
+	tree = ast.parse(source)
+	assert not has_inferable_calls(tree)
+
+	visitor = ClassVisitor()
+
+	# The file is never read as there is nothing to infer the type of.
+	visitor.first_visit(tree, filename=tmp_pathplus / "does_not_exist.py")
+	assert visitor.errors == [(3, 0, "ENC001 no encoding specified for 'open'.")]
+
+
+def test_has_inferable_calls():
+	assert has_inferable_calls(ast.parse(example_source))
+	assert has_inferable_calls(ast.parse("cfg.read('tox.ini')"))
+	assert not has_inferable_calls(ast.parse("read('tox.ini')"))
+	assert not has_inferable_calls(ast.parse("logger.info('Hello World')"))
+
+
+def test_visitor_with_jedi_inference_cache(tmp_pathplus: PathPlus):
+	jedi = pytest.importorskip("jedi")
+
+	source = '\n'.join([
+			"import configparser",
+			"def foo():",
+			"	cfg = configparser.ConfigParser()",
+			"	cfg.read('a.ini')",
+			"	cfg.read('b.ini')",
+			"	cfg = None",
+			"	cfg.read('c.ini')",
+			"def bar(cfg):",
+			"	cfg.read('d.ini')",
+			'',
+			])
+
+	visitor = ClassVisitor()
+	visitor.filename = tmp_pathplus / "code.py"
+	visitor.jedi_script = jedi.Script(source, path=visitor.filename)
+
+	positions = []
+	infer = visitor.jedi_script.infer
+
+	def counting_infer(line, column):
+		positions.append((line, column))
+		return infer(line, column)
+
+	visitor.jedi_script.infer = counting_infer
+	visitor.visit(ast.parse(source))
+
+	assert positions == [(4, 4), (7, 4), (9, 4)]
+	assert visitor.errors == [
+			(4, 1, "ENC011 no encoding specified for 'configparser.ConfigParser.read'."),
+			(5, 1, "ENC011 no encoding specified for 'configparser.ConfigParser.read'."),
+			]
+
+
+path_expressions_source = '''
+import pathlib
+from typing import List
+
+tmp_path = pathlib.Path("tmp")
+(tmp_path / "code.py").write_text("x")
+(tmp_path / "a" / "b.txt").read_text()
+(tmp_path / "c.txt").read_text(encoding="UTF-8")
+("a" + "b").open()
+paths = [pathlib.Path("a")]
+paths[0].open()
+
+def foo(paths: List[pathlib.Path]):
+	paths[0].read_text()
+'''
+
+
+def test_visitor_with_jedi_path_expressions(tmp_pathplus: PathPlus):
+	jedi = pytest.importorskip("jedi")
+
+	visitor = ClassVisitor()
+	visitor.filename = tmp_pathplus / "code.py"
+	visitor.jedi_script = jedi.Script(path_expressions_source, path=visitor.filename)
+
+	positions = []
+	infer = visitor.jedi_script.infer
+
+	def counting_infer(line, column):
+		positions.append((line, column))
+		return infer(line, column)
+
+	visitor.jedi_script.infer = counting_infer
+	visitor.visit(ast.parse(path_expressions_source))
+
+	# tmp_path is only inferred once, and ("a" + "b") not at all.
+	assert positions == [(6, 9), (11, 8), (14, 9)]
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(6, "ENC025"),
+			(7, "ENC023"),
+			(11, "ENC021"),
+			(14, "ENC023"),
+			]
+
+
+def test_type_tracking_visitor_path_expressions():
+	visitor = TypeTrackingVisitor()
+	visitor.visit(ast.parse(path_expressions_source))
+
+	# The types of items in lists are not tracked.
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [(6, "ENC025"), (7, "ENC023")]
+
+
+def test_type_tracking_visitor(advanced_data_regression: AdvancedDataRegressionFixture):
+	visitor = TypeTrackingVisitor()
+	visitor.visit(ast.parse(example_source))
+	advanced_data_regression.check(visitor.errors)
+
+
+type_tracking_source = """
+import pathlib as pl
+from configparser import ConfigParser as CP, RawConfigParser
+from pathlib import Path
+from typing import Optional
+
+def aliases():
+	pl.Path("foo.txt").read_text()
+	CP().read("tox.ini")
+
+def annotated(path: Path, raw: RawConfigParser, name: str, other: "Path"):
+	path.read_text()
+	raw.read("tox.ini")
+	name.read_text()
+	other.write_text("Hello World")
+
+def shadowed(Path):
+	Path("foo.txt").read_text()
+
+def reassigned():
+	path = Path("foo.txt")
+	path.open()
+	path = path.as_posix()
+	path.open()
+
+	for cfg in []:
+		cfg.read("tox.ini")
+
+	local: Path = get_path()
+	local.read_text(encoding=None)
+
+class C:
+	path = Path("foo.txt")
+
+	def method(self):
+		path.read_text()
+
+def functions():
+	import io as _io
+	from io import open as io_open
+	_io.open("foo.txt")
+	io_open("foo.txt", 'rb')
+	io_open("foo.txt", encoding=None)
+"""
+
+
+def test_type_tracking_visitor_resolution():
+	visitor = TypeTrackingVisitor()
+	visitor.visit(ast.parse(type_tracking_source))
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(8, "ENC023"),
+			(9, "ENC011"),
+			(12, "ENC023"),
+			(13, "ENC011"),
+			(15, "ENC025"),
+			(22, "ENC021"),
+			(30, "ENC024"),
+			(41, "ENC001"),
+			(43, "ENC002"),
+			]
+
+
+type_tracking_scopes_source = """
+from pathlib import Path
+
+def comprehensions(items, other):
+	p = Path("foo.txt")
+	[p.open() for p in items]
+	{p: p.read_text() for p in items}
+	[q.read_text() for q in Path(".").iterdir()]
+	[p.read_text() for q in items]
+	p.write_text("Hello World")
+	[q for q in items]
+	q.open()
+
+def walrus(items):
+	if (p := Path("foo.txt")).exists():
+		p.read_text()
+	[r := Path(item) for item in items]
+	r.open()
+	return (s := Path("foo.txt")), s.open()
+
+def walrus_no_candidates(base: Path):
+	if (p := base / "foo.txt").exists():
+		p.read_text()
+	q = base
+	if (q := base.name):
+		q.open()
+"""
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="Assignment expressions require Python 3.8")
+@pytest.mark.parametrize("pruned", [False, True])
+def test_type_tracking_visitor_scopes(pruned: bool):
+	visitor = TypeTrackingVisitor()
+	if pruned:
+		visitor.candidate_lines = find_candidate_lines(type_tracking_scopes_source)
+
+	visitor.visit(ast.parse(type_tracking_scopes_source))
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(8, "ENC023"),
+			(9, "ENC023"),
+			(10, "ENC025"),
+			(16, "ENC023"),
+			(18, "ENC021"),
+			(19, "ENC021"),
+			(23, "ENC023"),
+			]
+
+
+@pytest.mark.parametrize(
+		"source, expected",
+		[
+				pytest.param("open('foo.txt', 'r', -1, None)", ["ENC002"], id="positional"),
+				pytest.param("open('foo.txt', 'rb', -1, None)", [], id="positional_binary"),
+				pytest.param("open(*args)", [], id="starred"),
+				pytest.param("open('foo.txt', 'r', *args)", [], id="starred_after"),
+				pytest.param("open('foo.txt', **kwargs)", [], id="double_starred"),
+				pytest.param("open('foo.txt', encoding=None, **kwargs)", ["ENC004"], id="double_starred_encoding_none"),
+				pytest.param("open(file='foo.txt')", ["ENC001"], id="keyword"),
+				]
+		)
+def test_visitor_arguments(source: str, expected: List[str]):
+	visitor = Visitor()
+	visitor.visit(ast.parse(source))
+	assert [msg[:6] for line, col, msg in visitor.errors] == expected
+
+
+def test_visitor_with_jedi_project(tmp_pathplus: PathPlus, advanced_data_regression: AdvancedDataRegressionFixture):
+	pytest.importorskip("jedi")
+
+	project = get_jedi_project(str(tmp_pathplus))
+	assert get_jedi_project(str(tmp_pathplus)) is project
+
+	(tmp_pathplus / "code.py").write_text(example_source)
+
+	for _ in range(2):
+		visitor = ClassVisitor(project)
+		visitor.first_visit(ast.parse(example_source), filename=tmp_pathplus / "code.py")
+		assert visitor.jedi_script._inference_state.project is project
+
+	advanced_data_regression.check(visitor.errors, basename="test_visitor_with_jedi")
+
+
+@pytest.mark.parametrize(
+		"function, method, table",
+		[
+				pytest.param(open, False, "_open_parameters", id="open"),
+				pytest.param(configparser.RawConfigParser.read, True, "_configparser_read_parameters", id="read"),
+				pytest.param(pathlib.Path.open, True, "_pathlib_open_parameters", id="Path.open"),
+				pytest.param(pathlib.Path.read_text, True, "_pathlib_read_text_parameters", id="Path.read_text"),
+				pytest.param(pathlib.Path.write_text, True, "_pathlib_write_text_parameters", id="Path.write_text"),
+				pytest.param(tempfile.TemporaryFile, False, "_tempfile_parameters", id="TemporaryFile"),
+				pytest.param(
+						tempfile.NamedTemporaryFile,
+						False,
+						"_named_tempfile_parameters",
+						id="NamedTemporaryFile",
+						),
+				pytest.param(
+						tempfile.SpooledTemporaryFile,
+						False,
+						"_spooled_tempfile_parameters",
+						id="SpooledTemporaryFile",
+						),
+				pytest.param(subprocess.Popen, False, "_popen_parameters", id="Popen"),
+				pytest.param(logging.FileHandler, False, "_file_handler_parameters", id="FileHandler"),
+				pytest.param(codecs.open, False, "_codecs_open_parameters", id="codecs.open"),
+				pytest.param(
+						fileinput.input,
+						False,
+						"_fileinput_parameters",
+						id="fileinput.input",
+						marks=pytest.mark.skipif(sys.version_info < (3, 8), reason="mode is keyword-only from 3.8"),
+						),
+				]
+		)
+def test_parameter_tables(function: Callable, method: bool, table: str):
+	# The tables are for the newest Python version; older versions may lack trailing parameters.
+	parameters = get_positional_parameters(function, method=method)
+	assert getattr(flake8_encodings, table)[:len(parameters)] == parameters
+
+
+other_apis_source = """
+import subprocess
+import tempfile
+from codecs import open as codecs_open
+from io import TextIOWrapper
+from logging import FileHandler, basicConfig
+import fileinput as fi
+
+tempfile.TemporaryFile()
+tempfile.TemporaryFile('w+')
+tempfile.NamedTemporaryFile("w", encoding=None)
+tempfile.SpooledTemporaryFile(1024, 'w+', encoding="UTF-8")
+
+subprocess.run(["ls"], capture_output=True)
+subprocess.run(["ls"], capture_output=True, text=True)
+subprocess.Popen(["ls"], universal_newlines=True, encoding=None)
+subprocess.check_output(["ls"], errors="replace", input=open("input.txt").read())
+
+FileHandler("log.txt")
+basicConfig(filename="log.txt", encoding="UTF-8")
+basicConfig(filename="log.txt")
+basicConfig(level=10)
+
+TextIOWrapper(buffer)
+codecs_open("file.txt", 'rb')
+codecs_open("file.txt")
+fi.input(files, mode="rb")
+fi.FileInput(files, encoding=None)
+fi.input(files, openhook=fi.hook_encoded("UTF-8"))
+subprocess.run(cmd, text=True, **kwargs)
+fi.input(files, **kwargs)
+"""
+
+
+@pytest.mark.parametrize("visitor_type", [Visitor, TypeTrackingVisitor])
+def test_other_apis(visitor_type: Type[Visitor]):
+	visitor = visitor_type()
+	visitor.visit(ast.parse(other_apis_source))
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(10, "ENC031"),
+			(11, "ENC034"),
+			(15, "ENC041"),
+			(16, "ENC044"),
+			(17, "ENC045"),
+			(17, "ENC001"),
+			(19, "ENC051"),
+			(21, "ENC053"),
+			(24, "ENC061"),
+			(26, "ENC071"),
+			*([(28, "ENC084")] if sys.version_info >= (3, 10) else []),
+			]
+
+
+imported_names_source = """
+from subprocess import run, check_output
+import subprocess as sp
+
+def shadowed(run):
+	run(["ls"])
+	sp.Popen(["ls"], text=True)
+
+def local():
+	from mymodule import check_output
+	check_output(["ls"])
+	sp = get_subprocess()
+	sp.Popen(["ls"], text=True)
+
+check_output(["ls"], text=True)
+run(["ls"], text=True)
+
+def run(args, text):
+	pass
+
+run(["ls"], text=True)
+"""
+
+
+@pytest.mark.parametrize("visitor_type", [Visitor, ClassVisitor])
+def test_visitor_imported_names(visitor_type: Type[Visitor]):
+	visitor = visitor_type()
+	visitor.visit(ast.parse(imported_names_source))
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(7, "ENC043"),
+			(15, "ENC045"),
+			(16, "ENC041"),
+			]
+
+
+def test_visitor_iter_errors():
+	visitor = Visitor()
+	errors = visitor.iter_errors(ast.parse("open('a.txt')\nprint('Hello World')\nopen('b.txt', encoding=None)\n"))
+
+	assert next(errors) == (1, 0, "ENC001 no encoding specified for 'open'.")
+	assert list(errors) == [(3, 0, "ENC002 'encoding=None' used for 'open'.")]
+	assert visitor.errors == []
+
+
+def test_class_visitor_release(tmp_pathplus: PathPlus):
+	pytest.importorskip("jedi")
+
+	visitor = ClassVisitor()
+	tree = ast.parse(example_source)
+	(tmp_pathplus / "code.py").write_text(example_source)
+
+	visitor.prepare(tree, filename=tmp_pathplus / "code.py")
+	errors = list(visitor.iter_errors(tree))
+	visitor.release()
+
+	assert visitor.jedi_script is flake8_encodings._get_empty_script()
+	assert not visitor._position_cache
+
+	visitor = ClassVisitor()
+	visitor.first_visit(tree, filename=tmp_pathplus / "code.py")
+	assert errors == visitor.errors
+
+
+candidate_source = """\
+from io import open as io_open
+import pathlib
+
+SCHEMA = {
+	"name": str(1),
+	"size": int(2),
+}
+reader = io_open
+path = pathlib.Path("foo.txt")
+
+
+def helper():
+	return path
+
+
+def read():
+	reader("foo.txt")
+	return helper().read_text()
+
+
+if (data := path):
+	data.read_text()
+"""
+
+
+def test_find_candidate_lines():
+	assert find_candidate_lines(candidate_source) == [1, 8, 16, 17, 18, 21, 22]
+	assert find_candidate_lines("x = reopen('foo.txt')\nprint(x.readable)\n") == []
+	assert find_candidate_lines('') == []
+
+
+def test_find_candidate_lines_scaling():
+	# The time taken should grow linearly with the size of the file, not with its size times the number of matches.
+
+	def timed(lines: int) -> float:
+		source = "import io\n" + "x = data.read()\n" * lines
+		timings = []
+
+		for _ in range(3):
+			start = time.perf_counter()
+			assert len(find_candidate_lines(source)) == lines
+			timings.append(time.perf_counter() - start)
+
+		return min(timings)
+
+	assert timed(40_000) < timed(4_000) * 30
+
+
+@pytest.mark.parametrize("visitor_type", [Visitor, TypeTrackingVisitor])
+def test_visitor_candidate_lines(visitor_type: Type[Visitor], monkeypatch):
+	visited = []
+	monkeypatch.setattr(visitor_type, "visit_Dict", lambda self, node: visited.append(node), raising=False)
+
+	tree = ast.parse(candidate_source)
+
+	visitor = visitor_type()
+	visitor.visit(tree)
+	expected = list(visitor.errors)
+	assert len(visited) == 1
+
+	visited.clear()
+	visitor = visitor_type()
+	visitor.candidate_lines = find_candidate_lines(candidate_source)
+	visitor.visit(tree)
+
+	assert visitor.errors == expected
+
+	if sys.version_info >= (3, 8):
+		# The schema can't contain any errors, so it isn't visited.
+		assert visited == []
+
+
+path_chain_source = """\
+import pathlib
+from pathlib import Path
+
+p = Path("foo")
+p.with_suffix(".txt").open()
+Path.home().joinpath("x").read_text()
+p.parent.write_text("x")
+pathlib.Path("a").resolve().read_text()
+p.parents[0].read_text()
+p.with_suffix(".txt").open("rb")
+"abc".replace("a", "b").read_text()
+
+for f in p.glob("*.cfg"):
+	f.read_text()
+
+
+def g(root: Path):
+	for f in root.iterdir():
+		f.open()
+	for f, _ in []:
+		f.open()
+"""
+
+
+@pytest.mark.parametrize(
+		"visitor_type",
+		[
+				TypeTrackingVisitor,
+				pytest.param(ClassVisitor, marks=pytest.mark.skipif(not has_jedi, reason="Requires jedi")),
+				],
+		)
+def test_visitor_path_chains(tmp_pathplus: PathPlus, visitor_type: Type[Visitor]):
+	tree = ast.parse(path_chain_source)
+	visitor = visitor_type()
+
+	if isinstance(visitor, ClassVisitor):
+		(tmp_pathplus / "code.py").write_text(path_chain_source)
+		visitor.first_visit(tree, filename=tmp_pathplus / "code.py")
+	else:
+		visitor.visit(tree)
+
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(5, "ENC021"),
+			(6, "ENC023"),
+			(7, "ENC025"),
+			(8, "ENC023"),
+			(9, "ENC023"),
+			(14, "ENC023"),
+			(19, "ENC021"),
+			]
+
+
+rtruediv_source = """\
+import pathlib
+p = pathlib.Path("foo")
+base = "src"
+(base / p).read_text()
+("src" / p).open()
+(base / p / "c.txt").write_text("x")
+(base / "c.txt").read_text()
+"""
+
+
+@pytest.mark.parametrize(
+		"visitor_type",
+		[
+				TypeTrackingVisitor,
+				pytest.param(ClassVisitor, marks=pytest.mark.skipif(not has_jedi, reason="Requires jedi")),
+				],
+		)
+def test_visitor_path_chains_rtruediv(tmp_pathplus: PathPlus, visitor_type: Type[Visitor]):
+	# Dividing a string by a path gives a path too.
+	tree = ast.parse(rtruediv_source)
+	visitor = visitor_type()
+
+	if isinstance(visitor, ClassVisitor):
+		(tmp_pathplus / "code.py").write_text(rtruediv_source)
+		visitor.first_visit(tree, filename=tmp_pathplus / "code.py")
+	else:
+		visitor.visit(tree)
+
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [
+			(4, "ENC023"),
+			(5, "ENC021"),
+			(6, "ENC025"),
+			]
+
+
+rename_source = """\
+import pathlib
+p = pathlib.Path("foo")
+p.rename("bar").read_text()
+"""
+
+
+@pytest.mark.parametrize(
+		"visitor_type",
+		[
+				TypeTrackingVisitor,
+				pytest.param(
+						ClassVisitor,
+						marks=pytest.mark.skipif(not has_jedi or sys.version_info < (3, 8), reason="Requires jedi and Python 3.8+"),
+						),
+				],
+		)
+def test_visitor_path_chains_rename(tmp_pathplus: PathPlus, visitor_type: Type[Visitor]):
+	# Path.rename() only returns the new path from Python 3.8.
+	tree = ast.parse(rename_source)
+	visitor = visitor_type()
+
+	if isinstance(visitor, ClassVisitor):
+		(tmp_pathplus / "code.py").write_text(rename_source)
+		visitor.first_visit(tree, filename=tmp_pathplus / "code.py")
+	else:
+		visitor.visit(tree)
+
+	expected = [(3, "ENC023")] if sys.version_info >= (3, 8) else []
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == expected
+
+
+noqa_source = """\
+import pathlib
+p = pathlib.Path("foo")
+p.read_text()  # noqa: ENC023,ENC024
+p.read_text()  # noqa: ENC021
+p.open("w", newline='''
+''')  # noqa
+p.write_text("x")  # noqa: ENC02
+p.read_text()
+"""
+
+
+def test_visitor_suppressed_lines(tmp_pathplus: PathPlus, monkeypatch):
+	pytest.importorskip("jedi")
+
+	inferred = []
+	infer_receiver_class = ClassVisitor.infer_receiver_class
+
+	def record_inference(self, node: ast.Call):  # noqa: MAN002
+		inferred.append(node.lineno)
+		return infer_receiver_class(self, node)
+
+	monkeypatch.setattr(ClassVisitor, "infer_receiver_class", record_inference)
+
+	(tmp_pathplus / "code.py").write_text(noqa_source)
+	visitor = ClassVisitor()
+	visitor.suppressed_lines = find_suppressed_lines(noqa_source)
+	visitor.first_visit(ast.parse(noqa_source), filename=tmp_pathplus / "code.py")
+
+	assert inferred == [4, 8]
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [(4, "ENC023"), (8, "ENC023")]
+
+
+union_source = """\
+import configparser
+import pathlib
+
+if input():
+	p = configparser.ConfigParser()
+else:
+	p = pathlib.Path("a")
+
+p.open()
+p.read("a.ini")
+"""
+
+
+def test_visitor_union(tmp_pathplus: PathPlus):
+	pytest.importorskip("jedi")
+
+	(tmp_pathplus / "code.py").write_text(union_source)
+	visitor = ClassVisitor()
+	visitor.first_visit(ast.parse(union_source), filename=tmp_pathplus / "code.py")
+
+	# The receiver may be either class, so each call is checked against the class which has the method.
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [(9, "ENC021"), (10, "ENC011")]
+
+
+branch_source = """\
+import pathlib
+
+
+def f(flag, p):
+	if flag:
+		p = pathlib.Path("x")
+		p.read_text()
+	else:
+		p.read_text()
+"""
+
+
+def test_visitor_branches(tmp_pathplus: PathPlus):
+	pytest.importorskip("jedi")
+
+	(tmp_pathplus / "code.py").write_text(branch_source)
+	visitor = ClassVisitor()
+	visitor.first_visit(ast.parse(branch_source), filename=tmp_pathplus / "code.py")
+
+	# The types inferred in one branch aren't reused in the others.
+	assert [(line, msg[:6]) for line, col, msg in visitor.errors] == [(7, "ENC023")]